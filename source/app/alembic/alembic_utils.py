@@ -24,4 +24,13 @@ def _has_table(table_name):
     )
     inspector = reflection.Inspector.from_engine(engine)
     tables = inspector.get_table_names()
-    return table_name in tables
\ No newline at end of file
+    return table_name in tables
+
+
+def _table_has_index(table, index):
+    config = op.get_context().config
+    engine = engine_from_config(
+        config.get_section(config.config_ini_section), prefix='sqlalchemy.')
+    insp = reflection.Inspector.from_engine(engine)
+
+    return index in [idx['name'] for idx in insp.get_indexes(table)]
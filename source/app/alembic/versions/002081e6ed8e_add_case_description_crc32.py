@@ -0,0 +1,68 @@
+"""Add case description checksum
+
+Revision ID: 002081e6ed8e
+Revises: 7e87397a0ad2
+Create Date: 2023-03-29 10:48:37.120584
+
+"""
+import binascii
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.alembic.alembic_utils import _table_has_column
+
+# revision identifiers, used by Alembic.
+revision = '002081e6ed8e'
+down_revision = '7e87397a0ad2'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    if not _table_has_column('cases', 'description_crc32'):
+        op.add_column('cases',
+                      sa.Column('description_crc32', sa.BigInteger)
+                      )
+
+    cases_table = sa.Table(
+        'cases',
+        sa.MetaData(),
+        sa.Column('case_id', sa.BigInteger, primary_key=True),
+        sa.Column('description', sa.Text),
+        sa.Column('description_crc32', sa.BigInteger)
+    )
+
+    update_stmt = cases_table.update().where(
+        cases_table.c.case_id == sa.bindparam('b_case_id')
+    ).values(description_crc32=sa.bindparam('b_crc32'))
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select([cases_table.c.case_id, cases_table.c.description])
+            .where(cases_table.c.case_id > last_id)
+            .where(cases_table.c.description_crc32.is_(None))
+            .order_by(cases_table.c.case_id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+
+        if not rows:
+            break
+
+        conn.execute(update_stmt, [
+            {
+                'b_case_id': row.case_id,
+                'b_crc32': binascii.crc32((row.description or '').encode('utf-8'))
+            } for row in rows
+        ])
+
+        last_id = rows[-1].case_id
+
+
+def downgrade():
+    op.drop_column('cases', 'description_crc32')
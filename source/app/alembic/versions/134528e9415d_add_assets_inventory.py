@@ -0,0 +1,89 @@
+"""Add customers assets inventory
+
+Revision ID: 134528e9415d
+Revises: 719b3c4b78e6
+Create Date: 2023-03-24 09:41:17.906532
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from app.alembic.alembic_utils import _has_table
+from app.alembic.alembic_utils import _table_has_column
+from app.alembic.alembic_utils import _table_has_index
+
+# revision identifiers, used by Alembic.
+revision = '134528e9415d'
+down_revision = '719b3c4b78e6'
+branch_labels = None
+depends_on = None
+
+
+# Same normalization as _normalize_inventory_field: the whitespaces stripped, then lowered
+def _normalize(column):
+    return f"lower(btrim({column}, E' \\t\\r\\n\\f\\013'))"
+
+
+def upgrade():
+    if not _has_table('asset_inventory'):
+        op.create_table('asset_inventory',
+                        sa.Column('inventory_id', sa.BigInteger, primary_key=True),
+                        sa.Column('client_id', sa.BigInteger, sa.ForeignKey('client.client_id'), nullable=False),
+                        sa.Column('asset_type_id', sa.Integer, sa.ForeignKey('assets_type.asset_id'),
+                                  nullable=False),
+                        sa.Column('inventory_name', sa.Text, nullable=False),
+                        sa.Column('inventory_ip', sa.Text),
+                        sa.Column('inventory_domain', sa.Text),
+                        sa.Column('first_seen', sa.DateTime, server_default=sa.text("now()")),
+                        sa.Column('last_seen', sa.DateTime, server_default=sa.text("now()"))
+                        )
+
+        # The names are unbounded, above the size of a btree entry, so the index is on their digest
+        op.create_index('asset_inventory_client_type_name_idx', 'asset_inventory',
+                        ['client_id', 'asset_type_id', sa.text('md5(inventory_name)')], unique=True)
+
+        op.create_index('asset_inventory_client_ip_idx', 'asset_inventory', ['client_id', 'inventory_ip'])
+        op.create_index('asset_inventory_client_domain_idx', 'asset_inventory', ['client_id', 'inventory_domain'])
+
+    if not _table_has_column('case_assets', 'asset_inventory_id'):
+        op.add_column('case_assets',
+                      sa.Column('asset_inventory_id', sa.BigInteger,
+                                sa.ForeignKey('asset_inventory.inventory_id'), nullable=True)
+                      )
+
+    if not _table_has_index('case_assets', 'ix_case_assets_asset_inventory_id'):
+        op.create_index('ix_case_assets_asset_inventory_id', 'case_assets', ['asset_inventory_id'])
+
+    # Build the inventory from the existing assets, and link them to it
+    op.execute(f"""
+        INSERT INTO asset_inventory (client_id, asset_type_id, inventory_name, inventory_ip, inventory_domain,
+                                     first_seen, last_seen)
+        SELECT cases.client_id, case_assets.asset_type_id, {_normalize('case_assets.asset_name')},
+               max(nullif({_normalize('case_assets.asset_ip')}, '')),
+               max(nullif({_normalize('case_assets.asset_domain')}, '')),
+               coalesce(min(case_assets.date_added), now()), coalesce(max(case_assets.date_update), now())
+        FROM case_assets
+        JOIN cases ON cases.case_id = case_assets.case_id
+        WHERE case_assets.asset_inventory_id IS NULL
+          AND case_assets.asset_type_id IS NOT NULL
+          AND nullif({_normalize('case_assets.asset_name')}, '') IS NOT NULL
+        GROUP BY cases.client_id, case_assets.asset_type_id, {_normalize('case_assets.asset_name')}
+        ON CONFLICT (client_id, asset_type_id, md5(inventory_name)) DO NOTHING;
+    """)
+
+    op.execute(f"""
+        UPDATE case_assets
+        SET asset_inventory_id = asset_inventory.inventory_id
+        FROM cases, asset_inventory
+        WHERE cases.case_id = case_assets.case_id
+          AND asset_inventory.client_id = cases.client_id
+          AND asset_inventory.asset_type_id = case_assets.asset_type_id
+          AND asset_inventory.inventory_name = {_normalize('case_assets.asset_name')}
+          AND case_assets.asset_inventory_id IS NULL;
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_case_assets_asset_inventory_id', table_name='case_assets')
+    op.drop_column('case_assets', 'asset_inventory_id')
+    op.drop_table('asset_inventory')
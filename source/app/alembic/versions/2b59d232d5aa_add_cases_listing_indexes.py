@@ -0,0 +1,37 @@
+"""Add cases listing indexes
+
+Revision ID: 2b59d232d5aa
+Revises: d853a2840149
+Create Date: 2023-04-04 14:38:09.275103
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _table_has_index
+
+# revision identifiers, used by Alembic.
+revision = '2b59d232d5aa'
+down_revision = 'd853a2840149'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+
+    for column in ['open_date', 'close_date', 'name', 'soc_id']:
+        if not _table_has_index('cases', f'cases_{column}_idx'):
+            op.create_index(f'cases_{column}_idx', 'cases', [column])
+
+    for column in ['name', 'soc_id']:
+        if not _table_has_index('cases', f'cases_{column}_trgm_idx'):
+            op.create_index(f'cases_{column}_trgm_idx', 'cases', [column],
+                            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for column in ['open_date', 'close_date', 'name', 'soc_id']:
+        op.drop_index(f'cases_{column}_idx', table_name='cases')
+
+    for column in ['name', 'soc_id']:
+        op.drop_index(f'cases_{column}_trgm_idx', table_name='cases')
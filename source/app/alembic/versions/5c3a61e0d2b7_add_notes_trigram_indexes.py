@@ -0,0 +1,31 @@
+"""Add notes trigram indexes
+
+Revision ID: 5c3a61e0d2b7
+Revises: 2b59d232d5aa
+Create Date: 2023-04-05 09:21:37.604118
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _table_has_index
+
+# revision identifiers, used by Alembic.
+revision = '5c3a61e0d2b7'
+down_revision = '2b59d232d5aa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+
+    # Back the substring matching of the notes search, next to the full-text index
+    for column in ['note_title', 'note_content']:
+        if not _table_has_index('notes', f'notes_{column}_trgm_idx'):
+            op.create_index(f'notes_{column}_trgm_idx', 'notes', [column],
+                            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for column in ['note_title', 'note_content']:
+        op.drop_index(f'notes_{column}_trgm_idx', table_name='notes')
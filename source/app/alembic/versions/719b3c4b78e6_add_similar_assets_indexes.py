@@ -0,0 +1,30 @@
+"""Add similar assets indexes
+
+Revision ID: 719b3c4b78e6
+Revises: 9a4de34c8508
+Create Date: 2023-03-22 14:05:48.118720
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _table_has_index
+
+# revision identifiers, used by Alembic.
+revision = '719b3c4b78e6'
+down_revision = '9a4de34c8508'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not _table_has_index('case_assets', 'case_assets_name_type_idx'):
+        op.create_index('case_assets_name_type_idx', 'case_assets', ['asset_name', 'asset_type_id'])
+
+    if not _table_has_index('user_case_effective_access', 'user_case_effective_access_user_case_idx'):
+        op.create_index('user_case_effective_access_user_case_idx', 'user_case_effective_access',
+                        ['user_id', 'case_id'])
+
+
+def downgrade():
+    op.drop_index('case_assets_name_type_idx', table_name='case_assets')
+    op.drop_index('user_case_effective_access_user_case_idx', table_name='user_case_effective_access')
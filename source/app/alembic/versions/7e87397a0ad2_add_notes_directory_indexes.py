@@ -0,0 +1,29 @@
+"""Add notes directory indexes
+
+Revision ID: 7e87397a0ad2
+Revises: eaa8e846f4d0
+Create Date: 2023-03-28 15:20:04.661927
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _table_has_index
+
+# revision identifiers, used by Alembic.
+revision = '7e87397a0ad2'
+down_revision = 'eaa8e846f4d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not _table_has_index('notes_group', 'ix_notes_group_group_case_id'):
+        op.create_index('ix_notes_group_group_case_id', 'notes_group', ['group_case_id'])
+
+    if not _table_has_index('notes_group_link', 'notes_group_link_case_group_idx'):
+        op.create_index('notes_group_link_case_group_idx', 'notes_group_link', ['case_id', 'group_id'])
+
+
+def downgrade():
+    op.drop_index('ix_notes_group_group_case_id', table_name='notes_group')
+    op.drop_index('notes_group_link_case_group_idx', table_name='notes_group_link')
@@ -0,0 +1,111 @@
+"""Add IOC normalized value
+
+Revision ID: 9a4de34c8508
+Revises: c959c298ca00
+Create Date: 2023-03-20 10:12:31.482156
+
+"""
+import logging
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.alembic.alembic_utils import _table_has_column
+from app.alembic.alembic_utils import _table_has_index
+from app.iris_engine.utils.common import normalize_ioc_value
+
+# revision identifiers, used by Alembic.
+revision = '9a4de34c8508'
+down_revision = 'c959c298ca00'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger('alembic.runtime.migration')
+
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    if not _table_has_column('ioc', 'ioc_value_normalized'):
+        op.add_column('ioc',
+                      sa.Column('ioc_value_normalized', sa.Text)
+                      )
+
+    ioc_table = sa.Table(
+        'ioc',
+        sa.MetaData(),
+        sa.Column('ioc_id', sa.BigInteger, primary_key=True),
+        sa.Column('ioc_value', sa.Text),
+        sa.Column('ioc_value_normalized', sa.Text),
+        sa.Column('ioc_type_id', sa.Integer)
+    )
+
+    ioc_type_table = sa.Table(
+        'ioc_type',
+        sa.MetaData(),
+        sa.Column('type_id', sa.Integer, primary_key=True),
+        sa.Column('type_name', sa.Text)
+    )
+
+    types_map = {row.type_id: row.type_name for row in conn.execute(sa.select([ioc_type_table]))}
+
+    # Backfill by batches, keyed on the IOC ID so each batch is an index range scan
+    update_stmt = ioc_table.update().where(
+        ioc_table.c.ioc_id == sa.bindparam('b_ioc_id')
+    ).values(ioc_value_normalized=sa.bindparam('b_normalized'))
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select([ioc_table.c.ioc_id, ioc_table.c.ioc_value, ioc_table.c.ioc_type_id])
+            .where(ioc_table.c.ioc_id > last_id)
+            .where(ioc_table.c.ioc_value_normalized.is_(None))
+            .order_by(ioc_table.c.ioc_id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+
+        if not rows:
+            break
+
+        conn.execute(update_stmt, [
+            {
+                'b_ioc_id': row.ioc_id,
+                'b_normalized': normalize_ioc_value(row.ioc_value, types_map.get(row.ioc_type_id))
+            } for row in rows
+        ])
+
+        last_id = rows[-1].ioc_id
+
+    # Report the IOCs that already collide once normalized. They have to be merged manually
+    # before the unique constraint can be enforced
+    duplicates = conn.execute(
+        sa.select([
+            ioc_table.c.ioc_value_normalized,
+            ioc_table.c.ioc_type_id,
+            sa.func.array_agg(ioc_table.c.ioc_id).label('ioc_ids')
+        ])
+        .where(ioc_table.c.ioc_value_normalized.isnot(None))
+        .group_by(ioc_table.c.ioc_value_normalized, ioc_table.c.ioc_type_id)
+        .having(sa.func.count(ioc_table.c.ioc_id) > 1)
+    ).fetchall()
+
+    for duplicate in duplicates:
+        log.warning(f'Duplicated IOC "{duplicate.ioc_value_normalized}" '
+                    f'(type {types_map.get(duplicate.ioc_type_id)}): IOC IDs {sorted(duplicate.ioc_ids)}')
+
+    if not _table_has_index('ioc', 'ioc_value_normalized_type_idx'):
+        if duplicates:
+            log.warning(f'{len(duplicates)} duplicated IOCs found. Creating a non-unique index on the normalized '
+                        f'values. Merge the duplicates and recreate the index as unique to enforce unicity.')
+
+        # The values are unbounded, above the size of a btree entry, so the index is on their digest
+        op.create_index('ioc_value_normalized_type_idx', 'ioc',
+                        [sa.text('md5(ioc_value_normalized)'), 'ioc_type_id'],
+                        unique=not duplicates)
+
+
+def downgrade():
+    op.drop_index('ioc_value_normalized_type_idx', table_name='ioc')
+    op.drop_column('ioc', 'ioc_value_normalized')
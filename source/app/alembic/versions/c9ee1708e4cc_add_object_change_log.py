@@ -0,0 +1,38 @@
+"""Add object change log
+
+Revision ID: c9ee1708e4cc
+Revises: fb6225299a4f
+Create Date: 2023-03-30 16:03:27.291644
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from app.alembic.alembic_utils import _has_table
+
+# revision identifiers, used by Alembic.
+revision = 'c9ee1708e4cc'
+down_revision = 'fb6225299a4f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not _has_table('object_change'):
+        op.create_table('object_change',
+                        sa.Column('change_id', sa.BigInteger(), primary_key=True, nullable=False),
+                        sa.Column('object_case_id', sa.BigInteger(), sa.ForeignKey('cases.case_id'),
+                                  nullable=False),
+                        sa.Column('object_name', sa.Text(), nullable=False),
+                        sa.Column('object_id', sa.BigInteger()),
+                        sa.Column('object_operation', sa.Text(), nullable=False),
+                        sa.Column('object_state', sa.BigInteger(), nullable=False),
+                        sa.Column('change_date', sa.TIMESTAMP()),
+                        keep_existing=True
+                        )
+        op.create_index('object_change_case_name_state_idx', 'object_change',
+                        ['object_case_id', 'object_name', 'object_state'])
+
+
+def downgrade():
+    op.drop_table('object_change')
@@ -0,0 +1,140 @@
+"""Add dashboard counters
+
+Revision ID: d853a2840149
+Revises: f3dfbd3fb369
+Create Date: 2023-04-03 09:12:41.530218
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from app.alembic.alembic_utils import _has_table
+from app.alembic.alembic_utils import _table_has_index
+
+# revision identifiers, used by Alembic.
+revision = 'd853a2840149'
+down_revision = 'f3dfbd3fb369'
+branch_labels = None
+depends_on = None
+
+# Counter name and the condition a case row r has to meet to be counted
+CASES_COUNTERS = [
+    ('cases_count', 'TRUE'),
+    ('cases_open_count', 'r.close_date IS NULL')
+]
+
+
+def _count_rows(rows, condition):
+    return f"(SELECT count(*) FROM {rows} r WHERE {condition})"
+
+
+def _create_trigger(table, event, body, declare=''):
+    # Statement level triggers with transition tables, so bulk statements update the counters once
+    name = f'iris_dashboard_{table}_{event.lower()}'
+    referencing = {
+        'INSERT': 'NEW TABLE AS new_rows',
+        'UPDATE': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+        'DELETE': 'OLD TABLE AS old_rows'
+    }[event]
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$
+        {f'DECLARE {declare}' if declare else ''}
+        BEGIN
+            {body}
+            RETURN NULL;
+        END;
+        $$;
+    """)
+    op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table};")
+    op.execute(f"""
+        CREATE TRIGGER {name} AFTER {event} ON {table}
+        REFERENCING {referencing}
+        FOR EACH STATEMENT EXECUTE FUNCTION {name}();
+    """)
+
+
+def _drop_trigger(table, event):
+    name = f'iris_dashboard_{table}_{event.lower()}'
+    op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table};")
+    op.execute(f"DROP FUNCTION IF EXISTS {name}();")
+
+
+def _update_counters(delta):
+    # The counter rows are only locked when they change, so the case updates leaving them
+    # untouched aren't serialized
+    return "\n".join(
+        f"""
+        delta := {delta(condition)};
+        IF delta <> 0 THEN
+            UPDATE dashboard_counter SET counter_value = counter_value + delta WHERE counter_name = '{name}';
+        END IF;
+        """
+        for name, condition in CASES_COUNTERS
+    )
+
+
+def _create_counters_trigger(table, event, delta):
+    _create_trigger(table, event, _update_counters(delta), declare='delta bigint;')
+
+
+def upgrade():
+    if not _has_table('dashboard_counter'):
+        op.create_table('dashboard_counter',
+                        sa.Column('counter_name', sa.Text(), primary_key=True, nullable=False),
+                        sa.Column('counter_value', sa.BigInteger(), nullable=False, server_default='0')
+                        )
+
+    if not _has_table('user_case_activity'):
+        op.create_table('user_case_activity',
+                        sa.Column('user_id', sa.BigInteger(), sa.ForeignKey('user.id', ondelete='CASCADE'),
+                                  primary_key=True, nullable=False),
+                        sa.Column('case_id', sa.BigInteger(), sa.ForeignKey('cases.case_id', ondelete='CASCADE'),
+                                  primary_key=True, nullable=False)
+                        )
+
+    if not _table_has_index('user_case_activity', 'ix_user_case_activity_case_id'):
+        op.create_index('ix_user_case_activity_case_id', 'user_case_activity', ['case_id'])
+
+    _create_counters_trigger('cases', 'INSERT',
+                             lambda condition: _count_rows('new_rows', condition))
+    _create_counters_trigger('cases', 'UPDATE',
+                             lambda condition: f"{_count_rows('new_rows', condition)} - "
+                                               f"{_count_rows('old_rows', condition)}")
+    _create_counters_trigger('cases', 'DELETE',
+                             lambda condition: f"- {_count_rows('old_rows', condition)}")
+
+    _create_trigger('user_activity', 'INSERT', """
+        INSERT INTO user_case_activity (user_id, case_id)
+        SELECT DISTINCT r.user_id, r.case_id FROM new_rows r
+        WHERE r.user_id IS NOT NULL AND r.case_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    """)
+
+    # Count what already exists. Done after the triggers are created, under the lock taken on the
+    # tables, so no change happening meanwhile is lost.
+    op.execute("LOCK TABLE cases, user_activity IN SHARE ROW EXCLUSIVE MODE;")
+    for name, condition in CASES_COUNTERS:
+        op.execute(f"""
+            INSERT INTO dashboard_counter (counter_name, counter_value)
+            SELECT '{name}', {_count_rows('cases', condition)}
+            ON CONFLICT (counter_name) DO UPDATE SET counter_value = EXCLUDED.counter_value;
+        """)
+
+    op.execute("""
+        INSERT INTO user_case_activity (user_id, case_id)
+        SELECT DISTINCT ua.user_id, ua.case_id FROM user_activity ua
+        JOIN cases c ON c.case_id = ua.case_id
+        JOIN "user" u ON u.id = ua.user_id
+        ON CONFLICT DO NOTHING;
+    """)
+
+
+def downgrade():
+    for event in ['INSERT', 'UPDATE', 'DELETE']:
+        _drop_trigger('cases', event)
+
+    _drop_trigger('user_activity', 'INSERT')
+
+    op.drop_table('user_case_activity')
+    op.drop_table('dashboard_counter')
@@ -0,0 +1,36 @@
+"""Add notes full-text search vector
+
+Revision ID: eaa8e846f4d0
+Revises: 134528e9415d
+Create Date: 2023-03-27 11:02:45.317904
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _table_has_column
+from app.alembic.alembic_utils import _table_has_index
+
+# revision identifiers, used by Alembic.
+revision = 'eaa8e846f4d0'
+down_revision = '134528e9415d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Generated column, so it is maintained by the database on every insert and update of a note
+    if not _table_has_column('notes', 'note_search_vector'):
+        op.execute("""
+            ALTER TABLE notes ADD COLUMN note_search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple'::regconfig, coalesce(note_title, '')), 'A') ||
+                setweight(to_tsvector('simple'::regconfig, left(coalesce(note_content, ''), 500000)), 'B')
+            ) STORED;
+        """)
+
+    if not _table_has_index('notes', 'notes_search_vector_idx'):
+        op.create_index('notes_search_vector_idx', 'notes', ['note_search_vector'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('notes_search_vector_idx', table_name='notes')
+    op.drop_column('notes', 'note_search_vector')
@@ -0,0 +1,198 @@
+"""Add search documents
+
+Revision ID: f3dfbd3fb369
+Revises: c9ee1708e4cc
+Create Date: 2023-03-31 10:27:52.806413
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from app.alembic.alembic_utils import _has_table
+from app.alembic.alembic_utils import _table_has_index
+
+# revision identifiers, used by Alembic.
+revision = 'f3dfbd3fb369'
+down_revision = 'c9ee1708e4cc'
+branch_labels = None
+depends_on = None
+
+SEARCH_DOCUMENT_VECTOR_EXPRESSION = "setweight(to_tsvector('simple'::regconfig, coalesce(document_title, '')), 'A') || " \
+                                    "setweight(to_tsvector('simple'::regconfig, " \
+                                    "left(coalesce(document_content, ''), 500000)), 'B')"
+
+# Objects owned by a case: object type, table, ID column, case column, title and content expressions of a row r
+CASE_SOURCES = [
+    ('note', 'notes', 'note_id', 'note_case_id',
+     "r.note_title",
+     "r.note_content"),
+    ('comment', 'comments', 'comment_id', 'comment_case_id',
+     "left(r.comment_text, 200)",
+     "r.comment_text"),
+    ('event', 'cases_events', 'event_id', 'case_id',
+     "r.event_title",
+     "concat_ws(' ', r.event_content, r.event_source, r.event_tags, r.event_raw)"),
+    ('asset', 'case_assets', 'asset_id', 'case_id',
+     "r.asset_name",
+     "concat_ws(' ', r.asset_description, r.asset_ip, r.asset_domain, r.asset_tags)")
+]
+
+IOC_TITLE = "i.ioc_value"
+IOC_CONTENT = "concat_ws(' ', i.ioc_description, i.ioc_tags)"
+
+
+def _upsert(select_sql):
+    return f"""
+        INSERT INTO search_document (object_type, object_id, case_id, document_title, document_content,
+                                     document_update)
+        {select_sql}
+        ON CONFLICT (object_type, object_id, case_id) DO UPDATE SET
+            document_title = EXCLUDED.document_title,
+            document_content = EXCLUDED.document_content,
+            document_update = EXCLUDED.document_update;
+    """
+
+
+def _case_source_select(object_type, rows, id_column, case_column, title, content):
+    return f"SELECT '{object_type}', r.{id_column}, r.{case_column}, {title}, left({content}, 500000), now() " \
+           f"FROM {rows} r WHERE r.{case_column} IS NOT NULL"
+
+
+def _ioc_select(rows):
+    return f"SELECT 'ioc', i.ioc_id, l.case_id, {IOC_TITLE}, left({IOC_CONTENT}, 500000), now() " \
+           f"FROM {rows} l JOIN ioc i ON i.ioc_id = l.ioc_id"
+
+
+def _create_trigger(table, event, body):
+    # Statement level triggers with transition tables, so bulk statements are indexed with one query
+    name = f'iris_search_{table}_{event.lower()}'
+    referencing = {
+        'INSERT': 'NEW TABLE AS new_rows',
+        'UPDATE': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+        'DELETE': 'OLD TABLE AS old_rows'
+    }[event]
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            {body}
+            RETURN NULL;
+        END;
+        $$;
+    """)
+    op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table};")
+    op.execute(f"""
+        CREATE TRIGGER {name} AFTER {event} ON {table}
+        REFERENCING {referencing}
+        FOR EACH STATEMENT EXECUTE FUNCTION {name}();
+    """)
+
+
+def _drop_trigger(table, event):
+    name = f'iris_search_{table}_{event.lower()}'
+    op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table};")
+    op.execute(f"DROP FUNCTION IF EXISTS {name}();")
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+
+    if not _has_table('search_document'):
+        op.create_table('search_document',
+                        sa.Column('document_id', sa.BigInteger(), primary_key=True, nullable=False),
+                        sa.Column('object_type', sa.Text(), nullable=False),
+                        sa.Column('object_id', sa.BigInteger(), nullable=False),
+                        sa.Column('case_id', sa.BigInteger(), sa.ForeignKey('cases.case_id', ondelete='CASCADE'),
+                                  nullable=False),
+                        sa.Column('document_title', sa.Text()),
+                        sa.Column('document_content', sa.Text()),
+                        sa.Column('document_update', sa.DateTime()),
+                        sa.Column('document_vector', TSVECTOR(),
+                                  sa.Computed(SEARCH_DOCUMENT_VECTOR_EXPRESSION, persisted=True)),
+                        sa.UniqueConstraint('object_type', 'object_id', 'case_id',
+                                            name='search_document_object_key')
+                        )
+
+    if not _table_has_index('search_document', 'search_document_vector_idx'):
+        op.create_index('search_document_vector_idx', 'search_document', ['document_vector'],
+                        postgresql_using='gin')
+
+    if not _table_has_index('search_document', 'search_document_title_trgm_idx'):
+        op.create_index('search_document_title_trgm_idx', 'search_document', ['document_title'],
+                        postgresql_using='gin', postgresql_ops={'document_title': 'gin_trgm_ops'})
+
+    if not _table_has_index('search_document', 'search_document_case_type_idx'):
+        op.create_index('search_document_case_type_idx', 'search_document', ['case_id', 'object_type'])
+
+    for object_type, table, id_column, case_column, title, content in CASE_SOURCES:
+        _create_trigger(table, 'INSERT',
+                        _upsert(_case_source_select(object_type, 'new_rows', id_column, case_column,
+                                                    title, content)))
+
+        _create_trigger(table, 'UPDATE', f"""
+            DELETE FROM search_document d
+            USING old_rows o JOIN new_rows n ON n.{id_column} = o.{id_column}
+            WHERE o.{case_column} IS DISTINCT FROM n.{case_column}
+              AND d.object_type = '{object_type}'
+              AND d.object_id = o.{id_column}
+              AND d.case_id = o.{case_column};
+            {_upsert(_case_source_select(object_type, 'new_rows', id_column, case_column, title, content))}
+        """)
+
+        _create_trigger(table, 'DELETE', f"""
+            DELETE FROM search_document d
+            USING old_rows o
+            WHERE d.object_type = '{object_type}'
+              AND d.object_id = o.{id_column}
+              AND d.case_id = o.{case_column};
+        """)
+
+        # Index what already exists
+        op.execute(_upsert(_case_source_select(object_type, table, id_column, case_column, title, content)))
+
+    # IOCs are shared between cases, they have a document in each case they are linked to
+    _create_trigger('ioc_link', 'INSERT', _upsert(_ioc_select('new_rows')))
+
+    _ioc_link_delete = """
+        DELETE FROM search_document d
+        USING old_rows o
+        WHERE d.object_type = 'ioc'
+          AND d.object_id = o.ioc_id
+          AND d.case_id = o.case_id;
+    """
+    _create_trigger('ioc_link', 'UPDATE', _ioc_link_delete + _upsert(_ioc_select('new_rows')))
+    _create_trigger('ioc_link', 'DELETE', _ioc_link_delete)
+
+    _create_trigger('ioc', 'UPDATE', f"""
+        UPDATE search_document d SET
+            document_title = {IOC_TITLE},
+            document_content = left({IOC_CONTENT}, 500000),
+            document_update = now()
+        FROM new_rows i
+        WHERE d.object_type = 'ioc'
+          AND d.object_id = i.ioc_id;
+    """)
+
+    _create_trigger('ioc', 'DELETE', """
+        DELETE FROM search_document d
+        USING old_rows o
+        WHERE d.object_type = 'ioc'
+          AND d.object_id = o.ioc_id;
+    """)
+
+    op.execute(_upsert(_ioc_select('ioc_link')))
+
+
+def downgrade():
+    for _, table, _, _, _, _ in CASE_SOURCES:
+        for event in ['INSERT', 'UPDATE', 'DELETE']:
+            _drop_trigger(table, event)
+
+    for event in ['INSERT', 'UPDATE', 'DELETE']:
+        _drop_trigger('ioc_link', event)
+
+    for event in ['UPDATE', 'DELETE']:
+        _drop_trigger('ioc', event)
+
+    op.drop_table('search_document')
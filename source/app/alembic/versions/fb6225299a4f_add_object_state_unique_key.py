@@ -0,0 +1,37 @@
+"""Add object state unique key
+
+Revision ID: fb6225299a4f
+Revises: 002081e6ed8e
+Create Date: 2023-03-30 09:12:41.508213
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _table_has_index
+
+# revision identifiers, used by Alembic.
+revision = 'fb6225299a4f'
+down_revision = '002081e6ed8e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if _table_has_index('object_state', 'object_state_case_name_key'):
+        return
+
+    # Concurrent updates may have created duplicated states, only the most advanced one is kept
+    op.execute(
+        "DELETE FROM object_state os USING object_state other "
+        "WHERE os.object_case_id = other.object_case_id "
+        "AND os.object_name = other.object_name "
+        "AND (os.object_state < other.object_state "
+        "OR (os.object_state = other.object_state AND os.object_id < other.object_id))"
+    )
+
+    op.create_unique_constraint('object_state_case_name_key', 'object_state',
+                                ['object_case_id', 'object_name'])
+
+
+def downgrade():
+    op.drop_constraint('object_state_case_name_key', 'object_state', type_='unique')
@@ -29,19 +29,24 @@ from flask import render_template
 from flask import request
 from flask import url_for
 from flask_login import current_user
+from sqlalchemy.exc import SQLAlchemyError
 
+from app import app
 from app import db
 from app.blueprints.case.case_comments import case_comment_update
 from app.datamgmt.case.case_assets_db import add_comment_to_asset
+from app.datamgmt.case.case_assets_db import bulk_create_assets
 from app.datamgmt.case.case_assets_db import create_asset
 from app.datamgmt.case.case_assets_db import delete_asset
 from app.datamgmt.case.case_assets_db import delete_asset_comment
 from app.datamgmt.case.case_assets_db import get_analysis_status_list
 from app.datamgmt.case.case_assets_db import get_asset
-from app.datamgmt.case.case_assets_db import get_asset_type_id
+from app.datamgmt.case.case_assets_db import get_asset_inventory_history
 from app.datamgmt.case.case_assets_db import get_assets
+from app.datamgmt.case.case_assets_db import get_assets_by_ids
 from app.datamgmt.case.case_assets_db import get_assets_ioc_links
 from app.datamgmt.case.case_assets_db import get_assets_types
+from app.datamgmt.case.case_assets_db import get_assets_types_map
 from app.datamgmt.case.case_assets_db import get_case_asset_comment
 from app.datamgmt.case.case_assets_db import get_case_asset_comments
 from app.datamgmt.case.case_assets_db import get_case_assets_comments_count
@@ -49,12 +54,13 @@ from app.datamgmt.case.case_assets_db import get_compromise_status_list
 from app.datamgmt.case.case_assets_db import get_linked_iocs_finfo_from_asset
 from app.datamgmt.case.case_assets_db import get_linked_iocs_id_from_asset
 from app.datamgmt.case.case_assets_db import get_similar_assets
+from app.datamgmt.case.case_assets_db import link_asset_to_inventory
 from app.datamgmt.case.case_assets_db import set_ioc_links
 from app.datamgmt.case.case_db import get_case
-from app.datamgmt.case.case_db import get_case_client_id
+from app.datamgmt.case.case_iocs_db import get_case_iocs_values_map
 from app.datamgmt.case.case_iocs_db import get_iocs
 from app.datamgmt.manage.manage_attribute_db import get_default_custom_attributes
-from app.datamgmt.manage.manage_users_db import get_user_cases_fast
+from app.datamgmt.states import get_assets_changes
 from app.datamgmt.states import get_assets_state
 from app.datamgmt.states import update_assets_state
 from app.forms import AssetBasicForm
@@ -74,6 +80,8 @@ case_assets_blueprint = Blueprint('case_assets',
                                   __name__,
                                   template_folder='templates')
 
+log = app.logger
+
 
 @case_assets_blueprint.route('/case/assets', methods=['GET'])
 @ac_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
@@ -95,22 +103,11 @@ def case_assets(caseid, url_redir):
     return render_template("case_assets.html", case=case, form=form)
 
 
-@case_assets_blueprint.route('/case/assets/list', methods=['GET'])
-@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
-def case_list_assets(caseid):
-    """
-    Returns the list of assets from the case.
-    :return: A JSON object containing the assets of the case, enhanced with assets seen on other cases.
-    """
-
-    # Get all assets objects from the case and the customer id
-    assets = get_assets(caseid)
-    customer_id = get_case_client_id(caseid)
-
-    ret = {}
-    ret['assets'] = []
+def _get_assets_rows(caseid, assets_ids=None):
+    # Get the assets objects from the case and the customer id
+    assets = get_assets(caseid, assets_ids=assets_ids)
 
-    ioc_links_req = get_assets_ioc_links(caseid)
+    ioc_links_req = get_assets_ioc_links(caseid, assets_ids=assets_ids)
 
     cache_ioc_link = {}
     for ioc in ioc_links_req:
@@ -120,27 +117,68 @@ def case_list_assets(caseid):
         else:
             cache_ioc_link[ioc.asset_id].append(ioc._asdict())
 
-    cases_access = get_user_cases_fast(current_user.id)
+    # Find similar assets from other cases with the same customer
+    similar_assets = get_similar_assets(caseid, current_user.id, assets_ids=assets_ids)
 
+    rows = []
     for asset in assets:
         asset = asset._asdict()
 
-        if len(assets) < 300:
-            # Find similar assets from other cases with the same customer
-            asset['link'] = list(get_similar_assets(
-                asset['asset_name'], asset['asset_type_id'], caseid, customer_id, cases_access))
-        else:
-            asset['link'] = []
+        asset['link'] = similar_assets.get(asset['asset_id'], [])
 
         asset['ioc_links'] = cache_ioc_link.get(asset['asset_id'])
 
-        ret['assets'].append(asset)
+        rows.append(asset)
+
+    return rows
+
+
+@case_assets_blueprint.route('/case/assets/list', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def case_list_assets(caseid):
+    """
+    Returns the list of assets from the case.
+    :return: A JSON object containing the assets of the case, enhanced with assets seen on other cases.
+    """
 
+    ret = {}
+    ret['assets'] = _get_assets_rows(caseid)
     ret['state'] = get_assets_state(caseid=caseid)
 
     return response_success("", data=ret)
 
 
+@case_assets_blueprint.route('/case/assets/changes', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def case_list_assets_changes(caseid):
+    """
+    Returns the assets changed since a state of the assets of the case, so the clients can patch their list.
+    :return: A JSON object with the current state, the changed assets and the IDs of the deleted ones. reset is
+             set when the changes aren't known and the whole list has to be reloaded.
+    """
+    since = request.args.get('since', type=int)
+    if since is None:
+        return response_error('Missing or invalid since state', status=400)
+
+    changes = get_assets_changes(caseid=caseid, since_state=since)
+    if changes is None:
+        return response_error('No assets state for this case.')
+
+    ret = {
+        'state': changes['state'],
+        'reset': changes['reset'],
+        'assets': [],
+        'deleted': []
+    }
+
+    if changes['object_ids']:
+        ret['assets'] = _get_assets_rows(caseid, assets_ids=changes['object_ids'])
+        found_ids = {row['asset_id'] for row in ret['assets']}
+        ret['deleted'] = [asset_id for asset_id in changes['object_ids'] if asset_id not in found_ids]
+
+    return response_success("", data=ret)
+
+
 @case_assets_blueprint.route('/case/assets/state', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
 def case_assets_state(caseid):
@@ -203,101 +241,185 @@ def add_asset(caseid):
         return response_error(msg="Data error", data=e.messages, status=400)
 
 
-@case_assets_blueprint.route('/case/assets/upload', methods=['POST'])
-@ac_api_case_requires(CaseAccessLevel.full_access)
-def case_upload_ioc(caseid):
+ASSETS_CSV_HEADERS = "asset_name,asset_type_name,asset_description,asset_ip,asset_domain,asset_tags"
 
-    try:
-        # validate before saving
-        add_asset_schema = CaseAssetsSchema()
-        jsdata = request.get_json()
+# Fields of an imported row inserted in the assets table
+ASSETS_CSV_FIELDS = ('asset_name', 'asset_type_id', 'asset_description', 'asset_ip', 'asset_domain', 'asset_tags',
+                     'analysis_status_id', 'ioc_links')
 
-        # get IOC list from request
-        csv_lines = jsdata["CSVData"].splitlines() # unavoidable since the file is passed as a string
 
-        headers = "asset_name,asset_type_name,asset_description,asset_ip,asset_domain,asset_tags"
+def _parse_assets_csv(csv_lines, assets_types, case_iocs, analysis_status_id):
+    """
+    Validate the rows of an assets CSV file
 
-        if csv_lines[0].lower() != headers:
-            csv_lines.insert(0, headers)
+    :param csv_lines: Lines of the file. The header line is optional
+    :param assets_types: Dict of the lowered assets types names to their IDs
+    :param case_iocs: Dict of the lowered values of the case IOCs to their IDs
+    :param analysis_status_id: Analysis status set on the imported assets
+    :return: Tuple of the list of the valid rows, and the list of the errors with the index of their row
+    """
+    # The IOCs linked to the assets are an optional trailing column
+    if not csv_lines[0].lower().startswith(ASSETS_CSV_HEADERS):
+        csv_lines.insert(0, ASSETS_CSV_HEADERS)
+
+    # convert list of strings into CSV
+    csv_data = csv.DictReader(csv_lines, delimiter=',')
+
+    rows = []
+    errors = []
+
+    for index, row in enumerate(csv_data):
+        missing_fields = [e for e in ASSETS_CSV_HEADERS.split(',') if row.get(e) is None]
+        if missing_fields:
+            errors.append({'row': index, 'error': f"{', '.join(missing_fields)} missing"})
+            continue
+
+        asset_name = row.get('asset_name').strip()
+        if len(asset_name) < 2:
+            errors.append({'row': index, 'error': "Empty or too short asset name"})
+            continue
+
+        if not row.get('asset_type_name'):
+            errors.append({'row': index, 'error': f"Empty asset type for {asset_name}"})
+            continue
+
+        type_id = assets_types.get(row['asset_type_name'].strip().lower())
+        if not type_id:
+            errors.append({'row': index, 'error': f"Invalid asset type {row.get('asset_type_name')} for {asset_name}"})
+            continue
+
+        ioc_links = []
+        unknown_iocs = []
+        for ioc_value in (row.get('asset_iocs') or '').split('|'):
+            if not ioc_value.strip():
+                continue
 
-        # convert list of strings into CSV
-        csv_data = csv.DictReader(csv_lines, delimiter=',')
+            ioc_id = case_iocs.get(ioc_value.strip().lower())
+            if ioc_id:
+                ioc_links.append(ioc_id)
+            else:
+                unknown_iocs.append(ioc_value.strip())
 
-        ret = []
-        errors = []
+        if unknown_iocs:
+            errors.append({'row': index, 'error': f"IOCs not found in the case for {asset_name}: "
+                                                  f"{', '.join(unknown_iocs)}. The asset is imported without them"})
 
-        analysis_status = AnalysisStatus.query.filter(AnalysisStatus.name == 'Unspecified').first()
-        analysis_status_id = analysis_status.id
+        rows.append({
+            'row': index,
+            'asset_name': asset_name,
+            'asset_type_id': type_id,
+            'asset_description': row.get('asset_description'),
+            'asset_ip': row.get('asset_ip'),
+            'asset_domain': row.get('asset_domain'),
+            'asset_tags': row.get('asset_tags').replace("|", ",") if row.get('asset_tags') else None,
+            'analysis_status_id': analysis_status_id,
+            'ioc_links': ioc_links
+        })
 
-        index = 0
-        for row in csv_data:
-            missing_field = False
-            for e in headers.split(','):
-                if row.get(e) is None:
-                    errors.append(f"{e} is missing for row {index}")
-                    missing_field = True
-                    continue
+    return rows, errors
 
-            if missing_field:
-                continue
 
-            # Asset name must not be empty
-            if not row.get("asset_name"):
-                errors.append(f"Empty asset name for row {index}")
-                track_activity(f"Attempted to upload an empty asset name")
-                index += 1
-                continue
+def _check_assets_rows(rows, assets_types_ids, analysis_status_ids):
+    """
+    Check the rows returned by the on_preload_asset_create hook, which modules may have modified
 
-            if row.get("asset_tags"):
-                row["asset_tags"] = row.get("asset_tags").replace("|", ",")  # Reformat Tags
+    :param rows: Rows of _parse_assets_csv, as returned by the hook
+    :param assets_types_ids: Set of the existing assets types IDs
+    :param analysis_status_ids: Set of the existing analysis status IDs
+    :return: Tuple of the list of the valid rows, and the list of the errors with the index of their row
+    """
+    valid_rows = []
+    errors = []
 
-            if not row.get('asset_type_name'):
-                errors.append(f"Empty asset type for row {index}")
-                track_activity(f"Attempted to upload an empty asset type")
-                index += 1
-                continue
+    for row in rows:
+        asset_name = row.get('asset_name')
+        if not isinstance(asset_name, str) or len(asset_name.strip()) < 2:
+            errors.append({'row': row.get('row'), 'error': "Empty or too short asset name"})
+            continue
 
-            type_id = get_asset_type_id(row['asset_type_name'].lower())
-            if not type_id:
-                errors.append(f"{row.get('asset_name')} (invalid asset type: {row.get('asset_type_name')}) for row {index}")
-                track_activity(f"Attempted to upload unrecognized asset type \"{row.get('asset_type_name')}\"")
-                index += 1
-                continue
+        if row.get('asset_type_id') not in assets_types_ids:
+            errors.append({'row': row.get('row'), 'error': f"Invalid asset type {row.get('asset_type_id')} "
+                                                           f"for {asset_name}"})
+            continue
 
-            row['asset_type_id'] = type_id.asset_id
-            row.pop('asset_type_name', None)
+        if row.get('analysis_status_id') not in analysis_status_ids:
+            errors.append({'row': row.get('row'), 'error': f"Invalid analysis status "
+                                                           f"{row.get('analysis_status_id')} for {asset_name}"})
+            continue
 
-            row['analysis_status_id'] = analysis_status_id
+        valid_rows.append(row)
 
-            request_data = call_modules_hook('on_preload_asset_create', data=row, caseid=caseid)
-            asset_sc = add_asset_schema.load(request_data)
-            asset_sc.custom_attributes = get_default_custom_attributes('asset')
-            asset = create_asset(asset=asset_sc,
-                                 caseid=caseid,
-                                 user_id=current_user.id
-                                 )
+    return valid_rows, errors
 
-            asset = call_modules_hook('on_postload_asset_create', data=asset, caseid=caseid)
 
-            if not asset:
-                errors.append(f"Unable to add asset for internal reason")
-                index += 1
-                continue
+def _format_assets_import_errors(errors):
+    return "\n- ".join(f"row {error['row']}: {error['error']}" for error in errors)
 
-            ret.append(request_data)
-            track_activity(f"added asset {asset.asset_name}", caseid=caseid)
 
-            index += 1
+@case_assets_blueprint.route('/case/assets/upload', methods=['POST'])
+@ac_api_case_requires(CaseAccessLevel.full_access)
+def case_upload_ioc(caseid):
 
-        if len(errors) == 0:
-            msg = "Successfully imported data."
-        else:
-            msg = "Data is imported but we got errors with the following rows:\n- " + "\n- ".join(errors)
+    jsdata = request.get_json()
+    if not jsdata or not jsdata.get("CSVData"):
+        return response_error(msg="No CSV data provided")
 
-        return response_success(msg=msg, data=ret)
+    # get asset list from request
+    csv_lines = jsdata["CSVData"].splitlines() # unavoidable since the file is passed as a string
 
-    except marshmallow.exceptions.ValidationError as e:
-        return response_error(msg="Data error", data=e.messages, status=400)
+    # Everything the rows are validated against is resolved once for the whole file
+    assets_types = get_assets_types_map()
+    case_iocs = get_case_iocs_values_map(caseid)
+    custom_attributes = get_default_custom_attributes('asset')
+
+    analysis_status = AnalysisStatus.query.filter(AnalysisStatus.name == 'Unspecified').first()
+
+    rows, errors = _parse_assets_csv(csv_lines, assets_types, case_iocs, analysis_status.id)
+    if not rows:
+        return response_error(msg="No asset could be imported", data={'errors': errors})
+
+    rows = call_modules_hook('on_preload_asset_create', data=rows, caseid=caseid)
+
+    rows, hook_errors = _check_assets_rows(rows,
+                                           assets_types_ids=set(assets_types.values()),
+                                           analysis_status_ids={status_id for status_id, _ in
+                                                                get_analysis_status_list()})
+    errors.extend(hook_errors)
+    if not rows:
+        return response_error(msg="No asset could be imported", data={'errors': errors})
+
+    assets_rows = []
+    for row in rows:
+        asset_row = {k: v for k, v in row.items() if k in ASSETS_CSV_FIELDS}
+        asset_row['custom_attributes'] = custom_attributes
+        assets_rows.append(asset_row)
+
+    try:
+        assets_ids = bulk_create_assets(assets_rows=assets_rows,
+                                        caseid=caseid,
+                                        user_id=current_user.id)
+
+    except SQLAlchemyError as e:
+        # The import is a single transaction, none of the assets has been created
+        db.session.rollback()
+        log.exception(f"Unable to import the assets: {e}")
+
+        errors.append({'row': None, 'error': "Database error, none of the assets has been imported"})
+        return response_error(msg="No asset could be imported", data={'errors': errors})
+
+    call_modules_hook('on_postload_asset_create', data=get_assets_by_ids(assets_ids, caseid), caseid=caseid)
+
+    track_activity(f"imported {len(assets_ids)} assets", caseid=caseid)
+
+    if len(errors) == 0:
+        msg = "Successfully imported data."
+    else:
+        msg = "Data is imported but we got errors with the following rows:\n- " + _format_assets_import_errors(errors)
+
+    return response_success(msg=msg, data={
+        'imported': [{'row': row.get('row'), 'asset_id': asset_id} for row, asset_id in zip(rows, assets_ids)],
+        'errors': errors
+    })
 
 
 @case_assets_blueprint.route('/case/assets/<int:cur_id>', methods=['GET'])
@@ -320,6 +442,17 @@ def asset_view(cur_id, caseid):
     return response_success(data=data)
 
 
+@case_assets_blueprint.route('/case/assets/<int:cur_id>/inventory', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def asset_inventory_history(cur_id, caseid):
+
+    asset = get_asset(cur_id, caseid)
+    if not asset:
+        return response_error("Invalid asset ID for this case")
+
+    return response_success(data=get_asset_inventory_history(cur_id, caseid, current_user.id))
+
+
 @case_assets_blueprint.route('/case/assets/<int:cur_id>/modal', methods=['GET'])
 @ac_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
 def asset_view_modal(cur_id, caseid, url_redir):
@@ -370,7 +503,9 @@ def asset_update(cur_id, caseid):
         request_data['asset_id'] = cur_id
         asset_schema = add_asset_schema.load(request_data, instance=asset)
 
-        update_assets_state(caseid=caseid)
+        link_asset_to_inventory(asset_schema)
+
+        update_assets_state(caseid=caseid, object_ids=[cur_id])
         db.session.commit()
 
         if hasattr(asset_schema, 'ioc_links'):
@@ -38,11 +38,14 @@ from app.datamgmt.case.case_db import get_case
 from app.datamgmt.case.case_iocs_db import add_comment_to_ioc
 from app.datamgmt.case.case_iocs_db import add_ioc
 from app.datamgmt.case.case_iocs_db import add_ioc_link
+from app.datamgmt.case.case_iocs_db import bulk_delete_iocs
+from app.datamgmt.case.case_iocs_db import bulk_update_iocs
 from app.datamgmt.case.case_iocs_db import check_ioc_type_id
 from app.datamgmt.case.case_iocs_db import delete_ioc
 from app.datamgmt.case.case_iocs_db import delete_ioc_comment
 from app.datamgmt.case.case_iocs_db import get_case_ioc_comment
 from app.datamgmt.case.case_iocs_db import get_case_ioc_comments
+from app.datamgmt.case.case_iocs_db import get_bulk_iocs_ids
 from app.datamgmt.case.case_iocs_db import get_case_iocs_comments_count
 from app.datamgmt.case.case_iocs_db import get_detailed_iocs
 from app.datamgmt.case.case_iocs_db import get_ioc
@@ -51,7 +54,11 @@ from app.datamgmt.case.case_iocs_db import get_ioc_type_id
 from app.datamgmt.case.case_iocs_db import get_ioc_types_list
 from app.datamgmt.case.case_iocs_db import get_tlps
 from app.datamgmt.case.case_iocs_db import get_tlps_dict
+from app.datamgmt.case.case_iocs_db import set_ioc_normalized_value
 from app.datamgmt.manage.manage_attribute_db import get_default_custom_attributes
+from app.datamgmt.manage.manage_ioc_types_db import get_registered_ioc_type
+from app.datamgmt.manage.manage_ioc_types_db import is_registered_tlp
+from app.datamgmt.states import get_ioc_changes
 from app.datamgmt.states import get_ioc_state
 from app.datamgmt.states import update_ioc_state
 from app.forms import ModalAddCaseAssetForm
@@ -90,15 +97,9 @@ def case_ioc(caseid, url_redir):
     return render_template("case_ioc.html", case=case, form=form)
 
 
-@case_ioc_blueprint.route('/case/ioc/list', methods=['GET'])
-@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
-def case_list_ioc(caseid):
-    iocs = get_detailed_iocs(caseid)
-
-    ret = {}
-    ret['ioc'] = []
-
-    for ioc in iocs:
+def _get_iocs_rows(caseid, ioc_ids=None):
+    rows = []
+    for ioc in get_detailed_iocs(caseid, ioc_ids=ioc_ids):
         out = ioc._asdict()
 
         # Get links of the IoCs seen in other cases
@@ -108,13 +109,48 @@ def case_list_ioc(caseid):
         # Legacy, must be changed next version
         out['misp_link'] = None
 
-        ret['ioc'].append(out)
+        rows.append(out)
+
+    return rows
+
 
+@case_ioc_blueprint.route('/case/ioc/list', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def case_list_ioc(caseid):
+    ret = {}
+    ret['ioc'] = _get_iocs_rows(caseid)
     ret['state'] = get_ioc_state(caseid=caseid)
 
     return response_success("", data=ret)
 
 
+@case_ioc_blueprint.route('/case/ioc/changes', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def case_list_ioc_changes(caseid):
+    since = request.args.get('since', type=int)
+    if since is None:
+        return response_error('Missing or invalid since state', status=400)
+
+    changes = get_ioc_changes(caseid=caseid, since_state=since)
+    if changes is None:
+        return response_error('No IOC state for this case.')
+
+    ret = {
+        'state': changes['state'],
+        'reset': changes['reset'],
+        'ioc': [],
+        'deleted': []
+    }
+
+    if changes['object_ids']:
+        ret['ioc'] = _get_iocs_rows(caseid, ioc_ids=changes['object_ids'])
+        # The changed IOCs not in the case anymore were deleted or unlinked
+        found_ids = {row['ioc_id'] for row in ret['ioc']}
+        ret['deleted'] = [ioc_id for ioc_id in changes['object_ids'] if ioc_id not in found_ids]
+
+    return response_success("", data=ret)
+
+
 @case_ioc_blueprint.route('/case/ioc/state', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
 def case_ioc_state(caseid):
@@ -293,6 +329,122 @@ def case_delete_ioc(cur_id, caseid):
     return response_success(f"IOC {cur_id} deleted")
 
 
+def _get_bulk_iocs_ids_from_request(jsdata, caseid):
+    ioc_ids = jsdata.get('iocs')
+    ioc_filters = jsdata.get('filters')
+
+    if ioc_ids is None and not ioc_filters:
+        return None, "Either a list of IOCs or filters is required"
+
+    if ioc_ids is not None:
+        if not isinstance(ioc_ids, list):
+            return None, "IOCs must be a list of IDs"
+
+        try:
+            ioc_ids = [int(ioc_id) for ioc_id in ioc_ids]
+        except (TypeError, ValueError):
+            return None, "IOCs must be a list of IDs"
+
+    if ioc_filters is not None:
+        if not isinstance(ioc_filters, dict):
+            return None, "Filters must be an object"
+
+        ioc_filters = dict(ioc_filters)
+
+        if ioc_filters.get('ioc_type_id') is not None:
+            if not get_registered_ioc_type(ioc_filters['ioc_type_id']):
+                return None, "Not a valid IOC type in filters"
+            ioc_filters['ioc_type_id'] = int(ioc_filters['ioc_type_id'])
+
+        if ioc_filters.get('ioc_tlp_id') is not None:
+            if not is_registered_tlp(ioc_filters['ioc_tlp_id']):
+                return None, "Invalid TLP ID in filters"
+            ioc_filters['ioc_tlp_id'] = int(ioc_filters['ioc_tlp_id'])
+
+        if ioc_filters.get('ioc_tags') is not None and not isinstance(ioc_filters['ioc_tags'], str):
+            return None, "Tags filter must be a string"
+
+    return get_bulk_iocs_ids(caseid, ioc_ids=ioc_ids, ioc_filters=ioc_filters), None
+
+
+@case_ioc_blueprint.route('/case/ioc/bulk/delete', methods=['POST'])
+@ac_api_case_requires(CaseAccessLevel.full_access)
+def case_bulk_delete_ioc(caseid):
+    jsdata = request.get_json()
+    if not jsdata:
+        return response_error("Invalid request")
+
+    ioc_ids, error = _get_bulk_iocs_ids_from_request(jsdata, caseid)
+    if error:
+        return response_error(error)
+
+    if not ioc_ids:
+        return response_error("No IOC matching the request in this case")
+
+    call_modules_hook('on_preload_ioc_delete', data=ioc_ids, caseid=caseid)
+
+    deleted_ids, unlinked_ids = bulk_delete_iocs(ioc_ids, caseid)
+
+    if deleted_ids:
+        call_modules_hook('on_postload_ioc_delete', data=deleted_ids, caseid=caseid)
+
+    track_activity(f"bulk deleted {len(deleted_ids)} IOCs and unlinked {len(unlinked_ids)} IOCs", caseid=caseid)
+
+    return response_success(f"{len(deleted_ids)} IOCs deleted, {len(unlinked_ids)} IOCs unlinked",
+                            data={"deleted": deleted_ids, "unlinked": unlinked_ids})
+
+
+@case_ioc_blueprint.route('/case/ioc/bulk/update', methods=['POST'])
+@ac_api_case_requires(CaseAccessLevel.full_access)
+def case_bulk_update_ioc(caseid):
+    jsdata = request.get_json()
+    if not jsdata:
+        return response_error("Invalid request")
+
+    ioc_type_id = jsdata.get('ioc_type_id')
+    if ioc_type_id is not None and not get_registered_ioc_type(ioc_type_id):
+        return response_error("Not a valid IOC type")
+
+    ioc_tlp_id = jsdata.get('ioc_tlp_id')
+    if ioc_tlp_id is not None and not is_registered_tlp(ioc_tlp_id):
+        return response_error("Invalid TLP ID")
+
+    tags_add = jsdata.get('ioc_tags_add')
+    tags_remove = jsdata.get('ioc_tags_remove')
+    for tags in [tags_add, tags_remove]:
+        if tags is not None and (not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags)):
+            return response_error("Tags must be a list of strings")
+
+    if ioc_type_id is None and ioc_tlp_id is None and not tags_add and not tags_remove:
+        return response_error("Nothing to update")
+
+    ioc_ids, error = _get_bulk_iocs_ids_from_request(jsdata, caseid)
+    if error:
+        return response_error(error)
+
+    if not ioc_ids:
+        return response_error("No IOC matching the request in this case")
+
+    updated_ids, errors = bulk_update_iocs(ioc_ids, caseid, current_user.id,
+                                           ioc_type_id=int(ioc_type_id) if ioc_type_id is not None else None,
+                                           ioc_tlp_id=int(ioc_tlp_id) if ioc_tlp_id is not None else None,
+                                           tags_add=[tag.strip() for tag in tags_add or [] if tag.strip()],
+                                           tags_remove=[tag.strip() for tag in tags_remove or [] if tag.strip()])
+
+    if updated_ids:
+        iocs = Ioc.query.filter(Ioc.ioc_id.in_(updated_ids)).all()
+        call_modules_hook('on_postload_ioc_update', data=iocs, caseid=caseid)
+
+    track_activity(f"bulk updated {len(updated_ids)} IOCs", caseid=caseid)
+
+    if len(errors) == 0:
+        msg = f"{len(updated_ids)} IOCs updated"
+    else:
+        msg = f"{len(updated_ids)} IOCs updated but we got errors with the following IOCs:\n- " + "\n- ".join(errors)
+
+    return response_success(msg=msg, data={"updated": updated_ids, "errors": errors})
+
+
 @case_ioc_blueprint.route('/case/ioc/<int:cur_id>/modal', methods=['GET'])
 @ac_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
 def case_view_ioc_modal(cur_id, caseid, url_redir):
@@ -347,7 +499,11 @@ def case_update_ioc(cur_id, caseid):
         if not check_ioc_type_id(type_id=ioc_sc.ioc_type_id):
             return response_error("Not a valid IOC type")
 
-        update_ioc_state(caseid=caseid)
+        if not set_ioc_normalized_value(ioc_sc):
+            db.session.rollback()
+            return response_error("An IOC with the same value and type already exists")
+
+        update_ioc_state(caseid=caseid, object_ids=[cur_id])
         db.session.commit()
 
         ioc_sc = call_modules_hook('on_postload_ioc_update', data=ioc_sc, caseid=caseid)
@@ -33,24 +33,26 @@ from app import db
 from app.blueprints.case.case_comments import case_comment_update
 from app.datamgmt.case.case_db import case_get_desc_crc
 from app.datamgmt.case.case_db import get_case
+from app.datamgmt.case.case_notes_db import NOTES_CONTENTS_MAX_BATCH
 from app.datamgmt.case.case_notes_db import add_comment_to_note
 from app.datamgmt.case.case_notes_db import add_note
 from app.datamgmt.case.case_notes_db import add_note_group
 from app.datamgmt.case.case_notes_db import delete_note
 from app.datamgmt.case.case_notes_db import delete_note_comment
 from app.datamgmt.case.case_notes_db import delete_note_group
-from app.datamgmt.case.case_notes_db import find_pattern_in_notes
 from app.datamgmt.case.case_notes_db import get_case_note_comment
 from app.datamgmt.case.case_notes_db import get_case_note_comments
 from app.datamgmt.case.case_notes_db import get_case_notes_comments_count
 from app.datamgmt.case.case_notes_db import get_group_details
-from app.datamgmt.case.case_notes_db import get_groups_short
 from app.datamgmt.case.case_notes_db import get_note
-from app.datamgmt.case.case_notes_db import get_notes_from_group
+from app.datamgmt.case.case_notes_db import get_notes_contents
+from app.datamgmt.case.case_notes_db import get_notes_directory
+from app.datamgmt.case.case_notes_db import search_notes
 from app.datamgmt.case.case_notes_db import update_note
 from app.datamgmt.case.case_notes_db import update_note_group
 from app.datamgmt.states import get_notes_state
 from app.forms import CaseNoteForm
+from app.iris_engine.collaboration.documents import reset_buffered_document
 from app.iris_engine.module_handler.module_handler import call_modules_hook
 from app.iris_engine.utils.tracker import track_activity
 from app.models.authorization import CaseAccessLevel
@@ -175,6 +177,9 @@ def case_note_save(cur_id, caseid):
 
             return response_error("Invalid note ID for this case")
 
+        # The clients editing the note start over from the saved content
+        reset_buffered_document('note', note.note_id, note.note_content)
+
         note = call_modules_hook('on_postload_note_update', data=note, caseid=caseid)
 
     except marshmallow.exceptions.ValidationError as e:
@@ -222,25 +227,32 @@ def case_load_notes_groups(caseid):
     if not get_case(caseid=caseid):
         return response_error("Invalid case ID")
 
-    groups_short = get_groups_short(caseid)
+    ret = {
+        'groups': get_notes_directory(caseid),
+        'state': get_notes_state(caseid=caseid)
+    }
 
-    sta = []
+    return response_success("", data=ret)
 
-    for group in groups_short:
-        notes = get_notes_from_group(caseid=caseid, group_id=group.group_id)
-        group_d = group._asdict()
-        group_d['notes'] = [note._asdict() for note in notes]
 
-        sta.append(group_d)
+@case_notes_blueprint.route('/case/notes/contents', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def case_load_notes_contents(caseid):
 
-    sta = sorted(sta, key=lambda i: i['group_id'])
+    try:
+        note_ids = [int(note_id) for note_id in request.args.get('note_ids', '').split(',') if note_id]
+    except ValueError:
+        return response_error("Invalid notes IDs")
 
-    ret = {
-        'groups': sta,
-        'state': get_notes_state(caseid=caseid)
-    }
+    if not note_ids:
+        return response_error("No notes IDs provided")
 
-    return response_success("", data=ret)
+    if len(note_ids) > NOTES_CONTENTS_MAX_BATCH:
+        return response_error(f"At most {NOTES_CONTENTS_MAX_BATCH} notes can be fetched at once")
+
+    notes = get_notes_contents(note_ids, caseid)
+
+    return response_success("", data=[note._asdict() for note in notes])
 
 
 @case_notes_blueprint.route('/case/notes/state', methods=['GET'])
@@ -259,14 +271,23 @@ def case_search_notes(caseid):
 
     if request.is_json:
         search = request.json.get('search_term')
+        page = request.json.get('page', 1)
         ns = []
+        has_more = False
         if search:
-            search = "%{}%".format(search)
-            ns = find_pattern_in_notes(search, caseid)
+            try:
+                ns, has_more = search_notes(search, caseid=caseid, page=page,
+                                            per_page=request.json.get('per_page', 25))
+            except (TypeError, ValueError):
+                return response_error("Invalid pagination")
 
             ns = [row._asdict() for row in ns]
 
-        return response_success("", data=ns)
+        return response_success("", data={
+            'notes': ns,
+            'page': page,
+            'has_more': has_more
+        })
 
     return response_error("Invalid request")
 
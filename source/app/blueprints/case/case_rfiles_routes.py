@@ -54,6 +54,7 @@ from app.util import ac_api_case_requires
 from app.util import ac_case_requires
 from app.util import response_error
 from app.util import response_success
+from app.util import state_cached_response
 
 case_rfiles_blueprint = Blueprint(
     'case_rfiles',
@@ -77,6 +78,7 @@ def case_rfile(caseid, url_redir):
 
 @case_rfiles_blueprint.route('/case/evidences/list', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+@state_cached_response('evidences')
 def case_list_rfiles(caseid):
     crf = get_rfiles(caseid)
 
@@ -18,7 +18,6 @@
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-import binascii
 import marshmallow
 # IMPORTS ------------------------------------------------
 import traceback
@@ -30,6 +29,7 @@ from flask import url_for
 from flask_login import current_user
 from flask_socketio import emit
 from flask_socketio import join_room
+from flask_socketio import leave_room
 from flask_wtf import FlaskForm
 from sqlalchemy import and_
 from sqlalchemy import desc
@@ -46,6 +46,8 @@ from app.blueprints.case.case_tasks_routes import case_tasks_blueprint
 from app.blueprints.case.case_timeline_routes import case_timeline_blueprint
 from app.datamgmt.case.case_db import case_exists
 from app.datamgmt.case.case_db import case_get_desc_crc
+from app.datamgmt.case.case_db import case_get_desc_crc_only
+from app.datamgmt.case.case_db import case_set_desc_crc
 from app.datamgmt.case.case_db import get_activities_report_template
 from app.datamgmt.case.case_db import get_case
 from app.datamgmt.case.case_db import get_case_report_template
@@ -57,9 +59,17 @@ from app.datamgmt.manage.manage_users_db import get_user
 from app.datamgmt.manage.manage_users_db import get_users_list_restricted_from_case
 from app.datamgmt.manage.manage_users_db import set_user_case_access
 from app.datamgmt.reporter.report_db import export_case_json
+from app.datamgmt.states import get_case_states_room
 from app.forms import PipelinesCaseForm
+from app.iris_engine.access_control.socket_access import ac_socket_drop
+from app.iris_engine.access_control.socket_access import ac_socket_get_identity
 from app.iris_engine.access_control.utils import ac_get_all_access_level
 from app.iris_engine.access_control.utils import ac_set_case_access_for_users
+from app.iris_engine.collaboration.documents import get_buffered_document
+from app.iris_engine.collaboration.documents import get_document
+from app.iris_engine.collaboration.documents import parse_delta
+from app.iris_engine.collaboration.documents import persist_document
+from app.iris_engine.collaboration.documents import reset_buffered_document
 from app.iris_engine.module_handler.module_handler import list_available_pipelines
 from app.iris_engine.utils.tracker import track_activity
 from app.models import CaseStatus
@@ -150,44 +160,111 @@ def case_pipelines_modal(caseid, url_redir):
     return render_template('modal_case_pipelines.html', case=case, form=form, pipeline_args=pipeline_args)
 
 
+def _get_event_document(data):
+    case_id = int(data['channel'].replace('case-', ''))
+    kind = data.get('kind') or 'summary'
+
+    try:
+        object_id = case_id if kind == 'summary' else int(data.get('object_id'))
+    except (TypeError, ValueError):
+        return None
+
+    return get_document(kind, object_id, case_id)
+
+
 @socket_io.on('change')
 @ac_socket_requires(CaseAccessLevel.full_access)
 def socket_summary_onchange(data):
-    if not current_user.is_authenticated:
+    identity = ac_socket_get_identity(request.sid)
+    document = _get_event_document(data)
+    delta = parse_delta(data.get('delta'))
+    if document is None or delta is None:
+        return
+
+    revision = document.apply_delta(data.get('revision'), delta, identity.user_id)
+    if revision is None:
+        # The client is behind or diverged, it starts over from the current buffer
+        emit('snapshot', document.snapshot())
         return
 
-    data['last_change'] = current_user.user
-    emit('change', data, to=data['channel'], skip_sid=request.sid)
+    emit('change', {
+        'kind': document.kind,
+        'object_id': document.object_id,
+        'delta': delta,
+        'revision': revision,
+        'last_change': identity.user_login
+    }, to=document.room, skip_sid=request.sid)
+
+    return {'revision': revision}
+
+
+@socket_io.on('resync')
+@ac_socket_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def socket_summary_onresync(data):
+    document = _get_event_document(data)
+    if document is not None:
+        emit('snapshot', document.snapshot())
 
 
 @socket_io.on('save')
 @ac_socket_requires(CaseAccessLevel.full_access)
 def socket_summary_onsave(data):
-    if not current_user.is_authenticated:
+    identity = ac_socket_get_identity(request.sid)
+    document = _get_event_document(data)
+    if document is None:
         return
 
-    data['last_saved'] = current_user.user
-    emit('save', data, to=data['channel'], skip_sid=request.sid)
+    if persist_document(document) and document.kind == 'summary':
+        track_activity("updated summary", document.case_id)
+
+    emit('save', {
+        'kind': document.kind,
+        'object_id': document.object_id,
+        'revision': document.revision,
+        'last_saved': identity.user_login
+    }, to=document.room, skip_sid=request.sid)
+
+    return {'revision': document.revision}
 
 
 @socket_io.on('clear_buffer')
 @ac_socket_requires(CaseAccessLevel.full_access)
 def socket_summary_onchange(message):
-    if not current_user.is_authenticated:
-        return
-
     emit('clear_buffer', message)
 
 
 @socket_io.on('join')
 @ac_socket_requires(CaseAccessLevel.full_access)
 def get_message(data):
-    if not current_user.is_authenticated:
+    identity = ac_socket_get_identity(request.sid)
+    document = _get_event_document(data)
+    if document is None:
         return
 
-    room = data['channel']
+    room = document.room
     join_room(room=room)
-    emit('join', {'message': f"{current_user.user} just joined"}, room=room)
+    emit('join', {'message': f"{identity.user_login} just joined"}, room=room)
+    emit('snapshot', document.snapshot())
+
+
+@socket_io.on('leave')
+@ac_socket_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def socket_document_onleave(data):
+    document = _get_event_document(data)
+    if document is not None and document.kind != 'summary':
+        leave_room(room=document.room)
+
+
+@socket_io.on('join-states')
+@ac_socket_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def socket_states_onjoin(data):
+    case_id = int(data['channel'].replace('case-', ''))
+    join_room(room=get_case_states_room(case_id))
+
+
+@socket_io.on('disconnect')
+def socket_ondisconnect():
+    ac_socket_drop(request.sid)
 
 
 @case_blueprint.route('/case/summary/update', methods=['POST'])
@@ -195,22 +272,16 @@ def get_message(data):
 def desc_fetch(caseid):
 
     js_data = request.get_json()
-    case = get_case(caseid)
-    if not case:
+    description = js_data.get('case_description') or ''
+
+    crc = case_set_desc_crc(description, caseid)
+    if crc is None:
         return response_error('Invalid case ID')
 
-    case.description = js_data.get('case_description')
-    crc = binascii.crc32(case.description.encode('utf-8'))
-    db.session.commit()
     track_activity("updated summary", caseid)
 
-    if not request.cookies.get('session'):
-        # API call so we propagate the message to everyone
-        data = {
-            "case_description": case.description,
-            "last_saved": current_user.user
-        }
-        socket_io.emit('save', data, to=f"case-{caseid}")
+    # The clients editing the summary start over from the saved content
+    reset_buffered_document('summary', caseid, description)
 
     return response_success("Summary updated", data=crc)
 
@@ -218,9 +289,27 @@ def desc_fetch(caseid):
 @case_blueprint.route('/case/summary/fetch', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
 def summary_fetch(caseid):
-    desc_crc32, description = case_get_desc_crc(caseid)
+    # The summary being edited is ahead of the database
+    document = get_buffered_document('summary', caseid)
+    desc_crc32 = document.content_crc32 if document is not None else case_get_desc_crc_only(caseid)
+
+    if desc_crc32 is not None and request.if_none_match.contains(str(desc_crc32)):
+        # Unchanged since the client last fetched it, the description isn't loaded at all
+        resp = app.response_class(status=304)
+        resp.set_etag(str(desc_crc32))
+        return resp
+
+    if document is not None:
+        description = document.content
+    else:
+        desc_crc32, description = case_get_desc_crc(caseid)
+
+    resp = response_success("Summary fetch", data={'case_description': description, 'crc32': desc_crc32})
+    if desc_crc32 is not None:
+        resp.set_etag(str(desc_crc32))
+        resp.headers['Cache-Control'] = 'no-cache'
 
-    return response_success("Summary fetch", data={'case_description': description, 'crc32': desc_crc32})
+    return resp
 
 
 @case_blueprint.route('/case/activities/list', methods=['GET'])
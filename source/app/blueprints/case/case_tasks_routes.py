@@ -61,6 +61,7 @@ from app.util import ac_api_case_requires
 from app.util import ac_case_requires
 from app.util import response_error
 from app.util import response_success
+from app.util import state_cached_response
 
 case_tasks_blueprint = Blueprint('case_tasks',
                                  __name__,
@@ -82,6 +83,7 @@ def case_tasks(caseid, url_redir):
 
 @case_tasks_blueprint.route('/case/tasks/list', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+@state_cached_response('tasks')
 def case_get_tasks(caseid):
     ct = get_tasks_with_assignees(caseid)
 
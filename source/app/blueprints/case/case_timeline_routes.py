@@ -78,6 +78,7 @@ from app.util import ac_case_requires
 from app.util import add_obj_history_entry
 from app.util import response_error
 from app.util import response_success
+from app.util import state_cached_response
 
 event_tags = ["Network", "Server", "ActiveDirectory", "Computer", "Malware", "User Interaction"]
 
@@ -142,6 +143,9 @@ def case_comment_delete(cur_id, com_id, caseid):
     if not success:
         return response_error(msg)
 
+    update_timeline_state(caseid=caseid)
+    db.session.commit()
+
     call_modules_hook('on_postload_event_comment_delete', data=com_id, caseid=caseid)
 
     track_activity(f"comment {com_id} on event {cur_id} deleted", caseid=caseid)
@@ -189,6 +193,7 @@ def case_comment_add(cur_id, caseid):
 
         add_obj_history_entry(event, 'commented')
 
+        update_timeline_state(caseid=caseid)
         db.session.commit()
 
         hook_data = {
@@ -301,6 +306,7 @@ def case_gettimeline_api_nofilter(caseid):
 
 @case_timeline_blueprint.route('/case/timeline/events/list/filter/<int:asset_id>', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+@state_cached_response('timeline', 'assets', 'ioc')
 def case_gettimeline_api(asset_id, caseid):
     if asset_id:
         condition = and_(
@@ -387,6 +393,7 @@ def case_gettimeline_api(asset_id, caseid):
 
 @case_timeline_blueprint.route('/case/timeline/advanced-filter', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+@state_cached_response('timeline', 'assets', 'ioc')
 def case_filter_timeline(caseid):
     args = request.args.to_dict()
     query_filter = args.get('q')
@@ -21,7 +21,6 @@
 import marshmallow
 # IMPORTS ------------------------------------------------
 from datetime import datetime
-from datetime import timedelta
 from flask import Blueprint
 from flask import redirect
 from flask import render_template
@@ -31,23 +30,24 @@ from flask import url_for
 from flask_login import current_user
 from flask_login import logout_user
 from flask_wtf import FlaskForm
-from sqlalchemy import distinct
 
 from app import app
 from app import db
+from app.datamgmt.dashboard.dashboard_db import CASES_CHARTS_GRANULARITIES
+from app.datamgmt.dashboard.dashboard_db import get_cases_opening_charts
+from app.datamgmt.dashboard.dashboard_db import get_dashboard_counters
 from app.datamgmt.dashboard.dashboard_db import get_global_task
 from app.datamgmt.dashboard.dashboard_db import get_tasks_status
 from app.datamgmt.dashboard.dashboard_db import list_global_tasks
 from app.datamgmt.dashboard.dashboard_db import list_user_tasks
 from app.forms import CaseGlobalTaskForm
+from app.iris_engine.access_control.socket_access import ac_socket_revoke_users
 from app.iris_engine.module_handler.module_handler import call_modules_hook
 from app.iris_engine.utils.tracker import track_activity
 from app.models.authorization import User
-from app.models.cases import Cases
 from app.models.models import CaseTasks
 from app.models.models import GlobalTasks
 from app.models.models import TaskStatus
-from app.models.models import UserActivity
 from app.schema.marshables import CaseTaskSchema
 from app.schema.marshables import GlobalTasksSchema
 from app.util import ac_api_requires
@@ -77,6 +77,7 @@ def logout():
         db.session.commit()
 
     track_activity("user '{}' has been logged-out".format(current_user.user), ctx_less=True, display_in_ui=False)
+    ac_socket_revoke_users([current_user.id])
     logout_user()
 
     return redirect(not_authenticated_redirection_url())
@@ -86,28 +87,18 @@ def logout():
 @ac_api_requires()
 def get_cases_charts(caseid):
     """
-    Get case charts
+    Get the number of cases opened over the last year.
+    The optional granularity arg is day (default), week or month. client_id and classification_id
+    args filter the cases counted.
     :return: JSON
     """
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in CASES_CHARTS_GRANULARITIES:
+        return response_error(f'Invalid granularity, expected one of {", ".join(CASES_CHARTS_GRANULARITIES)}')
 
-    res = Cases.query.with_entities(
-        Cases.open_date
-    ).filter(
-        Cases.open_date > (datetime.utcnow() - timedelta(days=365))
-    ).order_by(
-        Cases.open_date
-    ).all()
-    retr = [[], []]
-    rk = {}
-    for case in res:
-        month = "{}/{}/{}".format(case.open_date.day, case.open_date.month, case.open_date.year)
-
-        if month in rk:
-            rk[month] += 1
-        else:
-            rk[month] = 1
-
-        retr = [list(rk.keys()), list(rk.values())]
+    retr = get_cases_opening_charts(granularity=granularity,
+                                    client_id=request.args.get('client_id', type=int),
+                                    classification_id=request.args.get('classification_id', type=int))
 
     return response_success("", retr)
 
@@ -132,21 +123,7 @@ def index(caseid, url_redir):
 
     msg = None
 
-    # Retrieve the dashboard data from multiple sources.
-    # Quite fast as it is only counts.
-    user_open_case = UserActivity.query.with_entities(
-        distinct(Cases.case_id)
-    ).filter(
-        UserActivity.user_id == current_user.id,
-        UserActivity.case_id == Cases.case_id,
-        Cases.close_date == None
-    ).count()
-
-    data = {
-        "user_open_count": user_open_case,
-        "cases_open_count": Cases.query.filter(Cases.close_date == None).count(),
-        "cases_count": Cases.query.with_entities(distinct(Cases.case_id)).count(),
-    }
+    data = get_dashboard_counters(current_user.id)
 
     # Create the customer form to be able to quickly add a customer
     form = FlaskForm()
@@ -48,6 +48,7 @@ from app.datamgmt.manage.manage_cases_db import delete_case
 from app.datamgmt.manage.manage_cases_db import get_case_details_rt
 from app.datamgmt.manage.manage_cases_db import get_case_protagonists
 from app.datamgmt.manage.manage_cases_db import list_cases_dict
+from app.datamgmt.manage.manage_cases_db import list_cases_page
 from app.datamgmt.manage.manage_cases_db import reopen_case
 from app.datamgmt.manage.manage_users_db import get_user_organisations
 from app.forms import AddCaseForm
@@ -208,6 +209,7 @@ def api_delete_case(cur_id, caseid):
                 return response_error("Tried to delete a non-existing case")
 
         except Exception as e:
+            db.session.rollback()
             return response_error("Cannot delete a non empty case. {}".format(e))
 
 
@@ -295,10 +297,30 @@ def api_add_case(caseid):
 @manage_cases_blueprint.route('/manage/cases/list', methods=['GET'])
 @ac_api_requires(Permissions.standard_user)
 def api_list_case(caseid):
-
-    data = list_cases_dict(current_user.id)
-
-    return response_success("", data=data)
+    """
+    List the cases the user can access. When the draw arg is set, a page of the cases is returned following
+    the DataTables server-side protocol, with the start, length, order_by, order_dir and search args.
+    """
+    if 'draw' not in request.args:
+        data = list_cases_dict(current_user.id)
+
+        return response_success("", data=data)
+
+    cases, records_total, records_filtered = list_cases_page(
+        current_user.id,
+        start=request.args.get('start', 0, type=int),
+        length=request.args.get('length', 25, type=int),
+        order_by=request.args.get('order_by', 'case_open_date'),
+        order_dir=request.args.get('order_dir', 'desc'),
+        search=request.args.get('search')
+    )
+
+    return response_success("", data={
+        'draw': request.args.get('draw', 0, type=int),
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'data': cases
+    })
 
 
 @manage_cases_blueprint.route('/manage/cases/update/<int:cur_id>', methods=['POST'])
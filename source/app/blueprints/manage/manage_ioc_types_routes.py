@@ -26,6 +26,7 @@ from werkzeug.utils import redirect
 
 from app import db
 from app.datamgmt.case.case_iocs_db import get_ioc_types_list
+from app.datamgmt.manage.manage_ioc_types_db import refresh_ioc_types_registry
 from app.forms import AddIocTypeForm
 from app.iris_engine.utils.tracker import track_activity
 from app.models import Ioc
@@ -107,6 +108,8 @@ def add_ioc_type_api(caseid):
         db.session.add(ioct_sc)
         db.session.commit()
 
+        refresh_ioc_types_registry()
+
     except marshmallow.exceptions.ValidationError as e:
         return response_error(msg="Data error", data=e.messages, status=400)
 
@@ -129,6 +132,10 @@ def remove_ioc_type(cur_id, caseid):
 
     if type_id:
         db.session.delete(type_id)
+        db.session.commit()
+
+        refresh_ioc_types_registry()
+
         track_activity("Deleted ioc type ID {type_id}".format(type_id=cur_id), caseid=caseid, ctx_less=True)
         return response_success("Deleted ioc type ID {type_id}".format(type_id=cur_id))
 
@@ -155,6 +162,9 @@ def update_ioc(cur_id, caseid):
         ioct_sc = ioct_schema.load(request.get_json(), instance=ioc_type)
 
         if ioct_sc:
+            db.session.commit()
+            refresh_ioc_types_registry()
+
             track_activity("updated ioc type type {}".format(ioct_sc.type_name), caseid=caseid)
             return response_success("IOC type updated", ioct_sc)
 
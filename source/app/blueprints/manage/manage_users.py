@@ -47,6 +47,7 @@ from app.datamgmt.manage.manage_users_db import remove_cases_access_from_user
 from app.datamgmt.manage.manage_users_db import update_user
 from app.datamgmt.manage.manage_users_db import update_user_groups
 from app.forms import AddUserForm
+from app.iris_engine.access_control.socket_access import ac_socket_revoke_users
 from app.iris_engine.access_control.utils import ac_get_all_access_level
 from app.iris_engine.utils.tracker import track_activity
 from app.models.authorization import Permissions
@@ -387,6 +388,7 @@ def deactivate_user_api(cur_id, caseid):
 
     user.active = False
     db.session.commit()
+    ac_socket_revoke_users([user.id])
     user_schema = UserSchema()
 
     track_activity(f"user {user.user} deactivated", caseid=caseid,  ctx_less=True)
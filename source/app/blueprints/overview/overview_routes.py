@@ -20,11 +20,13 @@
 
 from flask import Blueprint
 from flask import render_template
+from flask import request
 from flask import url_for
 from flask_login import current_user
 from flask_wtf import FlaskForm
 from werkzeug.utils import redirect
 
+from app.datamgmt.overview.overview_db import OVERVIEW_FILTERABLE_COLUMNS
 from app.datamgmt.overview.overview_db import get_overview_db
 from app.util import ac_api_requires
 from app.util import ac_requires
@@ -55,8 +57,22 @@ def get_overview(caseid, url_redir):
 @ac_api_requires()
 def get_overview_filter(caseid):
     """
-    Return an overview of the cases
+    Return a page of the overview of the open cases, following the DataTables server-side protocol with the
+    draw, start, length, order_by, order_dir and search args. The filter_<column> args filter the columns.
     """
-    overview = get_overview_db(current_user.id)
+    cases, records_total, records_filtered = get_overview_db(
+        current_user.id,
+        start=request.args.get('start', 0, type=int),
+        length=request.args.get('length', 25, type=int),
+        order_by=request.args.get('order_by', 'customer_name'),
+        order_dir=request.args.get('order_dir', 'asc'),
+        search=request.args.get('search'),
+        filters={column: request.args.get(f'filter_{column}') for column in OVERVIEW_FILTERABLE_COLUMNS}
+    )
 
-    return response_success('', data=overview)
+    return response_success('', data={
+        'draw': request.args.get('draw', 0, type=int),
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'data': cases
+    })
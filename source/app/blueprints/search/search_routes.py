@@ -20,25 +20,30 @@
 
 # IMPORTS ------------------------------------------------
 from flask import Blueprint
+from flask import json
 from flask import redirect
 from flask import render_template
 from flask import request
+from flask import stream_with_context
 from flask import url_for
-from sqlalchemy import and_
-
+from flask_login import current_user
+
+from app import app
+from app.datamgmt.case.case_notes_db import search_notes
+from app.datamgmt.search.search_db import SEARCH_OBJECT_TYPES
+from app.datamgmt.search.search_db import count_search_query
+from app.datamgmt.search.search_db import get_comments_search_query
+from app.datamgmt.search.search_db import get_iocs_search_query
+from app.datamgmt.search.search_db import paginate_search_query
+from app.datamgmt.search.search_db import search_documents
+from app.datamgmt.search.search_db import stream_search_query
 from app.forms import SearchForm
 from app.iris_engine.utils.tracker import track_activity
-from app.models import Comments
 from app.models.authorization import Permissions
-from app.models.cases import Cases
-from app.models.models import Client
-from app.models.models import Ioc
-from app.models.models import IocLink
-from app.models.models import IocType
-from app.models.models import Notes
-from app.models.models import Tlp
+from app.util import PgEncoder
 from app.util import ac_api_requires
 from app.util import ac_requires
+from app.util import response_error
 from app.util import response_success
 
 search_blueprint = Blueprint('search',
@@ -55,87 +60,85 @@ def search_file_post(caseid: int):
     search_value = jsdata.get('search_value')
     search_type = jsdata.get('search_type')
     files = []
-    search_condition = and_()
+
+    try:
+        page = int(jsdata.get('page') or 1)
+        per_page = int(jsdata.get('per_page') or 50)
+    except (TypeError, ValueError):
+        return response_error("Invalid pagination. page and per_page must be integers")
+
+    if page < 1 or per_page < 1:
+        return response_error("Invalid pagination. page and per_page must be positive")
 
     track_activity("started a global search for {} on {}".format(search_value, search_type))
 
-    # if not ac_flag_match_mask(session['permissions'],  Permissions.search_across_all_cases.value):
-    #     user_search_limitations = ac_get_fast_user_cases_access(current_user.id)
-    #     if user_search_limitations:
-    #         search_condition = and_(Cases.case_id.in_(user_search_limitations))
-    #
-    #     else:
-    #         return response_success("Results fetched", [])
-
-    if search_type == "ioc":
-        res = Ioc.query.with_entities(
-                            Ioc.ioc_value.label('ioc_name'),
-                            Ioc.ioc_description.label('ioc_description'),
-                            Ioc.ioc_misp,
-                            IocType.type_name,
-                            Tlp.tlp_name,
-                            Tlp.tlp_bscolor,
-                            Cases.name.label('case_name'),
-                            Cases.case_id,
-                            Client.name.label('customer_name')
-                    ).filter(
-                        and_(
-                            Ioc.ioc_value.like(search_value),
-                            IocLink.ioc_id == Ioc.ioc_id,
-                            IocLink.case_id == Cases.case_id,
-                            Client.client_id == Cases.client_id,
-                            Ioc.ioc_tlp_id == Tlp.tlp_id,
-                            search_condition
-                        )
-                    ).join(Ioc.ioc_type).all()
-
-        files = [row._asdict() for row in res]
+    if search_type == "all":
+        object_types = jsdata.get('object_types') or None
+        if object_types is not None and (not isinstance(object_types, list) or
+                                         any(object_type not in SEARCH_OBJECT_TYPES for object_type in object_types)):
+            return response_error(f"Invalid object types. Expected a list of {', '.join(SEARCH_OBJECT_TYPES)}")
+
+        results = []
+        facets = {}
+        has_more = False
+        if search_value:
+            results, has_more, facets = search_documents(search_value,
+                                                         user_id=current_user.id,
+                                                         object_types=object_types,
+                                                         page=page,
+                                                         per_page=per_page)
+
+        files = {
+            'results': [row._asdict() for row in results],
+            'facets': facets,
+            'page': page,
+            'has_more': has_more
+        }
 
     if search_type == "notes":
 
         ns = []
+        has_more = False
         if search_value:
-            search_value = "%{}%".format(search_value)
-            ns = Notes.query.filter(
-                Notes.note_content.like(search_value),
-                Cases.client_id == Client.client_id,
-                search_condition
-            ).with_entities(
-                Notes.note_id,
-                Notes.note_title,
-                Cases.name.label('case_name'),
-                Client.name.label('client_name'),
-                Cases.case_id
-            ).join(
-                Notes.case
-            ).order_by(
-                Client.name
-            ).all()
+            ns, has_more = search_notes(search_value,
+                                        user_id=current_user.id,
+                                        page=page,
+                                        per_page=per_page)
 
             ns = [row._asdict() for row in ns]
 
-        files = ns
-
-    if search_type == "comments":
-        search_value = "%{}%".format(search_value)
-        comments = Comments.query.filter(
-            Comments.comment_text.like(search_value),
-            Cases.client_id == Client.client_id,
-            search_condition
-        ).with_entities(
-            Comments.comment_id,
-            Comments.comment_text,
-            Cases.name.label('case_name'),
-            Client.name.label('customer_name'),
-            Cases.case_id
-        ).join(
-            Comments.case,
-            Cases.client
-        ).order_by(
-            Client.name
-        ).all()
-
-        files = [row._asdict() for row in comments]
+        files = {
+            'notes': ns,
+            'page': page,
+            'has_more': has_more
+        }
+
+    if search_type in ["ioc", "comments"]:
+        if search_type == "ioc":
+            query = get_iocs_search_query(search_value, user_id=current_user.id)
+        else:
+            query = get_comments_search_query(search_value, user_id=current_user.id)
+
+        if jsdata.get('stream'):
+            # The whole result set, for API consumers
+            def generate():
+                for row in stream_search_query(query):
+                    yield json.dumps(row._asdict(), cls=PgEncoder) + '\n'
+
+            return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        rows, has_more = paginate_search_query(query,
+                                               page=page,
+                                               per_page=per_page)
+
+        files = {
+            'rows': [row._asdict() for row in rows],
+            'page': page,
+            'has_more': has_more
+        }
+
+        if page == 1:
+            files['total'], files['total_estimated'] = count_search_query(query)
 
     return response_success("Results fetched", files)
 
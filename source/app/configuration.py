@@ -437,5 +437,6 @@ class Config:
 
     """ Caching 
     """
-    CACHE_TYPE = "SimpleCache"
+    CACHE_TYPE = config.load('CACHE', 'TYPE', fallback="SimpleCache")
+    CACHE_REDIS_URL = config.load('CACHE', 'REDIS_URL')
     CACHE_DEFAULT_TIMEOUT = 300
@@ -19,15 +19,22 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import datetime
+import uuid
 
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import exists
 from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
 
 from app import db, app
+from app.datamgmt.links import sync_links
 from app.datamgmt.states import update_assets_state
+from app.iris_engine.access_control.utils import ac_user_cases_access_clause
 from app.models import AnalysisStatus, CaseStatus
 from app.models import AssetComments
+from app.models import AssetInventory
 from app.models import AssetsType
 from app.models import CaseAssets
 from app.models import CaseEventsAssets
@@ -43,6 +50,92 @@ from app.models.authorization import User
 
 log = app.logger
 
+# Characters stripped from the inventory fields, the same as in the inventory migration
+INVENTORY_STRIP_CHARS = ' \t\r\n\f\v'
+
+
+def _normalize_inventory_field(value):
+    if value is None or not value.strip(INVENTORY_STRIP_CHARS):
+        return None
+
+    return value.strip(INVENTORY_STRIP_CHARS).lower()
+
+
+def _inventory_conflict_target():
+    # Matches the unique index on the digest of the names
+    return [AssetInventory.client_id, AssetInventory.asset_type_id, func.md5(AssetInventory.inventory_name)]
+
+
+def link_asset_to_inventory(asset):
+    """
+    Attach an asset to the inventory entry of its customer matching its normalized name and type.
+    The entry is created if needed, and the previous entry of the asset is removed if it is not
+    used anymore. Expects a db commit soon after.
+
+    :param asset: CaseAssets object, with its case ID set
+    :return: Inventory ID of the asset
+    """
+    inventory_name = _normalize_inventory_field(asset.asset_name)
+    if inventory_name is None or asset.asset_type_id is None:
+        return None
+
+    client = Cases.query.with_entities(
+        Cases.client_id
+    ).filter(
+        Cases.case_id == asset.case_id
+    ).first()
+
+    now = datetime.datetime.utcnow()
+    inventory_ip = _normalize_inventory_field(asset.asset_ip)
+    inventory_domain = _normalize_inventory_field(asset.asset_domain)
+
+    stmt = insert(AssetInventory).values(
+        client_id=client.client_id,
+        asset_type_id=asset.asset_type_id,
+        inventory_name=inventory_name,
+        inventory_ip=inventory_ip,
+        inventory_domain=inventory_domain,
+        first_seen=now,
+        last_seen=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=_inventory_conflict_target(),
+        set_={
+            'inventory_ip': func.coalesce(stmt.excluded.inventory_ip, AssetInventory.inventory_ip),
+            'inventory_domain': func.coalesce(stmt.excluded.inventory_domain, AssetInventory.inventory_domain),
+            'last_seen': now
+        }
+    ).returning(AssetInventory.inventory_id)
+
+    inventory_id = db.session.execute(stmt).scalar()
+
+    previous_inventory_id = asset.asset_inventory_id
+    asset.asset_inventory_id = inventory_id
+
+    if previous_inventory_id and previous_inventory_id != inventory_id:
+        db.session.flush()
+        prune_asset_inventory([previous_inventory_id])
+
+    return inventory_id
+
+
+def prune_asset_inventory(inventory_ids):
+    """
+    Remove the inventory entries which are not referenced by any case asset anymore
+
+    :param inventory_ids: List of inventory IDs to check
+    :return: None
+    """
+    inventory_ids = [inventory_id for inventory_id in inventory_ids if inventory_id]
+    if not inventory_ids:
+        return
+
+    AssetInventory.query.filter(
+        AssetInventory.inventory_id.in_(inventory_ids),
+        ~exists().where(CaseAssets.asset_inventory_id == AssetInventory.inventory_id)
+    ).delete(synchronize_session=False)
+
+
 def create_asset(asset, caseid, user_id):
 
     asset.date_added = datetime.datetime.utcnow()
@@ -50,15 +143,115 @@ def create_asset(asset, caseid, user_id):
     asset.case_id = caseid
     asset.user_id = user_id
 
+    link_asset_to_inventory(asset)
+
     db.session.add(asset)
-    update_assets_state(caseid=caseid, userid=user_id)
+    db.session.flush()
+    update_assets_state(caseid=caseid, userid=user_id, object_ids=[asset.asset_id], operation='create')
 
     db.session.commit()
 
     return asset
 
 
-def get_assets(caseid):
+def _bulk_link_to_inventory(assets_rows, client_id, now):
+    keys = {}
+    for row in assets_rows:
+        inventory_name = _normalize_inventory_field(row.get('asset_name'))
+        if inventory_name is None or row.get('asset_type_id') is None:
+            continue
+
+        key = (row.get('asset_type_id'), inventory_name)
+        entry = keys.setdefault(key, {
+            'client_id': client_id,
+            'asset_type_id': row.get('asset_type_id'),
+            'inventory_name': inventory_name,
+            'inventory_ip': None,
+            'inventory_domain': None,
+            'first_seen': now,
+            'last_seen': now
+        })
+        entry['inventory_ip'] = _normalize_inventory_field(row.get('asset_ip')) or entry['inventory_ip']
+        entry['inventory_domain'] = _normalize_inventory_field(row.get('asset_domain')) or entry['inventory_domain']
+
+    if not keys:
+        return
+
+    stmt = insert(AssetInventory).values(list(keys.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=_inventory_conflict_target(),
+        set_={
+            'inventory_ip': func.coalesce(stmt.excluded.inventory_ip, AssetInventory.inventory_ip),
+            'inventory_domain': func.coalesce(stmt.excluded.inventory_domain, AssetInventory.inventory_domain),
+            'last_seen': now
+        }
+    ).returning(AssetInventory.inventory_id, AssetInventory.asset_type_id, AssetInventory.inventory_name)
+
+    inventory_map = {(row.asset_type_id, row.inventory_name): row.inventory_id
+                     for row in db.session.execute(stmt)}
+
+    for row in assets_rows:
+        key = (row.get('asset_type_id'), _normalize_inventory_field(row.get('asset_name')))
+        row['asset_inventory_id'] = inventory_map.get(key)
+
+
+def bulk_create_assets(assets_rows, caseid, user_id, chunk_size=1000):
+    """
+    Insert a batch of already validated assets. The assets, their inventory entries and their IOC
+    links are inserted with one statement each per chunk, all in a single transaction, so either all
+    the assets are imported or none. The assets state is updated once at the end.
+
+    :param assets_rows: List of dict of CaseAssets fields. The optional ioc_links key holds a list of IOC IDs
+    :param caseid: Case ID
+    :param user_id: ID of the user importing the assets
+    :param chunk_size: Number of assets inserted per statement
+    :return: List of the created assets IDs, in the same order as the input
+    """
+    client = Cases.query.with_entities(
+        Cases.client_id
+    ).filter(
+        Cases.case_id == caseid
+    ).first()
+
+    created_ids = []
+    for index in range(0, len(assets_rows), chunk_size):
+        chunk = [dict(row) for row in assets_rows[index:index + chunk_size]]
+        now = datetime.datetime.utcnow()
+
+        _bulk_link_to_inventory(chunk, client.client_id, now)
+
+        iocs_links = {}
+        for row in chunk:
+            row['asset_uuid'] = uuid.uuid4()
+            row['case_id'] = caseid
+            row['user_id'] = user_id
+            row['date_added'] = now
+            row['date_update'] = now
+            iocs_links[row['asset_uuid']] = row.pop('ioc_links', None) or []
+
+        inserted = db.session.execute(
+            insert(CaseAssets).values(chunk).returning(CaseAssets.asset_id, CaseAssets.asset_uuid)
+        ).all()
+        assets_ids = {row.asset_uuid: row.asset_id for row in inserted}
+
+        ioc_links = [{'asset_id': assets_ids[asset_uuid], 'ioc_id': ioc_id}
+                     for asset_uuid, iocs in iocs_links.items() for ioc_id in set(iocs)]
+        if ioc_links:
+            db.session.execute(insert(IocAssetLink).values(ioc_links))
+
+        created_ids.extend(assets_ids[row['asset_uuid']] for row in chunk)
+
+    update_assets_state(caseid=caseid, userid=user_id, object_ids=created_ids, operation='create')
+    db.session.commit()
+
+    return created_ids
+
+
+def get_assets(caseid, assets_ids=None):
+    conditions = [CaseAssets.case_id == caseid]
+    if assets_ids is not None:
+        conditions.append(CaseAssets.asset_id.in_(assets_ids))
+
     assets = CaseAssets.query.with_entities(
         CaseAssets.asset_id,
         CaseAssets.asset_uuid,
@@ -75,7 +268,7 @@ def get_assets(caseid):
         CaseAssets.analysis_status_id,
         CaseAssets.asset_tags
     ).filter(
-        CaseAssets.case_id == caseid,
+        *conditions
     ).join(
         CaseAssets.asset_type, CaseAssets.analysis_status
     ).all()
@@ -102,6 +295,13 @@ def get_asset(asset_id, caseid):
     return asset
 
 
+def get_assets_by_ids(assets_ids, caseid):
+    return CaseAssets.query.filter(
+        CaseAssets.asset_id.in_(assets_ids),
+        CaseAssets.case_id == caseid
+    ).all()
+
+
 def update_asset(asset_name, asset_description, asset_ip, asset_info, asset_domain,
                  asset_compromise_status_id, asset_type, asset_id, caseid, analysis_status, asset_tags):
     asset = get_asset(asset_id, caseid)
@@ -115,7 +315,9 @@ def update_asset(asset_name, asset_description, asset_ip, asset_info, asset_doma
     asset.analysis_status_id = analysis_status
     asset.asset_tags = asset_tags
 
-    update_assets_state(caseid=caseid)
+    link_asset_to_inventory(asset)
+
+    update_assets_state(caseid=caseid, object_ids=[asset_id])
 
     db.session.commit()
 
@@ -144,13 +346,23 @@ def delete_asset(asset_id, caseid):
             Comments.comment_id.in_(com_ids)
         ).delete()
 
+        inventory = CaseAssets.query.with_entities(
+            CaseAssets.asset_inventory_id
+        ).filter(
+            CaseAssets.asset_id == asset_id,
+            CaseAssets.case_id == caseid
+        ).first()
+
         # Directly delete the relevant records from the CaseAssets table
         CaseAssets.query.filter(
             CaseAssets.asset_id == asset_id,
             CaseAssets.case_id == caseid
         ).delete()
 
-        update_assets_state(caseid=caseid)
+        if inventory:
+            prune_asset_inventory([inventory.asset_inventory_id])
+
+        update_assets_state(caseid=caseid, object_ids=[asset_id], operation='delete')
 
 def get_assets_types():
     assets_types = [(c.asset_id, c.asset_name) for c
@@ -182,6 +394,15 @@ def get_case_outcome_status_dict():
     return [{'value': e.value, 'name': e.name.replace('_', ' ').capitalize()} for e in CaseStatus]
 
 
+def get_assets_types_map():
+    return {
+        asset_type.asset_name.lower(): asset_type.asset_id for asset_type in AssetsType.query.with_entities(
+            AssetsType.asset_id,
+            AssetsType.asset_name
+        ).all()
+    }
+
+
 def get_asset_type_id(asset_type_name):
     assets_type_id = AssetsType.query.with_entities(
         AssetsType.asset_id
@@ -192,39 +413,107 @@ def get_asset_type_id(asset_type_name):
     return assets_type_id
 
 
-def get_assets_ioc_links(caseid):
+def get_assets_ioc_links(caseid, assets_ids=None):
+    conditions = [
+        Ioc.ioc_id == IocAssetLink.ioc_id,
+        IocLink.case_id == caseid,
+        IocLink.ioc_id == Ioc.ioc_id
+    ]
+    if assets_ids is not None:
+        conditions.append(IocAssetLink.asset_id.in_(assets_ids))
 
     ioc_links_req = IocAssetLink.query.with_entities(
         Ioc.ioc_id,
         Ioc.ioc_value,
         IocAssetLink.asset_id
     ).filter(
-        Ioc.ioc_id == IocAssetLink.ioc_id,
-        IocLink.case_id == caseid,
-        IocLink.ioc_id == Ioc.ioc_id
+        *conditions
     ).all()
 
     return ioc_links_req
 
-def get_similar_assets(asset_name, asset_type_id, caseid, customer_id, cases_limitation):
+def get_similar_assets(caseid, user_id, assets_ids=None):
+    """
+    Find the assets of a case which are also present in other cases of the same customer,
+    restricted to the cases the user can access. Read from the customer assets inventory
+    with a single join for all the assets.
+
+    :param caseid: Case ID
+    :param user_id: ID of the requesting user
+    :param assets_ids: Restrict to these assets of the case. All the assets if None
+    :return: Dict of asset ID to list of similar assets
+    """
+    similar_asset = aliased(CaseAssets)
+
+    conditions = [CaseAssets.case_id == caseid]
+    if assets_ids is not None:
+        conditions.append(CaseAssets.asset_id.in_(assets_ids))
 
     linked_assets = CaseAssets.query.with_entities(
+        CaseAssets.asset_id.label('source_asset_id'),
         Cases.name.label('case_name'),
         Cases.open_date.label('case_open_date'),
-        CaseAssets.asset_description,
-        CaseAssets.asset_compromise_status_id,
-        CaseAssets.asset_id,
-        CaseAssets.case_id
+        similar_asset.asset_description,
+        similar_asset.asset_compromise_status_id,
+        similar_asset.asset_id,
+        similar_asset.case_id
+    ).join(
+        similar_asset, and_(
+            similar_asset.asset_inventory_id == CaseAssets.asset_inventory_id,
+            similar_asset.case_id != caseid
+        )
+    ).join(
+        Cases, Cases.case_id == similar_asset.case_id
     ).filter(
-        Cases.client_id == customer_id,
-        CaseAssets.case_id != caseid
+        ac_user_cases_access_clause(similar_asset.case_id, user_id),
+        *conditions
+    ).all()
+
+    similar_assets = {}
+    for lasset in linked_assets:
+        lasset = lasset._asdict()
+        similar_assets.setdefault(lasset.pop('source_asset_id'), []).append(lasset)
+
+    return similar_assets
+
+
+def get_asset_inventory_history(asset_id, caseid, user_id):
+    """
+    Get the history of an asset across the cases of its customer, from the assets inventory.
+    Only the cases the user can access are returned.
+
+    :param asset_id: Asset ID
+    :param caseid: Case ID of the asset
+    :param user_id: ID of the requesting user
+    :return: List of dict, ordered by case opening date
+    """
+    inventory_asset = aliased(CaseAssets)
+
+    history = CaseAssets.query.with_entities(
+        Cases.case_id,
+        Cases.name.label('case_name'),
+        Cases.open_date.label('case_open_date'),
+        Cases.close_date.label('case_close_date'),
+        inventory_asset.asset_id,
+        inventory_asset.asset_name,
+        inventory_asset.asset_ip,
+        inventory_asset.asset_domain,
+        inventory_asset.asset_compromise_status_id,
+        inventory_asset.date_added,
+        inventory_asset.date_update
+    ).join(
+        inventory_asset, inventory_asset.asset_inventory_id == CaseAssets.asset_inventory_id
+    ).join(
+        Cases, Cases.case_id == inventory_asset.case_id
     ).filter(
-        CaseAssets.asset_name == asset_name,
-        CaseAssets.asset_type_id == asset_type_id,
-        Cases.case_id.in_(cases_limitation)
-    ).join(CaseAssets.case).all()
+        ac_user_cases_access_clause(inventory_asset.case_id, user_id),
+        CaseAssets.asset_id == asset_id,
+        CaseAssets.case_id == caseid
+    ).order_by(
+        Cases.open_date, inventory_asset.asset_id
+    ).all()
 
-    return (lasset._asdict() for lasset in linked_assets)
+    return [row._asdict() for row in history]
 
 
 def delete_ioc_asset_link(asset_id):
@@ -249,18 +538,13 @@ def set_ioc_links(ioc_list, asset_id):
     if ioc_list is None:
         return False, "Empty IOC list"
 
-    # Reset IOC list
-    delete_ioc_asset_link(asset_id)
-
-    for ioc in ioc_list:
-        ial = IocAssetLink()
-        ial.asset_id = asset_id
-        ial.ioc_id = ioc
-
-        db.session.add(ial)
-
     try:
+        sync_links(IocAssetLink,
+                   owner={'asset_id': asset_id},
+                   target_column='ioc_id',
+                   target_ids=ioc_list)
         db.session.commit()
+
     except Exception as e:
         db.session.rollback()
         log.exception(e)
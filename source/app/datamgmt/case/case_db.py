@@ -19,7 +19,6 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import datetime
 
-import binascii
 from sqlalchemy import and_
 
 from app import db
@@ -27,6 +26,7 @@ from app.models import Tags
 from app.models.cases import CaseProtagonist
 from app.models.cases import CaseTags
 from app.models.cases import Cases
+from app.models.cases import description_crc32
 from app.models.models import CaseTemplateReport
 from app.models.models import Client
 from app.models.models import Languages
@@ -78,13 +78,21 @@ def case_get_desc(caseid):
 
 
 def case_get_desc_crc(caseid):
-    partial_case = case_get_desc(caseid)
+    partial_case = Cases.query.with_entities(
+        Cases.description,
+        Cases.description_crc32
+    ).filter(
+        Cases.case_id == caseid
+    ).first()
 
     if partial_case:
         desc = partial_case.description
         if not desc:
             desc = ""
-        desc_crc32 = binascii.crc32(desc.encode('utf-8'))
+        desc_crc32 = partial_case.description_crc32
+        if desc_crc32 is None:
+            desc_crc32 = description_crc32(desc)
+
     else:
         desc = None
         desc_crc32 = None
@@ -92,6 +100,30 @@ def case_get_desc_crc(caseid):
     return desc_crc32, desc
 
 
+def case_get_desc_crc_only(caseid):
+    """
+    Get the stored checksum of a case description, without loading the description
+
+    :param caseid: Case ID
+    :return: Checksum, None if the case doesn't exist
+    """
+    partial_case = Cases.query.with_entities(
+        Cases.description_crc32
+    ).filter(
+        Cases.case_id == caseid
+    ).first()
+
+    if partial_case is None:
+        return None
+
+    if partial_case.description_crc32 is None:
+        # Not computed yet for this case
+        desc_crc32, _ = case_get_desc_crc(caseid)
+        return desc_crc32
+
+    return partial_case.description_crc32
+
+
 def case_set_desc_crc(desc, caseid):
     lcase = get_case(caseid)
 
@@ -100,9 +132,9 @@ def case_set_desc_crc(desc, caseid):
             desc = ""
         lcase.description = desc
         db.session.commit()
-        return True
+        return lcase.description_crc32
 
-    return False
+    return None
 
 
 def get_case_report_template():
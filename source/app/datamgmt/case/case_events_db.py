@@ -21,6 +21,8 @@ from flask_login import current_user
 from sqlalchemy import and_
 
 from app import db
+from app.datamgmt.links import add_missing_links
+from app.datamgmt.links import sync_links
 from app.datamgmt.states import update_timeline_state
 from app.models import AssetsType
 from app.models import CaseAssets
@@ -240,38 +242,21 @@ def get_event_iocs_ids(event_id, caseid):
 
 def update_event_assets(event_id, caseid, assets_list, iocs_list, sync_iocs_assets):
 
-    CaseEventsAssets.query.filter(
-        CaseEventsAssets.event_id == event_id,
-        CaseEventsAssets.case_id == caseid
-    ).delete()
-
-    for asset in assets_list:
-        try:
-
-            cea = CaseEventsAssets()
-            cea.asset_id = int(asset)
-            cea.event_id = event_id
-            cea.case_id = caseid
-
-            db.session.add(cea)
-
-            if sync_iocs_assets:
-                for ioc in iocs_list:
-                    link = IocAssetLink.query.filter(
-                        IocAssetLink.asset_id == int(asset),
-                        IocAssetLink.ioc_id == int(ioc)
-                    ).first()
-
-                    if link is None:
+    try:
+        sync_links(CaseEventsAssets,
+                   owner={'event_id': event_id, 'case_id': caseid},
+                   target_column='asset_id',
+                   target_ids=assets_list)
 
-                        ial = IocAssetLink()
-                        ial.asset_id = int(asset)
-                        ial.ioc_id = int(ioc)
+        if sync_iocs_assets:
+            add_missing_links(IocAssetLink,
+                              left_column='asset_id',
+                              right_column='ioc_id',
+                              pairs=[(asset, ioc) for asset in assets_list or [] for ioc in iocs_list or []])
 
-                        db.session.add(ial)
-
-        except Exception as e:
-            return False, str(e)
+    except Exception as e:
+        db.session.rollback()
+        return False, str(e)
 
     db.session.commit()
     return True, ''
@@ -279,23 +264,15 @@ def update_event_assets(event_id, caseid, assets_list, iocs_list, sync_iocs_asse
 
 def update_event_iocs(event_id, caseid, iocs_list):
 
-    CaseEventsIoc.query.filter(
-        CaseEventsIoc.event_id == event_id,
-        CaseEventsIoc.case_id == caseid
-    ).delete()
-
-    for ioc in iocs_list:
-        try:
-
-            cea = CaseEventsIoc()
-            cea.ioc_id = int(ioc)
-            cea.event_id = event_id
-            cea.case_id = caseid
-
-            db.session.add(cea)
+    try:
+        sync_links(CaseEventsIoc,
+                   owner={'event_id': event_id, 'case_id': caseid},
+                   target_column='ioc_id',
+                   target_ids=iocs_list)
 
-        except Exception as e:
-            return False, str(e)
+    except Exception as e:
+        db.session.rollback()
+        return False, str(e)
 
     db.session.commit()
     return True, ''
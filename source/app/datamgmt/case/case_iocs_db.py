@@ -17,12 +17,21 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import hashlib
+
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import func
 
 from app import db
+from app.datamgmt.manage.manage_ioc_types_db import check_ioc_value_format
+from app.datamgmt.manage.manage_ioc_types_db import get_registered_ioc_type
+from app.datamgmt.manage.manage_ioc_types_db import get_registered_ioc_type_by_name
+from app.datamgmt.manage.manage_ioc_types_db import refresh_ioc_types_registry
+from app.datamgmt.search.search_db import escape_like
 from app.datamgmt.states import update_ioc_state
-from app.iris_engine.access_control.utils import ac_get_fast_user_cases_access
+from app.iris_engine.access_control.utils import ac_user_cases_access_clause
+from app.iris_engine.utils.common import normalize_ioc_value
 from app.models import CaseEventsIoc
 from app.models import Cases
 from app.models import Client
@@ -49,6 +58,16 @@ def get_iocs(caseid):
     return iocs
 
 
+def get_case_iocs_values_map(caseid):
+    """
+    Map the lowercased values of the IOCs of a case to their IDs
+
+    :param caseid: Case ID
+    :return: Dict of IOC value -> IOC ID
+    """
+    return {ioc.ioc_value.strip().lower(): ioc.ioc_id for ioc in get_iocs(caseid) if ioc.ioc_value}
+
+
 def get_ioc(ioc_id, caseid=None):
     if caseid:
         return IocLink.query.with_entities(
@@ -70,6 +89,7 @@ def update_ioc(ioc_type, ioc_tags, ioc_value, ioc_description, ioc_tlp, userid,
         ioc.ioc_type = ioc_type
         ioc.ioc_tags = ioc_tags
         ioc.ioc_value = ioc_value
+        ioc.ioc_value_normalized = get_ioc_normalized_value(ioc_value, ioc.ioc_type_id)
         ioc.ioc_description = ioc_description
         ioc.ioc_tlp_id = ioc_tlp
         ioc.user_id = userid
@@ -94,6 +114,7 @@ def delete_ioc(ioc, caseid):
                 ).all()
 
         if res:
+            update_ioc_state(caseid=caseid, object_ids=[ioc.ioc_id], operation='delete')
             return False
 
         IocAssetLink.query.filter(
@@ -117,12 +138,235 @@ def delete_ioc(ioc, caseid):
 
         db.session.delete(ioc)
 
-        update_ioc_state(caseid=caseid)
+        update_ioc_state(caseid=caseid, object_ids=[ioc.ioc_id], operation='delete')
 
     return True
 
 
-def get_detailed_iocs(caseid):
+def get_bulk_iocs_ids(caseid, ioc_ids=None, ioc_filters=None):
+    """
+    Resolve the IOCs of a case targeted by a bulk operation, either from a list of IDs,
+    from filters or both. Only the IOCs linked to the case are returned.
+
+    :param caseid: Case ID
+    :param ioc_ids: List of IOC IDs
+    :param ioc_filters: Dict of filters. Supports ioc_type_id, ioc_tlp_id and ioc_tags
+    :return: List of IOC IDs
+    """
+    conditions = [IocLink.case_id == caseid]
+
+    if ioc_ids is not None:
+        conditions.append(IocLink.ioc_id.in_(ioc_ids))
+
+    if ioc_filters:
+        if ioc_filters.get('ioc_type_id') is not None:
+            conditions.append(Ioc.ioc_type_id == ioc_filters.get('ioc_type_id'))
+
+        if ioc_filters.get('ioc_tlp_id') is not None:
+            conditions.append(Ioc.ioc_tlp_id == ioc_filters.get('ioc_tlp_id'))
+
+        if ioc_filters.get('ioc_tags'):
+            conditions.append(
+                func.concat(',', func.replace(Ioc.ioc_tags, ' ', ''), ',').like(
+                    f"%,{escape_like(ioc_filters.get('ioc_tags').strip())},%", escape='\\'
+                )
+            )
+
+    iocs = IocLink.query.with_entities(
+        IocLink.ioc_id
+    ).filter(
+        *conditions
+    ).join(
+        IocLink.ioc
+    ).all()
+
+    return [row.ioc_id for row in iocs]
+
+
+def bulk_delete_iocs(ioc_ids, caseid):
+    """
+    Unlink a set of IOCs from a case, and delete the ones which are not linked to any other case,
+    along with their assets links, events links and comments. Everything is done in one transaction.
+
+    :param ioc_ids: List of IOC IDs linked to the case
+    :param caseid: Case ID
+    :return: Tuple of the deleted IOC IDs and the unlinked IOC IDs
+    """
+    if not ioc_ids:
+        return [], []
+
+    IocLink.query.filter(
+        IocLink.case_id == caseid,
+        IocLink.ioc_id.in_(ioc_ids)
+    ).delete(synchronize_session=False)
+
+    still_linked = IocLink.query.with_entities(
+        IocLink.ioc_id
+    ).filter(
+        IocLink.ioc_id.in_(ioc_ids)
+    ).distinct().all()
+
+    still_linked = {row.ioc_id for row in still_linked}
+    deleted_ids = [ioc_id for ioc_id in ioc_ids if ioc_id not in still_linked]
+    unlinked_ids = [ioc_id for ioc_id in ioc_ids if ioc_id in still_linked]
+
+    if deleted_ids:
+        IocAssetLink.query.filter(
+            IocAssetLink.ioc_id.in_(deleted_ids)
+        ).delete(synchronize_session=False)
+
+        CaseEventsIoc.query.filter(
+            CaseEventsIoc.ioc_id.in_(deleted_ids)
+        ).delete(synchronize_session=False)
+
+        com_ids = IocComments.query.with_entities(
+            IocComments.comment_id
+        ).filter(
+            IocComments.comment_ioc_id.in_(deleted_ids)
+        ).all()
+        com_ids = [c.comment_id for c in com_ids]
+
+        IocComments.query.filter(
+            IocComments.comment_ioc_id.in_(deleted_ids)
+        ).delete(synchronize_session=False)
+
+        if com_ids:
+            Comments.query.filter(
+                Comments.comment_id.in_(com_ids)
+            ).delete(synchronize_session=False)
+
+        Ioc.query.filter(
+            Ioc.ioc_id.in_(deleted_ids)
+        ).delete(synchronize_session=False)
+
+    update_ioc_state(caseid=caseid, object_ids=deleted_ids + unlinked_ids, operation='delete')
+    db.session.commit()
+
+    return deleted_ids, unlinked_ids
+
+
+def _merge_tags(tags, tags_add=None, tags_remove=None):
+    tags_list = [tag.strip() for tag in (tags or '').split(',') if tag.strip()]
+
+    for tag in tags_add or []:
+        if tag not in tags_list:
+            tags_list.append(tag)
+
+    if tags_remove:
+        tags_list = [tag for tag in tags_list if tag not in tags_remove]
+
+    return ','.join(tags_list)
+
+
+def bulk_update_iocs(ioc_ids, caseid, user_id, ioc_type_id=None, ioc_tlp_id=None, tags_add=None, tags_remove=None):
+    """
+    Update the type, TLP and tags of a set of IOCs in one transaction. The TLP is set with a single
+    UPDATE, the type and tags changes are computed in memory and written with a single bulk update.
+
+    IOCs whose value doesn't match the new type or which would collide with an existing IOC are skipped.
+
+    :param ioc_ids: List of IOC IDs linked to the case
+    :param caseid: Case ID
+    :param user_id: ID of the user doing the update
+    :param ioc_type_id: New IOC type ID, if any
+    :param ioc_tlp_id: New TLP ID, if any
+    :param tags_add: List of tags to add
+    :param tags_remove: List of tags to remove
+    :return: Tuple of the updated IOC IDs and a list of errors
+    """
+    if not ioc_ids:
+        return [], []
+
+    errors = []
+    updated_ids = list(ioc_ids)
+
+    if ioc_type_id is not None or tags_add or tags_remove:
+        iocs = Ioc.query.with_entities(
+            Ioc.ioc_id,
+            Ioc.ioc_value,
+            Ioc.ioc_type_id,
+            Ioc.ioc_tags
+        ).filter(
+            Ioc.ioc_id.in_(ioc_ids)
+        ).all()
+
+        ioc_type = get_registered_ioc_type(ioc_type_id) if ioc_type_id is not None else None
+
+        mappings = []
+        for ioc in iocs:
+            mapping = {
+                'ioc_id': ioc.ioc_id,
+                'user_id': user_id
+            }
+
+            if ioc_type:
+                error = check_ioc_value_format(ioc.ioc_value, ioc_type)
+                if error:
+                    errors.append(f"{ioc.ioc_value}: {error}")
+                    continue
+
+                mapping['ioc_type_id'] = ioc_type.type_id
+                mapping['ioc_value_normalized'] = normalize_ioc_value(ioc.ioc_value, ioc_type.type_name)
+
+            if tags_add or tags_remove:
+                mapping['ioc_tags'] = _merge_tags(ioc.ioc_tags, tags_add, tags_remove)
+
+            mappings.append(mapping)
+
+        if ioc_type:
+            # Discard the IOCs which would end up with the same normalized value and type as another one
+            candidates = {}
+            for mapping in mappings:
+                key = mapping['ioc_value_normalized']
+                if key in candidates:
+                    errors.append(f"IOC {mapping['ioc_id']}: same value as IOC {candidates[key]} once retyped")
+                    continue
+                candidates[key] = mapping['ioc_id']
+
+            existing = Ioc.query.with_entities(
+                Ioc.ioc_id,
+                Ioc.ioc_value_normalized
+            ).filter(
+                func.md5(Ioc.ioc_value_normalized).in_(
+                    [hashlib.md5(value.encode('utf-8')).hexdigest() for value in candidates if value is not None]
+                ),
+                Ioc.ioc_type_id == ioc_type.type_id,
+                Ioc.ioc_id.notin_(ioc_ids)
+            ).all() if candidates else []
+
+            for row in existing:
+                if row.ioc_value_normalized not in candidates:
+                    continue
+
+                errors.append(f"IOC {candidates[row.ioc_value_normalized]}: "
+                              f"already exists as IOC {row.ioc_id} with this type")
+                candidates.pop(row.ioc_value_normalized)
+
+            kept_ids = set(candidates.values())
+            mappings = [mapping for mapping in mappings if mapping['ioc_id'] in kept_ids]
+
+        db.session.bulk_update_mappings(Ioc, mappings)
+        updated_ids = [mapping['ioc_id'] for mapping in mappings]
+
+    if ioc_tlp_id is not None and updated_ids:
+        Ioc.query.filter(
+            Ioc.ioc_id.in_(updated_ids)
+        ).update({
+            Ioc.ioc_tlp_id: ioc_tlp_id,
+            Ioc.user_id: user_id
+        }, synchronize_session=False)
+
+    update_ioc_state(caseid=caseid, object_ids=updated_ids)
+    db.session.commit()
+
+    return updated_ids, errors
+
+
+def get_detailed_iocs(caseid, ioc_ids=None):
+    conditions = [IocLink.case_id == caseid, IocLink.ioc_id == Ioc.ioc_id]
+    if ioc_ids is not None:
+        conditions.append(IocLink.ioc_id.in_(ioc_ids))
+
     detailed_iocs = IocLink.query.with_entities(
         Ioc.ioc_id,
         Ioc.ioc_uuid,
@@ -137,8 +381,7 @@ def get_detailed_iocs(caseid):
         Tlp.tlp_bscolor,
         Ioc.ioc_tlp_id
     ).filter(
-        and_(IocLink.case_id == caseid,
-             IocLink.ioc_id == Ioc.ioc_id)
+        and_(*conditions)
     ).join(IocLink.ioc,
            Ioc.tlp,
            Ioc.ioc_type
@@ -148,12 +391,6 @@ def get_detailed_iocs(caseid):
 
 
 def get_ioc_links(ioc_id, caseid):
-    search_condition = and_(Cases.case_id.in_([]))
-
-    user_search_limitations = ac_get_fast_user_cases_access(current_user.id)
-    if user_search_limitations:
-        search_condition = and_(Cases.case_id.in_(user_search_limitations))
-
     ioc_link = IocLink.query.with_entities(
         Cases.case_id,
         Cases.name.label('case_name'),
@@ -161,19 +398,55 @@ def get_ioc_links(ioc_id, caseid):
     ).filter(and_(
         IocLink.ioc_id == ioc_id,
         IocLink.case_id != caseid,
-        search_condition)
+        ac_user_cases_access_clause(IocLink.case_id, current_user.id))
     ).join(IocLink.case, Cases.client).all()
 
     return ioc_link
 
 
+def get_ioc_normalized_value(ioc_value, ioc_type_id):
+    ioc_type = get_registered_ioc_type(ioc_type_id)
+
+    return normalize_ioc_value(ioc_value, ioc_type.type_name if ioc_type else None)
+
+
+def _ioc_normalized_value_clause(ioc_value_normalized, ioc_type_id):
+    # The unicity index is on the digest of the values, the equality discards the collisions
+    return and_(
+        func.md5(Ioc.ioc_value_normalized) == func.md5(ioc_value_normalized),
+        Ioc.ioc_value_normalized == ioc_value_normalized,
+        Ioc.ioc_type_id == ioc_type_id
+    )
+
+
 def find_ioc(ioc_value, ioc_type_id):
-    ioc = Ioc.query.filter(Ioc.ioc_value == ioc_value,
-                           Ioc.ioc_type_id == ioc_type_id).first()
+    ioc = Ioc.query.filter(
+        _ioc_normalized_value_clause(get_ioc_normalized_value(ioc_value, ioc_type_id), ioc_type_id)
+    ).first()
 
     return ioc
 
 
+def set_ioc_normalized_value(ioc):
+    """
+    Update the normalized value of an IOC after its value or type changed
+
+    :param ioc: IOC object
+    :return: False if another IOC already has the same normalized value and type, else True
+    """
+    with db.session.no_autoflush:
+        ioc.ioc_value_normalized = get_ioc_normalized_value(ioc.ioc_value, ioc.ioc_type_id)
+
+        duplicate = Ioc.query.with_entities(
+            Ioc.ioc_id
+        ).filter(
+            _ioc_normalized_value_clause(ioc.ioc_value_normalized, ioc.ioc_type_id),
+            Ioc.ioc_id != ioc.ioc_id
+        ).first()
+
+    return duplicate is None
+
+
 def add_ioc(ioc, user_id, caseid):
     if not ioc:
         return None, False
@@ -183,10 +456,12 @@ def add_ioc(ioc, user_id, caseid):
     db_ioc = find_ioc(ioc.ioc_value, ioc.ioc_type_id)
 
     if not db_ioc:
+        ioc.ioc_value_normalized = get_ioc_normalized_value(ioc.ioc_value, ioc.ioc_type_id)
 
         db.session.add(ioc)
 
-        update_ioc_state(caseid=caseid)
+        # The IOC shows up in the case once linked
+        update_ioc_state(caseid=caseid, object_ids=[])
         db.session.commit()
         return ioc, False
 
@@ -216,6 +491,7 @@ def add_ioc_link(ioc_id, caseid):
         link.ioc_id = ioc_id
 
         db.session.add(link)
+        update_ioc_state(caseid=caseid, object_ids=[ioc_id], operation='create')
         db.session.commit()
 
         return False
@@ -243,23 +519,17 @@ def add_ioc_type(name:str, description:str, taxonomy:str):
 
     db.session.add(ioct)
     db.session.commit()
+
+    refresh_ioc_types_registry()
     return ioct
 
 
 def check_ioc_type_id(type_id: int):
-    type_id = IocType.query.filter(
-        IocType.type_id == type_id
-    ).first()
-
-    return type_id
+    return get_registered_ioc_type(type_id)
 
 
 def get_ioc_type_id(type_name: str):
-    type_id = IocType.query.filter(
-        IocType.type_name == type_name
-    ).first()
-
-    return type_id if type_id else None
+    return get_registered_ioc_type_by_name(type_name)
 
 
 def get_tlps():
@@ -19,10 +19,17 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import desc
+from sqlalchemy import func
+from sqlalchemy import or_
 
 from app import db
 from app.datamgmt.manage.manage_attribute_db import get_default_custom_attributes
+from app.datamgmt.search.search_db import escape_like
 from app.datamgmt.states import update_notes_state
+from app.iris_engine.access_control.utils import ac_user_cases_access_clause
+from app.models import Cases
+from app.models import Client
 from app.models import Comments
 from app.models import Notes
 from app.models import NotesComments
@@ -165,8 +172,18 @@ def get_notes_from_group(caseid, group_id):
     return notes
 
 
-def get_groups_detail(caseid):
-    groups = NotesGroupLink.query.with_entities(
+NOTES_CONTENTS_MAX_BATCH = 100
+
+
+def get_notes_directory(caseid):
+    """
+    List the groups of notes of a case with their notes, without the notes contents. The groups are fetched
+    with their notes in a single query.
+
+    :param caseid: Case ID
+    :return: List of dict of groups, each with a list of notes
+    """
+    rows = NotesGroup.query.with_entities(
         NotesGroup.group_id,
         NotesGroup.group_uuid,
         NotesGroup.group_title,
@@ -176,18 +193,60 @@ def get_groups_detail(caseid):
         User.user,
         Notes.note_lastupdate
     ).filter(
-        NotesGroupLink.case_id == caseid,
-    ).join(
-        NotesGroupLink.note,
-        NotesGroupLink.note_group,
-        Notes.user
-    ).group_by(
-        NotesGroup.group_id,
-        Notes.note_id,
-        User.user
+        NotesGroup.group_case_id == caseid
+    ).outerjoin(
+        NotesGroupLink, and_(
+            NotesGroupLink.group_id == NotesGroup.group_id,
+            NotesGroupLink.case_id == caseid
+        )
+    ).outerjoin(
+        Notes, Notes.note_id == NotesGroupLink.note_id
+    ).outerjoin(
+        User, User.id == Notes.note_user
+    ).order_by(
+        NotesGroup.group_id, Notes.note_id
     ).all()
 
-    return groups
+    groups = {}
+    for row in rows:
+        group = groups.get(row.group_id)
+        if group is None:
+            group = {
+                'group_id': row.group_id,
+                'group_uuid': row.group_uuid,
+                'group_title': row.group_title,
+                'notes': []
+            }
+            groups[row.group_id] = group
+
+        if row.note_id is not None:
+            group['notes'].append({
+                'note_id': row.note_id,
+                'note_uuid': row.note_uuid,
+                'note_title': row.note_title,
+                'user': row.user,
+                'note_lastupdate': row.note_lastupdate
+            })
+
+    return list(groups.values())
+
+
+def get_notes_contents(note_ids, caseid):
+    """
+    Fetch the contents of a batch of notes of a case, e.g. to prefetch the notes displayed
+
+    :param note_ids: List of notes IDs
+    :param caseid: Case ID
+    :return: List of notes contents
+    """
+    return Notes.query.with_entities(
+        Notes.note_id,
+        Notes.note_content,
+        Notes.note_lastupdate
+    ).filter(
+        Notes.note_id.in_(note_ids),
+        Notes.note_case_id == caseid
+    ).all()
 
 
 def get_group_details(group_id, caseid):
@@ -292,16 +351,77 @@ def update_note_group(group_title, group_id, caseid):
         return None
 
 
-def find_pattern_in_notes(pattern, caseid):
-    notes = Notes.query.filter(
-        Notes.note_content.like(pattern),
-        Notes.note_case_id == caseid
-    ).with_entities(
+NOTES_SEARCH_MAX_PER_PAGE = 100
+NOTES_SEARCH_HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=25, MinWords=8'
+
+
+def search_notes(search_term, caseid=None, user_id=None, page=1, per_page=25):
+    """
+    Full-text search in the notes titles and contents, ranked by relevance. The terms follow the web search
+    syntax (quoted phrases, OR, -exclusion), and are also matched as a substring of the titles and contents
+    with the trigram indexes. The snippets are only built for the returned page.
+
+    :param search_term: Terms to search
+    :param caseid: Restrict the search to a case. All the cases are searched if None
+    :param user_id: Restrict the search to the cases this user can access
+    :param page: Page number, starting at 1
+    :param per_page: Number of notes per page, capped to NOTES_SEARCH_MAX_PER_PAGE
+    :return: Tuple of the list of notes of the page, and a bool indicating if there are more pages
+    """
+    page = max(int(page or 1), 1)
+    per_page = min(max(int(per_page or 25), 1), NOTES_SEARCH_MAX_PER_PAGE)
+
+    ts_query = func.websearch_to_tsquery('simple', search_term)
+    rank = func.ts_rank_cd(Notes.note_search_vector, ts_query) + func.similarity(Notes.note_title, search_term)
+    pattern = f'%{escape_like(search_term)}%'
+
+    conditions = [
+        or_(
+            Notes.note_search_vector.op('@@')(ts_query),
+            Notes.note_title.ilike(pattern, escape='\\'),
+            Notes.note_content.ilike(pattern, escape='\\')
+        )
+    ]
+    if caseid is not None:
+        conditions.append(Notes.note_case_id == caseid)
+
+    if user_id is not None:
+        conditions.append(ac_user_cases_access_clause(Notes.note_case_id, user_id))
+
+    matches = Notes.query.with_entities(
         Notes.note_id,
-        Notes.note_title
+        Notes.note_title,
+        Notes.note_content,
+        Notes.note_case_id,
+        rank.label('rank')
+    ).filter(
+        *conditions
+    ).order_by(
+        desc('rank'), Notes.note_id.desc()
+    ).limit(
+        per_page + 1
+    ).offset(
+        (page - 1) * per_page
+    ).subquery()
+
+    notes = db.session.query(
+        matches.c.note_id,
+        matches.c.note_title,
+        func.ts_headline('simple', matches.c.note_content, ts_query,
+                         NOTES_SEARCH_HEADLINE_OPTIONS).label('snippet'),
+        matches.c.rank,
+        Cases.case_id,
+        Cases.name.label('case_name'),
+        Client.name.label('client_name')
+    ).join(
+        Cases, Cases.case_id == matches.c.note_case_id
+    ).join(
+        Client, Client.client_id == Cases.client_id
+    ).order_by(
+        matches.c.rank.desc(), matches.c.note_id.desc()
     ).all()
 
-    return notes
+    return notes[:per_page], len(notes) > per_page
 
 
 def get_case_note_comments(note_id):
@@ -16,17 +16,25 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
-from sqlalchemy import and_
 from sqlalchemy import desc
 
+from app import cache
+from app.datamgmt.search.search_db import escape_like
+from app.iris_engine.access_control.utils import ac_get_recent_user_cases_cache_key
 from app.models import Cases
 from app.models import Client
 from app.models.authorization import CaseAccessLevel
 from app.models.authorization import UserCaseEffectiveAccess
 
+# Most recent cases of a user kept in the cache, and for how many seconds
+CTX_RECENT_CASES_COUNT = 100
+CTX_RECENT_CASES_CACHE_TIMEOUT = 30
+# Shorter searches are served from the recent cases. The trigram index needs 3 characters.
+CTX_SEARCH_MIN_LENGTH = 3
 
-def ctx_get_user_cases(user_id, max_results: int = 100):
-    uceas = UserCaseEffectiveAccess.query.with_entities(
+
+def _ctx_user_cases_query(user_id):
+    return UserCaseEffectiveAccess.query.with_entities(
         Cases.case_id,
         Cases.name,
         Client.name.label('customer_name'),
@@ -35,17 +43,17 @@ def ctx_get_user_cases(user_id, max_results: int = 100):
     ).join(
         UserCaseEffectiveAccess.case,
         Cases.client
+    ).filter(
+        UserCaseEffectiveAccess.user_id == user_id,
+        UserCaseEffectiveAccess.access_level != CaseAccessLevel.deny_all.value
     ).order_by(
         desc(Cases.case_id)
-    ).filter(
-        UserCaseEffectiveAccess.user_id == user_id
-    ).limit(max_results).all()
+    )
+
 
+def _ctx_format_cases(uceas):
     results = []
     for ucea in uceas:
-        if ucea.access_level & CaseAccessLevel.deny_all.value == CaseAccessLevel.deny_all.value:
-            continue
-
         row = ucea._asdict()
         if ucea.access_level == CaseAccessLevel.read_only.value:
             row['access'] = '[Read-only]'
@@ -57,35 +65,48 @@ def ctx_get_user_cases(user_id, max_results: int = 100):
     return results
 
 
-def ctx_search_user_cases(search, user_id, max_results: int = 100):
-    uceas = UserCaseEffectiveAccess.query.with_entities(
-        Cases.case_id,
-        Cases.name,
-        Client.name.label('customer_name'),
-        Cases.close_date,
-        UserCaseEffectiveAccess.access_level
-    ).join(
-        UserCaseEffectiveAccess.case,
-        Cases.client
-    ).order_by(
-        desc(Cases.case_id)
-    ).filter(and_(
-        UserCaseEffectiveAccess.user_id == user_id,
-        Cases.name.ilike('%{}%'.format(search))
-    )
-    ).limit(max_results).all()
+def ctx_get_recent_user_cases(user_id):
+    """
+    Get the CTX_RECENT_CASES_COUNT most recent cases a user can access. They are cached for a few seconds
+    so the case selector is served from memory while it is used.
 
-    results = []
-    for ucea in uceas:
-        if ucea.access_level & CaseAccessLevel.deny_all.value == CaseAccessLevel.deny_all.value:
-            continue
+    :param user_id: ID of the user
+    :return: List of dict
+    """
+    cache_key = ac_get_recent_user_cases_cache_key(user_id)
+    cases = cache.get(cache_key)
+    if cases is None:
+        cases = _ctx_format_cases(_ctx_user_cases_query(user_id).limit(CTX_RECENT_CASES_COUNT).all())
+        cache.set(cache_key, cases, timeout=CTX_RECENT_CASES_CACHE_TIMEOUT)
 
-        row = ucea._asdict()
-        if ucea.access_level == CaseAccessLevel.read_only.value:
-            row['access'] = '[Read-only]'
-        else:
-            row['access'] = ''
+    return cases
 
-        results.append(row)
 
-    return results
\ No newline at end of file
+def ctx_get_user_cases(user_id, max_results: int = 100):
+    if max_results <= CTX_RECENT_CASES_COUNT:
+        return ctx_get_recent_user_cases(user_id)[:max_results]
+
+    return _ctx_format_cases(_ctx_user_cases_query(user_id).limit(max_results).all())
+
+
+def ctx_search_user_cases(search, user_id, max_results: int = 100):
+    """
+    Search the cases a user can access by name. Searches shorter than CTX_SEARCH_MIN_LENGTH are matched
+    against the recent cases only, the longer ones use the trigram index of the cases names.
+
+    :param search: Text to look for in the names
+    :param user_id: ID of the user
+    :param max_results: Maximum number of cases returned
+    :return: List of dict
+    """
+    if len(search) < CTX_SEARCH_MIN_LENGTH:
+        search = search.lower()
+        return [
+            case for case in ctx_get_recent_user_cases(user_id) if search in (case['name'] or '').lower()
+        ][:max_results]
+
+    uceas = _ctx_user_cases_query(user_id).filter(
+        Cases.name.ilike(f'%{escape_like(search)}%', escape='\\')
+    ).limit(max_results).all()
+
+    return _ctx_format_cases(uceas)
@@ -17,17 +17,36 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from datetime import datetime
+from datetime import timedelta
 from flask_login import current_user
 from sqlalchemy import and_
 from sqlalchemy import desc
+from sqlalchemy import func
 
+from app import cache
 from app import db
 from app.models import CaseTasks, TaskAssignee
 from app.models import Cases
+from app.models import DashboardCounter
 from app.models import GlobalTasks
 from app.models import TaskStatus
+from app.models import UserCaseActivity
 from app.models.authorization import User
 
+# Seconds the dashboard counters are served from the cache
+DASHBOARD_COUNTERS_CACHE_TIMEOUT = 60
+DASHBOARD_USER_COUNTERS_CACHE_TIMEOUT = 30
+# Seconds the case charts are cached. They are computed again as soon as a case is created or deleted,
+# and the timeout bounds the staleness after a case open date, customer or classification is edited.
+DASHBOARD_CHARTS_CACHE_TIMEOUT = 300
+
+CASES_CHARTS_GRANULARITIES = {
+    'day': '%-d/%-m/%Y',
+    'week': '%-d/%-m/%Y',
+    'month': '%-m/%Y'
+}
+
 
 def list_global_tasks():
     ct = GlobalTasks.query.with_entities(
@@ -151,4 +170,88 @@ def get_task_status(task_status_id):
         TaskStatus.id == task_status_id
     ).first()
 
-    return ret
\ No newline at end of file
+    return ret
+
+
+def _get_global_counters():
+    counters = cache.get('dashboard-counters')
+    if counters is None:
+        counters = {
+            counter.counter_name: counter.counter_value for counter in DashboardCounter.query.all()
+        }
+        cache.set('dashboard-counters', counters, timeout=DASHBOARD_COUNTERS_CACHE_TIMEOUT)
+
+    return counters
+
+
+def get_dashboard_counters(user_id):
+    """
+    Get the counters displayed on the dashboard. They are read from the counters maintained by the database,
+    and cached for a short time.
+
+    :param user_id: ID of the user displaying the dashboard
+    :return: Dict
+    """
+    cache_key = f'dashboard-counters-{user_id}'
+    user_open_count = cache.get(cache_key)
+    if user_open_count is None:
+        user_open_count = UserCaseActivity.query.join(
+            Cases, Cases.case_id == UserCaseActivity.case_id
+        ).filter(
+            UserCaseActivity.user_id == user_id,
+            Cases.close_date == None
+        ).count()
+        cache.set(cache_key, user_open_count, timeout=DASHBOARD_USER_COUNTERS_CACHE_TIMEOUT)
+
+    counters = _get_global_counters()
+
+    return {
+        "user_open_count": user_open_count,
+        "cases_open_count": counters.get('cases_open_count', 0),
+        "cases_count": counters.get('cases_count', 0)
+    }
+
+
+def get_cases_opening_charts(granularity='day', client_id=None, classification_id=None, days=365):
+    """
+    Count the cases opened over a period, grouped by day, week or month
+
+    :param granularity: One of CASES_CHARTS_GRANULARITIES
+    :param client_id: Only count the cases of this customer
+    :param classification_id: Only count the cases of this classification
+    :param days: Number of days back the period starts
+    :return: List of the labels and list of the counts, in chronological order
+    """
+    # A new case gets a new highest ID and a deleted one moves the counters, which makes the cached charts outdated
+    last_case_id = db.session.query(func.max(Cases.case_id)).scalar()
+    counters = _get_global_counters()
+    cache_key = (f"dashboard-case-charts-{last_case_id}-{counters.get('cases_count', 0)}-"
+                 f"{counters.get('cases_open_count', 0)}-{granularity}-{client_id}-{classification_id}-{days}")
+    charts = cache.get(cache_key)
+    if charts is not None:
+        return charts
+
+    period = func.date_trunc(granularity, Cases.open_date).label('period')
+    query = db.session.query(
+        period,
+        func.count(Cases.case_id).label('cases_count')
+    ).filter(
+        Cases.open_date > (datetime.utcnow() - timedelta(days=days))
+    )
+
+    if client_id is not None:
+        query = query.filter(Cases.client_id == client_id)
+
+    if classification_id is not None:
+        query = query.filter(Cases.classification_id == classification_id)
+
+    res = query.group_by(period).order_by(period).all()
+
+    label_format = CASES_CHARTS_GRANULARITIES[granularity]
+    charts = [
+        [row.period.strftime(label_format) for row in res],
+        [row.cases_count for row in res]
+    ]
+    cache.set(cache_key, charts, timeout=DASHBOARD_CHARTS_CACHE_TIMEOUT)
+
+    return charts
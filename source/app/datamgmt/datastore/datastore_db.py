@@ -30,6 +30,8 @@ from sqlalchemy import func
 from app import app
 from app import db
 from app.datamgmt.case.case_iocs_db import add_ioc_link
+from app.datamgmt.case.case_iocs_db import find_ioc
+from app.iris_engine.utils.common import normalize_ioc_value
 from app.models import CaseReceivedFile
 from app.models import DataStoreFile
 from app.models import DataStorePath
@@ -350,14 +352,12 @@ def datastore_delete_file(cur_id, cid):
 
 
 def datastore_add_file_as_ioc(dsf, caseid):
-    ioc = Ioc.query.filter(
-        Ioc.ioc_value == dsf.file_sha256
-    ).first()
-
     ioc_type_id = IocType.query.filter(
         IocType.type_name == 'sha256'
     ).first()
 
+    ioc = find_ioc(dsf.file_sha256, ioc_type_id.type_id)
+
     ioc_tlp_id = Tlp.query.filter(
         Tlp.tlp_name == 'amber'
     ).first()
@@ -365,6 +365,7 @@ def datastore_add_file_as_ioc(dsf, caseid):
     if ioc is None:
         ioc = Ioc()
         ioc.ioc_value = dsf.file_sha256
+        ioc.ioc_value_normalized = normalize_ioc_value(dsf.file_sha256, 'sha256')
         ioc.ioc_description = f"SHA256 of {dsf.file_original_name}. Imported from datastore."
         ioc.ioc_type_id = ioc_type_id.type_id
         ioc.ioc_tlp_id = ioc_tlp_id.tlp_id
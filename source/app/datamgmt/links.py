@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from sqlalchemy import tuple_
+
+from app import db
+
+
+def sync_links(link_model, owner: dict, target_column: str, target_ids) -> tuple:
+    """
+    Synchronize the link rows of an object with a list of targets. Only the difference with the
+    existing rows is applied, with at most one select, one delete and one insert statement.
+    Expects a db commit soon after
+
+    Args:
+        link_model: Link model, e.g. CaseEventsAssets
+        owner: Columns values identifying the links of the object, e.g. {'event_id': 1, 'case_id': 2}
+        target_column: Name of the linked column, e.g. 'asset_id'
+        target_ids: IDs of the objects that should be linked
+
+    Returns:
+        Tuple of the sets of added and removed targets IDs
+    """
+    target_ids = {int(target_id) for target_id in target_ids or []}
+    owner_filters = [getattr(link_model, column) == value for column, value in owner.items()]
+    target = getattr(link_model, target_column)
+
+    existing_ids = {row[0] for row in db.session.query(target).filter(*owner_filters).all()}
+
+    added_ids = target_ids - existing_ids
+    removed_ids = existing_ids - target_ids
+
+    if removed_ids:
+        db.session.query(link_model).filter(
+            *owner_filters,
+            target.in_(removed_ids)
+        ).delete(synchronize_session=False)
+
+    if added_ids:
+        db.session.execute(
+            link_model.__table__.insert(),
+            [{**owner, target_column: target_id} for target_id in added_ids]
+        )
+
+    return added_ids, removed_ids
+
+
+def add_missing_links(link_model, left_column: str, right_column: str, pairs) -> set:
+    """
+    Insert the link rows of a list of pairs that don't exist yet, without removing any other link.
+    Expects a db commit soon after
+
+    Args:
+        link_model: Link model, e.g. IocAssetLink
+        left_column: Name of the first linked column, e.g. 'asset_id'
+        right_column: Name of the second linked column, e.g. 'ioc_id'
+        pairs: Iterable of (left ID, right ID)
+
+    Returns:
+        Set of the added pairs
+    """
+    pairs = {(int(left), int(right)) for left, right in pairs or []}
+    if not pairs:
+        return set()
+
+    left = getattr(link_model, left_column)
+    right = getattr(link_model, right_column)
+
+    existing_pairs = {
+        (row[0], row[1]) for row in db.session.query(left, right).filter(
+            tuple_(left, right).in_(pairs)
+        ).all()
+    }
+
+    added_pairs = pairs - existing_pairs
+    if added_pairs:
+        db.session.execute(
+            link_model.__table__.insert(),
+            [{left_column: left_id, right_column: right_id} for left_id, right_id in added_pairs]
+        )
+
+    return added_pairs
@@ -17,32 +17,52 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
-from pathlib import Path
-
 from datetime import datetime
 from sqlalchemy import and_
+from sqlalchemy import or_
+from sqlalchemy import select
 from sqlalchemy.orm import aliased
 
 from app import db
+from app.datamgmt.case.case_assets_db import prune_asset_inventory
 from app.datamgmt.case.case_db import get_case_tags
 from app.datamgmt.manage.manage_case_classifications_db import get_case_classification_by_id
+from app.datamgmt.search.search_db import escape_like
 from app.datamgmt.states import delete_case_states
+from app.iris_engine.access_control.socket_access import ac_socket_revoke_case
+from app.iris_engine.access_control.utils import ac_filter_user_cases
+from app.iris_engine.access_control.utils import ac_invalidate_user_cases_cache
+from app.iris_engine.tasker.tasks import chunks
+from app.iris_engine.tasker.tasks import task_delete_datastore_files
+from app.models import AssetComments
 from app.models import CaseAssets, CaseClassification
 from app.models import CaseEventCategory
 from app.models import CaseEventsAssets
 from app.models import CaseEventsIoc
+from app.models import CaseGraphAssets
+from app.models import CaseGraphLinks
+from app.models import CaseKanban
 from app.models import CaseReceivedFile
 from app.models import CaseTasks
 from app.models import Cases
+from app.models import CasesAssetsExt
 from app.models import CasesEvent
 from app.models import Client
+from app.models import Comments
 from app.models import DataStoreFile
 from app.models import DataStorePath
+from app.models import EventComments
+from app.models import EvidencesComments
 from app.models import IocAssetLink
+from app.models import IocComments
 from app.models import IocLink
+from app.models import IrisReport
 from app.models import Notes
 from app.models import NotesGroup
+from app.models import NotesComments
 from app.models import NotesGroupLink
+from app.models import TaskAssignee
+from app.models import TaskComments
 from app.models.authorization import CaseAccessLevel
 from app.models.authorization import GroupCaseAccess
 from app.models.authorization import OrganisationCaseAccess
@@ -51,6 +71,10 @@ from app.models import UserActivity
 from app.models.authorization import UserCaseAccess
 from app.models.authorization import UserCaseEffectiveAccess
 from app.models.cases import CaseProtagonist
+from app.models.cases import CaseTags
+
+# Datastore files removed by each background task
+DATASTORE_DELETE_BATCH_SIZE = 1000
 
 
 def list_cases_id():
@@ -147,15 +171,88 @@ def list_cases_dict(user_id):
     return data
 
 
-def user_list_cases_view(user_id):
-    res = UserCaseEffectiveAccess.query.with_entities(
-        UserCaseEffectiveAccess.case_id
-    ).filter(and_(
-        UserCaseEffectiveAccess.user_id == user_id,
-        UserCaseEffectiveAccess.access_level != CaseAccessLevel.deny_all.value
-    )).all()
+# Columns the cases listing can be sorted on. They are indexed.
+CASES_LIST_SORTABLE_COLUMNS = {
+    'case_id': Cases.case_id,
+    'case_name': Cases.name,
+    'case_open_date': Cases.open_date,
+    'case_close_date': Cases.close_date,
+    'case_soc_id': Cases.soc_id
+}
+CASES_LIST_MAX_LENGTH = 500
+
+
+def list_cases_page(user_id, start=0, length=25, order_by='case_open_date', order_dir='desc', search=None):
+    """
+    Get a page of the cases a user can access, sorted and filtered by the database. The rows don't hold the
+    case descriptions, which are fetched on demand.
+
+    :param user_id: ID of the user
+    :param start: Index of the first case of the page
+    :param length: Number of cases of the page, capped to CASES_LIST_MAX_LENGTH
+    :param order_by: One of CASES_LIST_SORTABLE_COLUMNS
+    :param order_dir: asc or desc
+    :param search: Text to look for in the cases names, SOC IDs and customers names
+    :return: Tuple of the cases of the page, the number of cases the user can access and the number
+             of cases matching the search
+    """
+    start = max(int(start or 0), 0)
+    length = min(max(int(length or 25), 1), CASES_LIST_MAX_LENGTH)
+
+    sort_column = CASES_LIST_SORTABLE_COLUMNS.get(order_by, Cases.open_date)
+    sort_column = sort_column.asc() if order_dir == 'asc' else sort_column.desc()
+
+    accessible_cases = ac_filter_user_cases(Cases.query, Cases.case_id, user_id)
+    records_total = accessible_cases.count()
+
+    matching_cases = accessible_cases.join(
+        Client, Client.client_id == Cases.client_id
+    )
+    records_filtered = records_total
+    if search:
+        pattern = f'%{escape_like(search)}%'
+        matching_cases = matching_cases.filter(or_(
+            Cases.name.ilike(pattern, escape='\\'),
+            Cases.soc_id.ilike(pattern, escape='\\'),
+            Client.name.ilike(pattern, escape='\\')
+        ))
+        records_filtered = matching_cases.count()
 
-    return [r.case_id for r in res]
+    owner_alias = aliased(User)
+    user_alias = aliased(User)
+
+    res = matching_cases.with_entities(
+        Cases.case_id,
+        Cases.case_uuid,
+        Cases.name.label('case_name'),
+        Client.name.label('client_name'),
+        Cases.open_date.label('case_open_date'),
+        Cases.close_date.label('case_close_date'),
+        Cases.soc_id.label('case_soc_id'),
+        Cases.user_id.label('opened_by_user_id'),
+        user_alias.user.label('opened_by'),
+        Cases.owner_id,
+        owner_alias.name.label('owner'),
+        Cases.classification_id,
+        CaseClassification.name.label('classification')
+    ).join(
+        user_alias, user_alias.id == Cases.user_id
+    ).join(
+        owner_alias, owner_alias.id == Cases.owner_id
+    ).outerjoin(
+        CaseClassification, CaseClassification.id == Cases.classification_id
+    ).order_by(
+        sort_column, Cases.case_id.desc()
+    ).offset(start).limit(length).all()
+
+    data = []
+    for row in res:
+        row = row._asdict()
+        row['case_open_date'] = row['case_open_date'].strftime("%m/%d/%Y")
+        row['case_close_date'] = row['case_close_date'].strftime("%m/%d/%Y") if row["case_close_date"] else ""
+        data.append(row)
+
+    return data, records_total, records_filtered
 
 
 def close_case(case_id):
@@ -251,51 +348,109 @@ def get_case_details_rt(case_id):
     return res
 
 
+def _delete_case_rows(model, *criteria):
+    model.query.filter(*criteria).delete(synchronize_session=False)
+
+
 def delete_case(case_id):
+    """
+    Delete a case and everything it holds. Each table is cleaned with a single statement, the objects of the
+    case being selected with subqueries, and everything is committed at once. The files of the datastore
+    are removed afterwards by a background task.
+
+    :param case_id: Case ID
+    :return: True if the case existed and has been deleted
+    """
     if not Cases.query.filter(Cases.case_id == case_id).first():
         return False
 
-    delete_case_states(caseid=case_id)
-    UserActivity.query.filter(UserActivity.case_id == case_id).delete()
-    CaseReceivedFile.query.filter(CaseReceivedFile.case_id == case_id).delete()
-    IocLink.query.filter(IocLink.case_id == case_id).delete()
-    dsf_list = DataStoreFile.query.filter(DataStoreFile.file_case_id == case_id).all()
+    case_events = select(CasesEvent.event_id).where(CasesEvent.case_id == case_id)
+    case_assets = select(CaseAssets.asset_id).where(CaseAssets.case_id == case_id)
+    case_tasks = select(CaseTasks.id).where(CaseTasks.task_case_id == case_id)
+    case_notes = select(Notes.note_id).where(Notes.note_case_id == case_id)
+    case_evidences = select(CaseReceivedFile.id).where(CaseReceivedFile.case_id == case_id)
+    case_comments = select(Comments.comment_id).where(Comments.comment_case_id == case_id)
+
+    _delete_case_rows(EventComments, or_(EventComments.comment_id.in_(case_comments),
+                                         EventComments.comment_event_id.in_(case_events)))
+    _delete_case_rows(AssetComments, or_(AssetComments.comment_id.in_(case_comments),
+                                         AssetComments.comment_asset_id.in_(case_assets)))
+    _delete_case_rows(TaskComments, or_(TaskComments.comment_id.in_(case_comments),
+                                        TaskComments.comment_task_id.in_(case_tasks)))
+    _delete_case_rows(NotesComments, or_(NotesComments.comment_id.in_(case_comments),
+                                         NotesComments.comment_note_id.in_(case_notes)))
+    _delete_case_rows(EvidencesComments, or_(EvidencesComments.comment_id.in_(case_comments),
+                                             EvidencesComments.comment_evidence_id.in_(case_evidences)))
+    _delete_case_rows(IocComments, IocComments.comment_id.in_(case_comments))
+    _delete_case_rows(Comments, Comments.comment_case_id == case_id)
+
+    _delete_case_rows(TaskAssignee, TaskAssignee.task_id.in_(case_tasks))
+    _delete_case_rows(CaseTasks, CaseTasks.task_case_id == case_id)
+
+    _delete_case_rows(CaseEventCategory, CaseEventCategory.event_id.in_(case_events))
+    _delete_case_rows(CaseEventsAssets, or_(CaseEventsAssets.case_id == case_id,
+                                            CaseEventsAssets.event_id.in_(case_events),
+                                            CaseEventsAssets.asset_id.in_(case_assets)))
+    _delete_case_rows(CaseEventsIoc, or_(CaseEventsIoc.case_id == case_id,
+                                         CaseEventsIoc.event_id.in_(case_events)))
+    _delete_case_rows(CasesEvent, CasesEvent.case_id == case_id)
+
+    inventory_ids = CaseAssets.query.with_entities(
+        CaseAssets.asset_inventory_id
+    ).filter(
+        CaseAssets.case_id == case_id
+    ).distinct().all()
 
-    for dsf_list_item in dsf_list:
+    _delete_case_rows(IocAssetLink, IocAssetLink.asset_id.in_(case_assets))
+    _delete_case_rows(IocLink, IocLink.case_id == case_id)
+    _delete_case_rows(CaseAssets, CaseAssets.case_id == case_id)
+    prune_asset_inventory([inv.asset_inventory_id for inv in inventory_ids])
 
-        fln = Path(dsf_list_item.file_local_name)
-        if fln.is_file():
-            fln.unlink(missing_ok=True)
+    _delete_case_rows(NotesGroupLink, or_(NotesGroupLink.case_id == case_id,
+                                          NotesGroupLink.note_id.in_(case_notes)))
+    _delete_case_rows(Notes, Notes.note_case_id == case_id)
+    _delete_case_rows(NotesGroup, NotesGroup.group_case_id == case_id)
 
-        db.session.delete(dsf_list_item)
-    db.session.commit()
+    _delete_case_rows(CaseReceivedFile, CaseReceivedFile.case_id == case_id)
 
-    DataStorePath.query.filter(DataStorePath.path_case_id == case_id).delete()
+    files_paths = [row.file_local_name for row in DataStoreFile.query.with_entities(
+        DataStoreFile.file_local_name
+    ).filter(
+        DataStoreFile.file_case_id == case_id
+    ).all() if row.file_local_name]
+    _delete_case_rows(DataStoreFile, DataStoreFile.file_case_id == case_id)
+    _delete_case_rows(DataStorePath, DataStorePath.path_case_id == case_id)
+
+    _delete_case_rows(CaseGraphLinks, CaseGraphLinks.case_id == case_id)
+    _delete_case_rows(CaseGraphAssets, CaseGraphAssets.case_id == case_id)
+    _delete_case_rows(CasesAssetsExt, CasesAssetsExt.case_id == case_id)
+    _delete_case_rows(CaseKanban, CaseKanban.case_id == case_id)
+    _delete_case_rows(CaseTags, CaseTags.case_id == case_id)
+    _delete_case_rows(CaseProtagonist, CaseProtagonist.case_id == case_id)
+    _delete_case_rows(IrisReport, IrisReport.case_id == case_id)
 
-    da = CaseAssets.query.with_entities(CaseAssets.asset_id).filter(CaseAssets.case_id == case_id).all()
-    for asset in da:
-        IocAssetLink.query.filter(asset.asset_id == asset.asset_id).delete()
+    delete_case_states(caseid=case_id)
+    _delete_case_rows(UserActivity, UserActivity.case_id == case_id)
 
-    CaseEventsAssets.query.filter(CaseEventsAssets.case_id == case_id).delete()
-    CaseEventsIoc.query.filter(CaseEventsIoc.case_id == case_id).delete()
-    CaseAssets.query.filter(CaseAssets.case_id == case_id).delete()
-    NotesGroupLink.query.filter(NotesGroupLink.case_id == case_id).delete()
-    NotesGroup.query.filter(NotesGroup.group_case_id == case_id).delete()
-    Notes.query.filter(Notes.note_case_id == case_id).delete()
-    CaseTasks.query.filter(CaseTasks.task_case_id == case_id).delete()
+    case_users = [row.user_id for row in UserCaseEffectiveAccess.query.with_entities(
+        UserCaseEffectiveAccess.user_id
+    ).filter(
+        UserCaseEffectiveAccess.case_id == case_id
+    ).all()]
 
-    da = CasesEvent.query.with_entities(CasesEvent.event_id).filter(CasesEvent.case_id == case_id).all()
-    for event in da:
-        CaseEventCategory.query.filter(CaseEventCategory.event_id == event.event_id).delete()
+    _delete_case_rows(UserCaseAccess, UserCaseAccess.case_id == case_id)
+    _delete_case_rows(UserCaseEffectiveAccess, UserCaseEffectiveAccess.case_id == case_id)
+    _delete_case_rows(GroupCaseAccess, GroupCaseAccess.case_id == case_id)
+    _delete_case_rows(OrganisationCaseAccess, OrganisationCaseAccess.case_id == case_id)
 
-    CasesEvent.query.filter(CasesEvent.case_id == case_id).delete()
+    # The search documents and users case activity are removed by their ON DELETE CASCADE
+    _delete_case_rows(Cases, Cases.case_id == case_id)
+    db.session.commit()
 
-    UserCaseAccess.query.filter(UserCaseAccess.case_id == case_id).delete()
-    UserCaseEffectiveAccess.query.filter(UserCaseEffectiveAccess.case_id == case_id).delete()
-    GroupCaseAccess.query.filter(GroupCaseAccess.case_id == case_id).delete()
-    OrganisationCaseAccess.query.filter(OrganisationCaseAccess.case_id == case_id).delete()
+    ac_socket_revoke_case(case_id)
+    ac_invalidate_user_cases_cache(case_users)
 
-    Cases.query.filter(Cases.case_id == case_id).delete()
-    db.session.commit()
+    for files_chunk in chunks(files_paths, DATASTORE_DELETE_BATCH_SIZE):
+        task_delete_datastore_files.delay(files_chunk)
 
     return True
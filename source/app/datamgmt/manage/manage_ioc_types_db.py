@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import logging as log
+import re
+import threading
+import time
+from collections import namedtuple
+from typing import Optional
+
+from app.models import IocType
+from app.models import Tlp
+
+# Safety net for the instances running several processes, where a type edited in one process
+# is only refreshed explicitly in that process
+IOC_TYPES_REGISTRY_TTL = 300
+
+RegisteredIocType = namedtuple('RegisteredIocType', ['type_id', 'type_name', 'validator', 'validation_expect',
+                                                     'validation_error'])
+
+_registry_lock = threading.Lock()
+_registry = {
+    'types': {},
+    'names': {},
+    'tlps': set(),
+    'loaded_at': None
+}
+
+
+def refresh_ioc_types_registry() -> None:
+    """Reload the IOC types and TLPs from the database and compile the validation regexes
+
+    Returns:
+        None
+    """
+    types = {}
+    names = {}
+
+    for ioc_type in IocType.query.with_entities(
+        IocType.type_id,
+        IocType.type_name,
+        IocType.type_validation_regex,
+        IocType.type_validation_expect
+    ).all():
+
+        validator = None
+        validation_error = None
+        if ioc_type.type_validation_regex:
+            try:
+                validator = re.compile(ioc_type.type_validation_regex, re.IGNORECASE)
+            except re.error as e:
+                log.error(f'Invalid validation regex for IOC type {ioc_type.type_name}: {e}')
+                validation_error = f'Invalid validation regex of the IOC type {ioc_type.type_name}: {e}'
+
+        entry = RegisteredIocType(
+            type_id=ioc_type.type_id,
+            type_name=ioc_type.type_name,
+            validator=validator,
+            validation_expect=ioc_type.type_validation_expect or ioc_type.type_validation_regex,
+            validation_error=validation_error
+        )
+        types[ioc_type.type_id] = entry
+        names[ioc_type.type_name.lower()] = entry
+
+    tlps = {tlp.tlp_id for tlp in Tlp.query.with_entities(Tlp.tlp_id).all()}
+
+    with _registry_lock:
+        _registry['types'] = types
+        _registry['names'] = names
+        _registry['tlps'] = tlps
+        _registry['loaded_at'] = time.monotonic()
+
+
+def _get_registry() -> dict:
+    loaded_at = _registry['loaded_at']
+    if loaded_at is None or time.monotonic() - loaded_at > IOC_TYPES_REGISTRY_TTL:
+        refresh_ioc_types_registry()
+
+    return _registry
+
+
+def get_registered_ioc_type(type_id: int) -> Optional[RegisteredIocType]:
+    """Get an IOC type from the registry
+
+    Args:
+        type_id (int): IOC type id
+
+    Returns:
+        RegisteredIocType: IOC type, None if it doesn't exist
+    """
+    try:
+        return _get_registry()['types'].get(int(type_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_registered_ioc_type_by_name(type_name: str) -> Optional[RegisteredIocType]:
+    """Get an IOC type from the registry by its name, case-insensitive
+
+    Args:
+        type_name (str): IOC type name
+
+    Returns:
+        RegisteredIocType: IOC type, None if it doesn't exist
+    """
+    if not type_name:
+        return None
+
+    return _get_registry()['names'].get(type_name.strip().lower())
+
+
+def is_registered_tlp(tlp_id: int) -> bool:
+    """Check if a TLP ID exists
+
+    Args:
+        tlp_id (int): TLP id
+
+    Returns:
+        bool: True if the TLP exists
+    """
+    try:
+        return int(tlp_id) in _get_registry()['tlps']
+    except (TypeError, ValueError):
+        return False
+
+
+def check_ioc_value_format(ioc_value: str, ioc_type: RegisteredIocType) -> Optional[str]:
+    """Validate an IOC value against the compiled regex of its type
+
+    Args:
+        ioc_value (str): IOC value
+        ioc_type (RegisteredIocType): IOC type from the registry
+
+    Returns:
+        str: Error message if the value doesn't match, or if the regex of the type is invalid. None otherwise
+    """
+    if ioc_type.validation_error:
+        # The values can't be checked until the type is fixed
+        return ioc_type.validation_error
+
+    if ioc_type.validator is None:
+        return None
+
+    if ioc_value is None or not ioc_type.validator.fullmatch(ioc_value):
+        return f"The input doesn\'t match the expected format (expected: {ioc_type.validation_expect})"
+
+    return None
@@ -23,6 +23,7 @@ from sqlalchemy import and_
 from app import bc
 from app import db
 from app.datamgmt.case.case_db import get_case
+from app.iris_engine.access_control.socket_access import ac_socket_revoke_users
 from app.iris_engine.access_control.utils import ac_access_level_mask_from_val_list, ac_ldp_group_removal
 from app.iris_engine.access_control.utils import ac_access_level_to_list
 from app.iris_engine.access_control.utils import ac_auto_update_user_effective_access
@@ -304,18 +305,6 @@ def get_user_cases_access(user_id):
     return user_cases_access
 
 
-def get_user_cases_fast(user_id):
-
-    user_cases = UserCaseEffectiveAccess.query.with_entities(
-        UserCaseEffectiveAccess.case_id
-    ).where(
-        UserCaseEffectiveAccess.user_id == user_id,
-        UserCaseEffectiveAccess.access_level != CaseAccessLevel.deny_all.value
-    ).all()
-
-    return [c.case_id for c  in user_cases]
-
-
 def remove_cases_access_from_user(user_id, cases_list):
     if not user_id or type(user_id) is not int:
         return False, 'Invalid user id'
@@ -614,6 +603,8 @@ def delete_user(user_id):
     User.query.filter(User.id == user_id).delete()
     db.session.commit()
 
+    ac_socket_revoke_users([user_id])
+
 
 def user_exists(user_name, user_email):
     user = User.query.filter_by(user=user_name).first()
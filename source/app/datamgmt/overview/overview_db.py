@@ -18,19 +18,110 @@
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import datetime
+from sqlalchemy import func
+from sqlalchemy import or_
 
-from app.datamgmt.case.case_tasks_db import get_tasks_cases_mapping
-from app.datamgmt.manage.manage_cases_db import user_list_cases_view
+from app import db
+from app.datamgmt.search.search_db import escape_like
+from app.iris_engine.access_control.utils import ac_filter_user_cases
+from app.models import CaseTasks
 from app.models import Cases, CaseClassification
 from app.models import Client
 from app.models.authorization import User
 
+OVERVIEW_MAX_LENGTH = 500
+# Task statuses counted as open and as closed in the cases progress
+OVERVIEW_OPEN_TASKS_STATUSES = [1, 2, 3]
+OVERVIEW_CLOSED_TASKS_STATUSES = [4]
 
-def get_overview_db(user_id):
+OVERVIEW_SORTABLE_COLUMNS = {
+    'case_title': Cases.name,
+    'customer_name': Client.name,
+    'classification': CaseClassification.name,
+    # The cases open for the longest time have the oldest open date
+    'case_open_since_days': Cases.open_date,
+    'case_open_date': Cases.open_date,
+    'owner': User.name
+}
+OVERVIEW_FILTERABLE_COLUMNS = {
+    'case_title': Cases.name,
+    'customer_name': Client.name,
+    'classification': CaseClassification.name,
+    'owner': User.name
+}
+
+
+def _get_cases_tasks_status(cases_ids):
+    open_tasks = func.count(CaseTasks.id).filter(CaseTasks.task_status_id.in_(OVERVIEW_OPEN_TASKS_STATUSES))
+    closed_tasks = func.count(CaseTasks.id).filter(CaseTasks.task_status_id.in_(OVERVIEW_CLOSED_TASKS_STATUSES))
+
+    return {
+        row.task_case_id: row for row in db.session.query(
+            CaseTasks.task_case_id,
+            open_tasks.label('open_tasks'),
+            closed_tasks.label('closed_tasks')
+        ).filter(
+            CaseTasks.task_case_id.in_(cases_ids)
+        ).group_by(
+            CaseTasks.task_case_id
+        ).all()
+    } if cases_ids else {}
+
+
+def get_overview_db(user_id, start=0, length=25, order_by='customer_name', order_dir='asc', search=None,
+                    filters=None):
     """
-    Get overview data from the database
+    Get a page of the open cases a user can access, sorted and filtered by the database, with the count of
+    their open and closed tasks. The tasks are only aggregated for the cases of the page.
+
+    :param user_id: ID of the user
+    :param start: Index of the first case of the page
+    :param length: Number of cases of the page, capped to OVERVIEW_MAX_LENGTH
+    :param order_by: One of OVERVIEW_SORTABLE_COLUMNS
+    :param order_dir: asc or desc
+    :param search: Text to look for in the titles, customers, classifications and owners of the cases
+    :param filters: Dict of the texts to look for in the columns of OVERVIEW_FILTERABLE_COLUMNS
+    :return: Tuple of the cases of the page, the number of open cases the user can access and the number
+             of open cases matching the search and filters
     """
-    open_cases = Cases.query.with_entities(
+    start = max(int(start or 0), 0)
+    length = min(max(int(length or 25), 1), OVERVIEW_MAX_LENGTH)
+
+    if order_by == 'case_open_since_days':
+        order_dir = 'desc' if order_dir == 'asc' else 'asc'
+    sort_column = OVERVIEW_SORTABLE_COLUMNS.get(order_by, Client.name)
+    sort_column = sort_column.desc() if order_dir == 'desc' else sort_column.asc()
+
+    open_cases = ac_filter_user_cases(Cases.query, Cases.case_id, user_id).filter(
+        Cases.close_date == None
+    )
+    records_total = open_cases.count()
+
+    matching_cases = open_cases.join(
+        User, User.id == Cases.owner_id
+    ).join(
+        Client, Client.client_id == Cases.client_id
+    ).outerjoin(
+        CaseClassification, CaseClassification.id == Cases.classification_id
+    )
+
+    conditions = []
+    if search:
+        pattern = f'%{escape_like(search)}%'
+        conditions.append(or_(*[column.ilike(pattern, escape='\\')
+                                for column in OVERVIEW_FILTERABLE_COLUMNS.values()]))
+
+    for column_name, value in (filters or {}).items():
+        if value and column_name in OVERVIEW_FILTERABLE_COLUMNS:
+            conditions.append(OVERVIEW_FILTERABLE_COLUMNS[column_name].ilike(f'%{escape_like(value)}%',
+                                                                             escape='\\'))
+
+    records_filtered = records_total
+    if conditions:
+        matching_cases = matching_cases.filter(*conditions)
+        records_filtered = matching_cases.count()
+
+    open_cases = matching_cases.with_entities(
         Cases.case_id,
         Cases.case_uuid,
         Cases.name.label('case_title'),
@@ -38,36 +129,26 @@ def get_overview_db(user_id):
         Cases.open_date.label('case_open_date'),
         User.name.label('owner'),
         CaseClassification.name.label('classification')
-    ).filter(
-        Cases.close_date == None,
-        Cases.case_id.in_(user_list_cases_view(user_id))
-    ).join(
-        Cases.owner,
-        Cases.client
-    ).outerjoin(
-        Cases.classification
-    ).all()
-
-    tasks_map = get_tasks_cases_mapping()
-    tmap = {}
-    for task in tasks_map:
-        if tmap.get(task.task_case_id) is None:
-            tmap[task.task_case_id] = {
-                'open_tasks': 0,
-                'closed_tasks': 0
-            }
+    ).order_by(
+        sort_column, Cases.case_id.desc()
+    ).offset(start).limit(length).all()
 
-        if task.task_status_id in [1, 2, 3]:
-            tmap[task.task_case_id]['open_tasks'] += 1
-        elif task.task_status_id == 4:
-            tmap[task.task_case_id]['closed_tasks'] += 1
+    tasks_status = _get_cases_tasks_status([case.case_id for case in open_cases])
 
     open_cases_list = []
     for case in open_cases:
         c_case = case._asdict()
         c_case['case_open_since_days'] = (datetime.date.today() - case.case_open_date).days
         c_case['case_open_date'] = case.case_open_date.strftime('%d-%m-%Y')
-        c_case['tasks_status'] = tmap.get(case.case_id)
+        c_case['tasks_status'] = None
+
+        case_tasks = tasks_status.get(case.case_id)
+        if case_tasks and (case_tasks.open_tasks or case_tasks.closed_tasks):
+            c_case['tasks_status'] = {
+                'open_tasks': case_tasks.open_tasks,
+                'closed_tasks': case_tasks.closed_tasks
+            }
+
         open_cases_list.append(c_case)
 
-    return open_cases_list
+    return open_cases_list, records_total, records_filtered
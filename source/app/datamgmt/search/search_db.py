@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  Copyright (C) 2021 - Airbus CyberSecurity (SAS)
+#  ir@cyberactionlab.net
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from sqlalchemy import and_
+from sqlalchemy import desc
+from sqlalchemy import func
+from sqlalchemy import or_
+
+from app import db
+from app.iris_engine.access_control.utils import ac_filter_user_cases
+from app.models import Cases
+from app.models import Client
+from app.models import Comments
+from app.models.models import Ioc
+from app.models.models import IocLink
+from app.models.models import IocType
+from app.models.models import SearchDocument
+from app.models.models import Tlp
+
+SEARCH_OBJECT_TYPES = ['ioc', 'note', 'comment', 'event', 'asset']
+SEARCH_MAX_PER_PAGE = 100
+SEARCH_HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=25, MinWords=8'
+# Matches counted exactly, above which the planner estimate is returned
+SEARCH_EXACT_COUNT_LIMIT = 1000
+# Rows fetched at once when streaming a whole result set
+SEARCH_STREAM_BATCH_SIZE = 1000
+
+
+def escape_like(value):
+    """
+    Escape the LIKE wildcards of a value to match it literally, with '\\' as the escape character
+    """
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _get_search_matches(search_term, user_id):
+    """
+    Query of the documents matching the terms in the cases the user can access, with their rank.
+    The terms are matched with the full-text index, and as a substring of the titles with the trigram index.
+    """
+    ts_query = func.websearch_to_tsquery('simple', search_term)
+    rank = func.ts_rank_cd(SearchDocument.document_vector, ts_query) + \
+        func.similarity(SearchDocument.document_title, search_term)
+
+    query = ac_filter_user_cases(
+        SearchDocument.query, SearchDocument.case_id, user_id
+    ).filter(
+        or_(
+            SearchDocument.document_vector.op('@@')(ts_query),
+            SearchDocument.document_title.ilike(f'%{escape_like(search_term)}%', escape='\\')
+        )
+    )
+
+    return query, ts_query, rank
+
+
+def search_documents(search_term, user_id, object_types=None, page=1, per_page=25):
+    """
+    Search the IOCs, notes, comments, timeline events and assets of the cases a user can access, ranked
+    by relevance. The terms follow the web search syntax (quoted phrases, OR, -exclusion).
+
+    :param search_term: Terms to search
+    :param user_id: ID of the user searching
+    :param object_types: Restrict the results to these types of objects. All the types if None
+    :param page: Page number, starting at 1
+    :param per_page: Number of results per page, capped to SEARCH_MAX_PER_PAGE
+    :return: Tuple of the results of the page, a bool indicating if there are more pages, and
+             the number of matches of each type of objects, as a dict of count and estimated. The
+             facets are only counted for the first page, they are None for the next ones.
+    """
+    page = max(int(page or 1), 1)
+    per_page = min(max(int(per_page or 25), 1), SEARCH_MAX_PER_PAGE)
+
+    query, ts_query, rank = _get_search_matches(search_term, user_id)
+
+    # The facets count all the types, whatever the filter on the results. They are capped like the
+    # other search counts, so a term matching most of the index doesn't scan all the matches.
+    facets = None
+    if page == 1:
+        facets = {}
+        for object_type in SEARCH_OBJECT_TYPES:
+            count, estimated = count_search_query(query.filter(SearchDocument.object_type == object_type))
+            facets[object_type] = {'count': count, 'estimated': estimated}
+
+    if object_types:
+        query = query.filter(SearchDocument.object_type.in_(object_types))
+
+    matches = query.with_entities(
+        SearchDocument.document_id,
+        SearchDocument.object_type,
+        SearchDocument.object_id,
+        SearchDocument.case_id,
+        SearchDocument.document_title,
+        SearchDocument.document_content,
+        rank.label('rank')
+    ).order_by(
+        desc('rank'), SearchDocument.document_id.desc()
+    ).limit(
+        per_page + 1
+    ).offset(
+        (page - 1) * per_page
+    ).subquery()
+
+    # The snippets are only built for the page
+    results = db.session.query(
+        matches.c.object_type,
+        matches.c.object_id,
+        matches.c.document_title.label('title'),
+        func.ts_headline('simple', func.coalesce(matches.c.document_content, ''), ts_query,
+                         SEARCH_HEADLINE_OPTIONS).label('snippet'),
+        matches.c.rank,
+        Cases.case_id,
+        Cases.name.label('case_name'),
+        Client.name.label('customer_name')
+    ).join(
+        Cases, Cases.case_id == matches.c.case_id
+    ).join(
+        Client, Client.client_id == Cases.client_id
+    ).order_by(
+        matches.c.rank.desc(), matches.c.document_id.desc()
+    ).all()
+
+    return results[:per_page], len(results) > per_page, facets
+
+
+def get_iocs_search_query(search_value, user_id):
+    """
+    Query of the IOCs whose value matches a LIKE pattern, with the cases they are linked to.
+    Only the cases the user can access are returned.
+
+    :param search_value: Pattern, % being the wildcard
+    :param user_id: ID of the user searching
+    :return: Query, ordered so it can be paginated
+    """
+    query = Ioc.query.with_entities(
+        Ioc.ioc_value.label('ioc_name'),
+        Ioc.ioc_description.label('ioc_description'),
+        Ioc.ioc_misp,
+        IocType.type_name,
+        Tlp.tlp_name,
+        Tlp.tlp_bscolor,
+        Cases.name.label('case_name'),
+        Cases.case_id,
+        Client.name.label('customer_name')
+    ).filter(
+        and_(
+            Ioc.ioc_value.like(search_value),
+            IocLink.ioc_id == Ioc.ioc_id,
+            IocLink.case_id == Cases.case_id,
+            Client.client_id == Cases.client_id,
+            Ioc.ioc_tlp_id == Tlp.tlp_id
+        )
+    ).join(
+        Ioc.ioc_type
+    ).order_by(
+        Ioc.ioc_id, Cases.case_id
+    )
+
+    return ac_filter_user_cases(query, IocLink.case_id, user_id)
+
+
+def get_comments_search_query(search_value, user_id):
+    """
+    Query of the comments containing a value. Only the comments of the cases the user can access are returned.
+
+    :param search_value: Value to look for, % being the wildcard
+    :param user_id: ID of the user searching
+    :return: Query, ordered so it can be paginated
+    """
+    query = Comments.query.filter(
+        Comments.comment_text.like(f"%{search_value}%"),
+        Cases.client_id == Client.client_id
+    ).with_entities(
+        Comments.comment_id,
+        Comments.comment_text,
+        Cases.name.label('case_name'),
+        Client.name.label('customer_name'),
+        Cases.case_id
+    ).join(
+        Comments.case,
+        Cases.client
+    ).order_by(
+        Client.name, Comments.comment_id
+    )
+
+    return ac_filter_user_cases(query, Comments.comment_case_id, user_id)
+
+
+def paginate_search_query(query, page=1, per_page=25):
+    """
+    Get a page of a search query
+
+    :param query: Ordered query
+    :param page: Page number, starting at 1
+    :param per_page: Number of rows per page, capped to SEARCH_MAX_PER_PAGE
+    :return: Tuple of the rows of the page, and a bool indicating if there are more pages
+    """
+    page = max(int(page or 1), 1)
+    per_page = min(max(int(per_page or 25), 1), SEARCH_MAX_PER_PAGE)
+
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+
+    return rows[:per_page], len(rows) > per_page
+
+
+def count_search_query(query):
+    """
+    Count the matches of a search query, exactly up to SEARCH_EXACT_COUNT_LIMIT. Above it, the count
+    is the planner estimate so large result sets aren't scanned entirely.
+
+    :param query: Search query
+    :return: Tuple of the count and a bool indicating if it is an estimate
+    """
+    capped = query.order_by(None).limit(SEARCH_EXACT_COUNT_LIMIT + 1).subquery()
+    count = db.session.query(func.count()).select_from(capped).scalar()
+    if count <= SEARCH_EXACT_COUNT_LIMIT:
+        return count, False
+
+    compiled = query.order_by(None).statement.compile(dialect=db.engine.dialect)
+    plan = db.session.connection().exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {compiled.string}', compiled.params
+    ).scalar()
+
+    return max(int(plan[0]['Plan']['Plan Rows']), count), True
+
+
+def stream_search_query(query):
+    """
+    Iterate over all the rows of a search query, fetched in batches through a server side cursor
+
+    :param query: Search query
+    :return: Generator of rows
+    """
+    yield from query.yield_per(SEARCH_STREAM_BATCH_SIZE)
@@ -21,50 +21,217 @@
 from datetime import datetime
 from flask_login import current_user
 from sqlalchemy import and_
-
+from sqlalchemy import delete
+from sqlalchemy import event
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app import app
+from app import cache
 from app import db
+from app import socket_io
+from app.models import ObjectChange
 from app.models import ObjectState
 
+log = app.logger
+
+# Objects having a state in a case
+OBJECT_STATE_NAMES = ['timeline', 'tasks', 'evidences', 'ioc', 'assets', 'notes']
+
+# Objects whose changes are logged, so the clients can fetch only the modified rows
+OBJECT_CHANGES_LOGGED = ['ioc', 'assets']
+
+# Number of changed objects above which the clients are better off reloading the whole list. Also the
+# number of changes kept in the log of each object of a case.
+OBJECT_CHANGES_MAX = 500
+
+# Seconds a state is served from the cache. Bounds the staleness of the states updated by another
+# process when the cache isn't shared between processes (SimpleCache).
+OBJECT_STATE_CACHE_TIMEOUT = 30
 
-def update_object_state(object_name, caseid, userid=None) -> ObjectState:
+# Keys of the session info holding the increments to persist and the states to publish once committed
+_PENDING_INCREMENTS_KEY = 'iris_pending_object_increments'
+_PENDING_STATES_KEY = 'iris_pending_object_states'
+
+
+def get_case_states_room(caseid):
     """
-    Expects a db commit soon after
-    
+    Socket.IO room notified of the object states changes of a case
+
+    Args:
+        caseid: case id
+
+    Returns:
+        Name of the room
+    """
+    return f'case-{caseid}-states'
+
+
+def _get_state_cache_key(object_name, caseid):
+    return f'iris_object_state_{caseid}_{object_name}'
+
+
+def _increment_object_state(session, object_name, caseid, count, userid):
+    """
+    Atomically increment a state, creating it on first use. The row stays locked until the commit,
+    so concurrent writers are serialized and neither skip nor repeat a value.
+    """
+    now = datetime.utcnow()
+    stmt = insert(ObjectState).values(
+        object_name=object_name,
+        object_case_id=caseid,
+        object_state=count - 1,
+        object_last_update=now,
+        object_updated_by_id=userid
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint='object_state_case_name_key',
+        set_={
+            'object_state': ObjectState.object_state + count,
+            'object_last_update': now,
+            'object_updated_by_id': userid
+        }
+    ).returning(ObjectState.object_state, ObjectState.object_last_update)
+
+    return session.execute(stmt).first()
+
+
+def _prune_object_changes(session, object_name, caseid):
+    """
+    Keep at most the newest OBJECT_CHANGES_MAX changes of an object. The states are dropped whole, so the log
+    stays complete from its first state and the clients behind it reload the whole list.
+    """
+    first_dropped = select(
+        ObjectChange.object_state
+    ).where(
+        ObjectChange.object_case_id == caseid,
+        ObjectChange.object_name == object_name
+    ).order_by(
+        ObjectChange.object_state.desc()
+    ).offset(OBJECT_CHANGES_MAX).limit(1).scalar_subquery()
+
+    session.execute(
+        delete(ObjectChange).where(
+            ObjectChange.object_case_id == caseid,
+            ObjectChange.object_name == object_name,
+            ObjectChange.object_state <= first_dropped
+        ).execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(db.session, 'before_commit')
+def _persist_object_states(session):
+    """
+    Persist the increments of the transaction with one statement per state, whatever the number
+    of updates made by the caller
+    """
+    pending = session.info.pop(_PENDING_INCREMENTS_KEY, None)
+    if not pending:
+        return
+
+    states = session.info.setdefault(_PENDING_STATES_KEY, {})
+    changes = []
+    for (object_name, caseid), (count, userid, objects_changes) in pending.items():
+        row = _increment_object_state(session, object_name, caseid, count, userid)
+        states[(object_name, caseid)] = row._asdict()
+
+        if len(objects_changes) > OBJECT_CHANGES_MAX:
+            # The clients reload the whole list anyway
+            objects_changes = {None: 'update'}
+
+        changes.extend({
+            'object_case_id': caseid,
+            'object_name': object_name,
+            'object_id': object_id,
+            'object_operation': operation,
+            'object_state': row.object_state,
+            'change_date': row.object_last_update
+        } for object_id, operation in objects_changes.items())
+
+    if changes:
+        session.execute(ObjectChange.__table__.insert(), changes)
+
+        for object_name, caseid in {(change['object_name'], change['object_case_id']) for change in changes}:
+            _prune_object_changes(session, object_name, caseid)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_object_states(session):
+    """
+    Cache the new states of a case once committed and notify its clients, so they only
+    fetch the objects that changed
+    """
+    pending = session.info.pop(_PENDING_STATES_KEY, None)
+    if not pending:
+        return
+
+    for (object_name, caseid), state in pending.items():
+        try:
+            cache.set(_get_state_cache_key(object_name, caseid), state, timeout=OBJECT_STATE_CACHE_TIMEOUT)
+            socket_io.emit('object_state', {
+                'object_name': object_name,
+                'object_state': state['object_state'],
+                'case_id': caseid
+            }, to=get_case_states_room(caseid))
+
+        except Exception as e:
+            # The clients fall back on polling
+            log.warning(f'Unable to publish {object_name} state of case {caseid}: {e}')
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_object_states(session):
+    session.info.pop(_PENDING_INCREMENTS_KEY, None)
+    session.info.pop(_PENDING_STATES_KEY, None)
+
+
+def update_object_state(object_name, caseid, userid=None, object_ids=None, operation='update') -> int:
+    """
+    Expects a db commit soon after. The increments of a transaction are persisted atomically when it is committed,
+    then the new state is cached and the clients subscribed to the case are notified.
+
     Args:
         object_name: name of the object to update
         caseid: case id
         userid: user id
-        
+        object_ids: IDs of the objects changed, logged with the new state for the objects in OBJECT_CHANGES_LOGGED.
+                    None if unknown, in which case the clients reload the whole list.
+        operation: create, update or delete
+
     Returns:
-        ObjectState object
+        Number of increments of the state pending in the transaction
     """
     if not userid:
         userid = current_user.id
 
-    os = ObjectState.query.filter(and_(
-        ObjectState.object_name == object_name,
-        ObjectState.object_case_id == caseid
-    )).first()
-    if os:
-        os.object_last_update = datetime.utcnow()
-        os.object_state = os.object_state + 1
-        os.object_updated_by_id = userid
-        os.object_case_id = caseid
+    pending = db.session.info.setdefault(_PENDING_INCREMENTS_KEY, {})
+    count, _, objects_changes = pending.get((object_name, caseid), (0, None, {}))
+    pending[(object_name, caseid)] = (count + 1, userid, objects_changes)
 
-    else:
-        os = ObjectState()
-        os.object_name = object_name
-        os.object_state = 0
-        os.object_last_update = datetime.utcnow()
-        os.object_updated_by_id = userid
-        os.object_case_id = caseid
-
-        db.session.add(os)
+    if object_name in OBJECT_CHANGES_LOGGED:
+        for object_id in (object_ids if object_ids is not None else [None]):
+            objects_changes[object_id] = operation
 
-    return os
+    return count + 1
 
 
 def get_object_state(object_name, caseid):
+    """
+    Get the current state of an object, from the cache when possible
+
+    Args:
+        object_name: name of the object
+        caseid: case id
+
+    Returns:
+        dict with the object_state and object_last_update, None if the object has no state yet
+    """
+    cache_key = _get_state_cache_key(object_name, caseid)
+    state = cache.get(cache_key)
+    if state is not None:
+        return state
+
     os = ObjectState.query.with_entities(
         ObjectState.object_state,
         ObjectState.object_last_update
@@ -74,16 +241,86 @@ def get_object_state(object_name, caseid):
     )).first()
 
     if os:
-        return os._asdict()
+        state = os._asdict()
+        cache.set(cache_key, state, timeout=OBJECT_STATE_CACHE_TIMEOUT)
+        return state
     else:
         return None
 
 
+def get_object_changes(object_name, caseid, since_state):
+    """
+    Get the objects changed after a state
+
+    Args:
+        object_name: name of the object, one of OBJECT_CHANGES_LOGGED
+        caseid: case id
+        since_state: state the client is up to date with
+
+    Returns:
+        dict with the current state, the IDs of the changed objects and whether the client has to reload
+        the whole list instead. None if the object has no state yet.
+    """
+    state = get_object_state(object_name, caseid)
+    if state is None:
+        return None
+
+    state = dict(state)
+    changes = {
+        'state': state,
+        'reset': False,
+        'object_ids': []
+    }
+
+    if since_state >= state['object_state']:
+        return changes
+
+    first_state = ObjectChange.query.with_entities(
+        func.min(ObjectChange.object_state)
+    ).filter(
+        ObjectChange.object_case_id == caseid,
+        ObjectChange.object_name == object_name
+    ).scalar()
+
+    # The changes preceding the log aren't known
+    if first_state is None or since_state < first_state - 1:
+        changes['reset'] = True
+        return changes
+
+    logged_changes = ObjectChange.query.with_entities(
+        ObjectChange.object_id,
+        func.max(ObjectChange.object_state).label('object_state')
+    ).filter(
+        ObjectChange.object_case_id == caseid,
+        ObjectChange.object_name == object_name,
+        ObjectChange.object_state > since_state
+    ).group_by(
+        ObjectChange.object_id
+    ).limit(OBJECT_CHANGES_MAX + 1).all()
+
+    object_ids = [change.object_id for change in logged_changes]
+    if None in object_ids or len(object_ids) > OBJECT_CHANGES_MAX:
+        changes['reset'] = True
+        return changes
+
+    # The cached state may lag behind the log when it is updated by another process
+    state['object_state'] = max([state['object_state']] + [change.object_state for change in logged_changes])
+    changes['object_ids'] = object_ids
+
+    return changes
+
+
 def delete_case_states(caseid):
     ObjectState.query.filter(
         ObjectState.object_case_id == caseid
     ).delete()
 
+    ObjectChange.query.filter(
+        ObjectChange.object_case_id == caseid
+    ).delete()
+
+    cache.delete_many(*[_get_state_cache_key(object_name, caseid) for object_name in OBJECT_STATE_NAMES])
+
 
 def update_timeline_state(caseid, userid=None):
     return update_object_state('timeline', caseid=caseid, userid=userid)
@@ -109,22 +346,30 @@ def get_evidences_state(caseid):
     return get_object_state('evidences', caseid=caseid)
 
 
-def update_ioc_state(caseid, userid=None):
-    return update_object_state('ioc', caseid=caseid, userid=userid)
+def update_ioc_state(caseid, userid=None, object_ids=None, operation='update'):
+    return update_object_state('ioc', caseid=caseid, userid=userid, object_ids=object_ids, operation=operation)
 
 
 def get_ioc_state(caseid):
     return get_object_state('ioc', caseid=caseid)
 
 
-def update_assets_state(caseid, userid=None):
-    return update_object_state('assets', caseid=caseid, userid=userid)
+def get_ioc_changes(caseid, since_state):
+    return get_object_changes('ioc', caseid=caseid, since_state=since_state)
+
+
+def update_assets_state(caseid, userid=None, object_ids=None, operation='update'):
+    return update_object_state('assets', caseid=caseid, userid=userid, object_ids=object_ids, operation=operation)
 
 
 def get_assets_state(caseid):
     return get_object_state('assets', caseid=caseid)
 
 
+def get_assets_changes(caseid, since_state):
+    return get_object_changes('assets', caseid=caseid, since_state=since_state)
+
+
 def update_notes_state(caseid, userid=None):
     return update_object_state('notes', caseid=caseid, userid=userid)
 
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# IMPORTS ------------------------------------------------
+import threading
+from collections import namedtuple
+
+# VARS ---------------------------------------------------
+SocketIdentity = namedtuple('SocketIdentity', ['user_id', 'user_login'])
+
+# sid -> {'identity': SocketIdentity, 'cases': {case_id: access level}}
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+# CONTENT ------------------------------------------------
+def ac_socket_get_identity(sid):
+    """
+    Return the identity authenticated on a Socket.IO connection, None if it isn't authenticated yet
+    """
+    connection = _connections.get(sid)
+    return None if connection is None else connection['identity']
+
+
+def ac_socket_get_case_access(sid, case_id):
+    """
+    Return the cached access level of a connection to a case. An access level of 0 means no access.
+    None means it hasn't been computed yet for this case.
+    """
+    connection = _connections.get(sid)
+    if connection is None:
+        return None
+
+    return connection['cases'].get(case_id)
+
+
+def ac_socket_set_case_access(sid, user_id, user_login, case_id, access_level):
+    """
+    Cache the access level of a connection to a case, computed when the client joins the case channel
+    """
+    with _connections_lock:
+        connection = _connections.get(sid)
+        if connection is None or connection['identity'].user_id != user_id:
+            connection = {
+                'identity': SocketIdentity(user_id=user_id, user_login=user_login),
+                'cases': {}
+            }
+            _connections[sid] = connection
+
+        connection['cases'][case_id] = access_level or 0
+
+
+def ac_socket_drop(sid):
+    """
+    Forget a connection, e.g. when it disconnects
+    """
+    with _connections_lock:
+        _connections.pop(sid, None)
+
+
+def ac_socket_revoke_users(user_ids):
+    """
+    Drop the cached decisions of the connections of users whose access changed. They are
+    computed again on their next event.
+    """
+    user_ids = set(user_ids)
+    with _connections_lock:
+        for sid, connection in list(_connections.items()):
+            if connection['identity'].user_id in user_ids:
+                _connections.pop(sid, None)
+
+
+def ac_socket_revoke_case(case_id):
+    """
+    Drop the cached decisions of all the connections to a case
+    """
+    with _connections_lock:
+        for connection in _connections.values():
+            connection['cases'].pop(case_id, None)
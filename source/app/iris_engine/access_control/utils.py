@@ -1,9 +1,12 @@
 from flask import session
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import exists
 
 import app
+from app import cache
 from app import db
+from app.iris_engine.access_control.socket_access import ac_socket_revoke_users
 from app.models import Cases
 from app.models.authorization import CaseAccessLevel
 from app.models.authorization import Group
@@ -359,6 +362,20 @@ def ac_user_has_case_access(user_id, cid, access_level):
     return False
 
 
+def ac_get_recent_user_cases_cache_key(user_id):
+    """
+    Return the cache key of the recent cases of a user, served to the case selector
+    """
+    return f'ctx-recent-cases-{user_id}'
+
+
+def ac_invalidate_user_cases_cache(user_ids):
+    """
+    Drop the cached cases of users whose effective access changed
+    """
+    cache.delete_many(*[ac_get_recent_user_cases_cache_key(user_id) for user_id in set(user_ids)])
+
+
 def ac_recompute_effective_ac_from_users_list(users_list):
     """
     Recompute all users effective access of users
@@ -419,6 +436,9 @@ def ac_add_user_effective_access(users_list, case_id, access_level):
     db.session.add_all(access_to_add)
     db.session.commit()
 
+    ac_socket_revoke_users(users_list)
+    ac_invalidate_user_cases_cache(users_list)
+
 
 def ac_set_new_case_access(org_members, case_id):
     """
@@ -479,6 +499,8 @@ def ac_apply_autofollow_groups_access(case_id):
 
     db.session.add_all(rows_to_push)
     db.session.commit()
+
+    ac_invalidate_user_cases_cache(users.keys())
     return users
 
 
@@ -530,6 +552,10 @@ def ac_auto_update_user_effective_access(user_id):
 
     db.session.commit()
 
+    if ucea_to_add or cid_to_remove:
+        ac_socket_revoke_users([user_id])
+        ac_invalidate_user_cases_cache([user_id])
+
     return
 
 
@@ -561,6 +587,9 @@ def ac_remove_case_access_from_user(user_id, case_id):
 
     db.session.commit()
 
+    ac_socket_revoke_users([user_id])
+    ac_invalidate_user_cases_cache([user_id])
+
     return
 
 
@@ -612,18 +641,39 @@ def ac_set_case_access_for_user(user_id, case_id, access_level, commit=True):
     if commit:
         db.session.commit()
 
+    ac_socket_revoke_users([user_id])
+    ac_invalidate_user_cases_cache([user_id])
+
     return
 
 
-def ac_get_fast_user_cases_access(user_id):
-    ucea = UserCaseEffectiveAccess.query.with_entities(
-        UserCaseEffectiveAccess.case_id
-    ).filter(and_(
+def ac_user_cases_access_clause(case_id_column, user_id):
+    """
+    Return an EXISTS clause true for the rows whose case the user can access. It is evaluated by the
+    database against user_case_effective_access, so its cost doesn't depend on the number of cases of
+    the user, and it never duplicates the rows of the query.
+
+    :param case_id_column: Column holding the case ID of the rows, e.g. Cases.case_id
+    :param user_id: ID of the user
+    :return: SQLAlchemy clause
+    """
+    return exists().where(and_(
+        UserCaseEffectiveAccess.case_id == case_id_column,
         UserCaseEffectiveAccess.user_id == user_id,
-        UserCaseEffectiveAccess.access_level != CaseAccessLevel.full_access.deny_all.value
-    )).all()
+        UserCaseEffectiveAccess.access_level != CaseAccessLevel.deny_all.value
+    ))
+
 
-    return [e.case_id for e in ucea]
+def ac_filter_user_cases(query, case_id_column, user_id):
+    """
+    Restrict a query to the rows of the cases a user can access
+
+    :param query: SQLAlchemy query
+    :param case_id_column: Column holding the case ID of the rows, e.g. Cases.case_id
+    :param user_id: ID of the user
+    :return: Filtered query
+    """
+    return query.filter(ac_user_cases_access_clause(case_id_column, user_id))
 
 
 def ac_get_user_cases_access(user_id):
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# IMPORTS ------------------------------------------------
+import json
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+from flask import has_app_context
+
+from app import app
+from app import db
+from app import socket_io
+from app.datamgmt.states import update_notes_state
+from app.models import Notes
+from app.models.cases import Cases
+from app.models.cases import description_crc32
+
+log = app.logger
+
+# VARS ---------------------------------------------------
+# Seconds without change before a document is persisted
+COLLAB_PERSIST_DEBOUNCE = 2
+# Maximum seconds a change stays unsaved while the document keeps being edited
+COLLAB_PERSIST_MAX_DELAY = 15
+# Seconds after which a saved document nobody edits is dropped from memory
+COLLAB_DOCUMENT_IDLE_TTL = 600
+
+_documents = {}
+_documents_lock = threading.Lock()
+
+
+# CONTENT ------------------------------------------------
+class DeltaError(ValueError):
+    pass
+
+
+class CollaborativeDocument(object):
+    """
+    In-memory buffer of a document edited by several clients. Every accepted delta increments the revision.
+    The buffer is the reference content until it is persisted.
+    """
+    def __init__(self, kind, object_id, case_id, content):
+        self.kind = kind
+        self.object_id = object_id
+        self.case_id = case_id
+        self.lines = (content or '').split('\n')
+        self.revision = 0
+        self.dirty_since = None
+        self.last_change = time.monotonic()
+        self.last_change_by = None
+        self.flush_scheduled = False
+        self.lock = threading.Lock()
+        self._crc32 = None
+
+    @property
+    def content(self):
+        return '\n'.join(self.lines)
+
+    @property
+    def content_crc32(self):
+        # Computed once per revision
+        revision = self.revision
+        if self._crc32 is None or self._crc32[0] != revision:
+            self._crc32 = (revision, description_crc32(self.content))
+
+        return self._crc32[1]
+
+    @property
+    def room(self):
+        return get_document_room(self.kind, self.object_id, self.case_id)
+
+    def snapshot(self):
+        return {
+            'kind': self.kind,
+            'object_id': self.object_id,
+            'content': self.content,
+            'revision': self.revision
+        }
+
+    def _check_position(self, position):
+        row = position.get('row')
+        column = position.get('column')
+        if not isinstance(row, int) or not isinstance(column, int) or row < 0 or column < 0:
+            raise DeltaError('Invalid position')
+
+        if row >= len(self.lines) or column > len(self.lines[row]):
+            raise DeltaError('Position out of document')
+
+        return row, column
+
+    def _apply(self, delta):
+        action = delta.get('action')
+        lines = delta.get('lines')
+        if not isinstance(lines, list) or not lines or not all(isinstance(line, str) for line in lines):
+            raise DeltaError('Invalid delta lines')
+
+        start_row, start_column = self._check_position(delta.get('start') or {})
+
+        if action == 'insert':
+            line = self.lines[start_row]
+            inserted = list(lines)
+            inserted[0] = line[:start_column] + inserted[0]
+            inserted[-1] = inserted[-1] + line[start_column:]
+            self.lines[start_row:start_row + 1] = inserted
+
+        elif action == 'remove':
+            end_row, end_column = self._check_position(delta.get('end') or {})
+            if (end_row, end_column) < (start_row, start_column):
+                raise DeltaError('Invalid delta range')
+
+            if start_row == end_row:
+                removed = [self.lines[start_row][start_column:end_column]]
+            else:
+                removed = [self.lines[start_row][start_column:]] + self.lines[start_row + 1:end_row] + \
+                          [self.lines[end_row][:end_column]]
+
+            # The client removed something else than what the buffer holds
+            if removed != lines:
+                raise DeltaError('Removed content mismatch')
+
+            self.lines[start_row:end_row + 1] = [self.lines[start_row][:start_column] +
+                                                 self.lines[end_row][end_column:]]
+
+        else:
+            raise DeltaError('Unknown delta action')
+
+    def apply_delta(self, base_revision, delta, user_id):
+        """
+        Apply a client delta if it was made on the current revision
+
+        :param base_revision: Revision the client made the change on
+        :param delta: Ace editor delta
+        :param user_id: ID of the user making the change
+        :return: New revision, None if the client is behind or sent an invalid delta
+        """
+        with self.lock:
+            if base_revision != self.revision:
+                return None
+
+            try:
+                self._apply(delta)
+            except DeltaError as e:
+                log.warning(f'Rejected delta on {self.kind} {self.object_id}: {e}')
+                return None
+
+            self.revision += 1
+            self.last_change = time.monotonic()
+            self.last_change_by = user_id
+            if self.dirty_since is None:
+                self.dirty_since = self.last_change
+
+            schedule = not self.flush_scheduled
+            self.flush_scheduled = True
+            revision = self.revision
+
+        if schedule:
+            socket_io.start_background_task(_persist_loop, self)
+
+        return revision
+
+    def reset(self, content):
+        """
+        Replace the buffer with a content saved by another path, e.g. the API
+
+        :param content: Saved content
+        :return: True if the buffer changed, and the editors have to start over from it
+        """
+        with self.lock:
+            self.dirty_since = None
+            if (content or '') == self.content:
+                return False
+
+            self.lines = (content or '').split('\n')
+            self.revision += 1
+            self.last_change = time.monotonic()
+
+        return True
+
+
+def _load_summary(case_id, object_id):
+    case = Cases.query.with_entities(
+        Cases.description
+    ).filter(
+        Cases.case_id == case_id
+    ).first()
+
+    return None if case is None else case.description or ''
+
+
+def _save_summary(case_id, object_id, content, user_id):
+    Cases.query.filter(
+        Cases.case_id == case_id
+    ).update({
+        Cases.description: content,
+        Cases.description_crc32: description_crc32(content)
+    }, synchronize_session=False)
+
+    db.session.commit()
+
+
+def _load_note(case_id, object_id):
+    note = Notes.query.with_entities(
+        Notes.note_content
+    ).filter(
+        Notes.note_id == object_id,
+        Notes.note_case_id == case_id
+    ).first()
+
+    return None if note is None else note.note_content or ''
+
+
+def _save_note(case_id, object_id, content, user_id):
+    Notes.query.filter(
+        Notes.note_id == object_id,
+        Notes.note_case_id == case_id
+    ).update({
+        Notes.note_content: content,
+        Notes.note_lastupdate: datetime.utcnow()
+    }, synchronize_session=False)
+
+    update_notes_state(caseid=case_id, userid=user_id)
+    db.session.commit()
+
+
+DOCUMENT_KINDS = {
+    'summary': (_load_summary, _save_summary),
+    'note': (_load_note, _save_note)
+}
+
+
+def get_document_room(kind, object_id, case_id):
+    """
+    Socket.IO room of the clients editing a document. The summary uses the case room.
+    """
+    if kind == 'summary':
+        return f'case-{case_id}'
+
+    return f'case-{case_id}-{kind}-{object_id}'
+
+
+def _evict_idle_documents():
+    now = time.monotonic()
+    for key, document in list(_documents.items()):
+        if document.dirty_since is None and not document.flush_scheduled and \
+                now - document.last_change > COLLAB_DOCUMENT_IDLE_TTL:
+            _documents.pop(key, None)
+
+
+def get_document(kind, object_id, case_id):
+    """
+    Get the buffer of a document, loading it from the database on first use
+
+    :param kind: Kind of document, summary or note
+    :param object_id: ID of the object holding the document. The case ID for the summary
+    :param case_id: Case of the document
+    :return: CollaborativeDocument, None if it doesn't exist in this case
+    """
+    if kind not in DOCUMENT_KINDS:
+        return None
+
+    key = (kind, object_id)
+    document = _documents.get(key)
+    if document is not None:
+        return document if document.case_id == case_id else None
+
+    with _documents_lock:
+        _evict_idle_documents()
+
+        document = _documents.get(key)
+        if document is None:
+            loader, _ = DOCUMENT_KINDS[kind]
+            content = loader(case_id, object_id)
+            if content is None:
+                return None
+
+            document = CollaborativeDocument(kind, object_id, case_id, content)
+            _documents[key] = document
+
+    return document if document.case_id == case_id else None
+
+
+def get_buffered_document(kind, object_id):
+    """
+    Get the buffer of a document only if it is being edited
+
+    :return: CollaborativeDocument or None
+    """
+    return _documents.get((kind, object_id))
+
+
+def persist_document(document):
+    """
+    Save the buffer of a document if it changed since the last save
+
+    :param document: CollaborativeDocument
+    :return: True if the document has been saved
+    """
+    with document.lock:
+        if document.dirty_since is None:
+            return False
+
+        content = document.content
+        revision = document.revision
+        user_id = document.last_change_by
+
+    _, saver = DOCUMENT_KINDS[document.kind]
+
+    with nullcontext() if has_app_context() else app.app_context():
+        try:
+            saver(document.case_id, document.object_id, content, user_id)
+
+        except Exception as e:
+            db.session.rollback()
+            log.exception(f'Unable to save {document.kind} {document.object_id}: {e}')
+            return False
+
+    with document.lock:
+        if document.revision == revision:
+            document.dirty_since = None
+
+    return True
+
+
+def _persist_loop(document):
+    while True:
+        socket_io.sleep(COLLAB_PERSIST_DEBOUNCE)
+
+        with document.lock:
+            if document.dirty_since is None:
+                document.flush_scheduled = False
+                return
+
+            now = time.monotonic()
+            must_persist = now - document.last_change >= COLLAB_PERSIST_DEBOUNCE or \
+                now - document.dirty_since >= COLLAB_PERSIST_MAX_DELAY
+
+        if must_persist:
+            persist_document(document)
+
+
+def reset_buffered_document(kind, object_id, content):
+    """
+    Align the buffer of a document being edited on a content saved by another path, and send
+    the new snapshot to its editors
+
+    :return: Nothing
+    """
+    document = get_buffered_document(kind, object_id)
+    if document is None:
+        return
+
+    if document.reset(content):
+        socket_io.emit('snapshot', document.snapshot(), to=document.room)
+
+
+def parse_delta(delta):
+    """
+    Deltas may be sent serialized by the clients
+    """
+    if isinstance(delta, str):
+        try:
+            delta = json.loads(delta)
+        except ValueError:
+            return None
+
+    return delta if isinstance(delta, dict) else None
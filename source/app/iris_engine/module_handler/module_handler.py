@@ -452,6 +452,11 @@ def task_hook_wrapper(self, module_name, hook_name, hook_ui_name, data, init_use
         if isinstance(deser_data, list):
             _obj = []
             for dse_data in deser_data:
+                if isinstance(dse_data, (str, int, dict)):
+                    # Plain values, e.g. the IDs of objects deleted in bulk, have no session to be attached to
+                    _obj.append(dse_data)
+                    continue
+
                 obj = db.session.merge(dse_data)
                 db.session.commit()
                 _obj.append(obj)
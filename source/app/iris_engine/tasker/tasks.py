@@ -22,9 +22,11 @@
 import os
 import urllib.parse
 from celery.signals import task_prerun
+from pathlib import Path
 from flask_login import current_user
 
 from app import app
+from app import celery
 from app import db
 from app.datamgmt.case.case_db import get_case
 from app.iris_engine.module_handler.module_handler import pipeline_dispatcher
@@ -35,6 +37,8 @@ from iris_interface.IrisModuleInterface import IrisPipelineTypes
 
 app.config['timezone'] = 'Europe/Paris'
 
+log = app.logger
+
 
 # CONTENT ------------------------------------------------
 @task_prerun.connect
@@ -100,3 +104,27 @@ def chunks(lst, n):
     """Yield successive n-sized chunks from lst."""
     for i in range(0, len(lst), n):
         yield lst[i:i + n]
+
+
+@celery.task(bind=True)
+def task_delete_datastore_files(self, files_paths):
+    """
+    Remove files of the datastore whose records have been deleted, e.g. with their case.
+    The files already missing are ignored.
+
+    :param files_paths: Local paths of the files
+    :return: IrisInterfaceStatus
+    """
+    errors = []
+    for file_path in files_paths:
+        try:
+            Path(file_path).unlink(missing_ok=True)
+
+        except OSError as e:
+            log.error(f'Unable to remove datastore file {file_path}: {e}')
+            errors.append(file_path)
+
+    if errors:
+        return IStatus.I2Error(message=f'Unable to remove {len(errors)} datastore files', logs=errors)
+
+    return IStatus.I2Success(message=f'{len(files_paths)} datastore files removed')
@@ -18,6 +18,7 @@
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import os
+import re
 from datetime import datetime
 
 from app import app
@@ -111,3 +112,54 @@ def parse_bf_date_format(input_str):
                 pass
 
     return None
+
+
+# IOC types whose values are case-insensitive by nature (hashes, network identifiers, emails)
+IOC_CASE_INSENSITIVE_TYPES = {
+    'AS', 'authentihash', 'cdhash', 'domain', 'domain|ip', 'dns-soa-email', 'email', 'email-dst', 'email-reply-to',
+    'email-src', 'git-commit-id', 'hassh-md5', 'hasshserver-md5', 'hostname', 'hostname|port', 'imphash', 'ip-any',
+    'ip-dst', 'ip-dst|port', 'ip-src', 'ip-src|port', 'ja3-fingerprint-md5', 'jarm-fingerprint', 'mac-address',
+    'mac-eui-64', 'md5', 'pehash', 'sha1', 'sha224', 'sha256', 'sha3-224', 'sha3-256', 'sha3-384', 'sha3-512',
+    'sha384', 'sha512', 'sha512/224', 'sha512/256', 'target-email', 'telfhash', 'tlsh', 'whois-registrant-email',
+    'x509-fingerprint-md5', 'x509-fingerprint-sha1', 'x509-fingerprint-sha256'
+}
+
+# IOC types which are commonly shared defanged (hxxp://, [.], [@], ...)
+IOC_DEFANGED_TYPES = {
+    'domain', 'domain|ip', 'dns-soa-email', 'email', 'email-dst', 'email-reply-to', 'email-src', 'hostname',
+    'hostname|port', 'ip-any', 'ip-dst', 'ip-dst|port', 'ip-src', 'ip-src|port', 'link', 'target-email', 'uri',
+    'url', 'whois-registrant-email'
+}
+
+_REFANG_PATTERNS = [
+    (re.compile(r'^hxxp', re.IGNORECASE), 'http'),
+    (re.compile(r'^fxp', re.IGNORECASE), 'ftp'),
+    (re.compile(r'[\[(]\.[\])]|[\[(]dot[\])]', re.IGNORECASE), '.'),
+    (re.compile(r'[\[(]@[\])]|[\[(]at[\])]', re.IGNORECASE), '@'),
+    (re.compile(r'[\[(]:[\])]'), ':'),
+    (re.compile(r'[\[(]/[\])]'), '/')
+]
+
+
+def normalize_ioc_value(ioc_value, ioc_type_name=None):
+    """
+    Build the normalized form of an IOC value, used for exact and case-insensitive matching.
+    The value is trimmed, refanged for network types and lowercased for case-insensitive types.
+
+    :param ioc_value: Raw IOC value
+    :param ioc_type_name: Name of the IOC type
+    :return: Normalized value, None if the value is None
+    """
+    if ioc_value is None:
+        return None
+
+    value = ioc_value.strip()
+
+    if ioc_type_name in IOC_DEFANGED_TYPES:
+        for pattern, replacement in _REFANG_PATTERNS:
+            value = pattern.sub(replacement, value)
+
+    if ioc_type_name in IOC_CASE_INSENSITIVE_TYPES:
+        value = value.lower()
+
+    return value
@@ -6,6 +6,7 @@ from sqlalchemy import BigInteger
 from sqlalchemy import Boolean
 from sqlalchemy import Column
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Text
@@ -109,6 +110,9 @@ class UserCaseAccess(db.Model):
 
 class UserCaseEffectiveAccess(db.Model):
     __tablename__ = "user_case_effective_access"
+    __table_args__ = (
+        Index('user_case_effective_access_user_case_idx', 'user_id', 'case_id'),
+    )
 
     id = Column(BigInteger, primary_key=True, nullable=False)
     user_id = Column(BigInteger, ForeignKey('user.id'), nullable=False)
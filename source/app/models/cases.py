@@ -17,6 +17,7 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import binascii
 import uuid
 
 from datetime import datetime
@@ -28,10 +29,12 @@ from sqlalchemy import Column
 from sqlalchemy import Date
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Text
 from sqlalchemy import UniqueConstraint
+from sqlalchemy import event
 from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.dialects.postgresql import JSONB
@@ -50,12 +53,21 @@ from app.models.models import Client
 
 class Cases(db.Model):
     __tablename__ = 'cases'
+    __table_args__ = (
+        Index('cases_open_date_idx', 'open_date'),
+        Index('cases_close_date_idx', 'close_date'),
+        Index('cases_name_idx', 'name'),
+        Index('cases_soc_id_idx', 'soc_id'),
+        Index('cases_name_trgm_idx', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index('cases_soc_id_trgm_idx', 'soc_id', postgresql_using='gin', postgresql_ops={'soc_id': 'gin_trgm_ops'})
+    )
 
     case_id = Column(BigInteger, primary_key=True)
     soc_id = Column(String(256))
     client_id = Column(ForeignKey('client.client_id'), nullable=False)
     name = Column(String(256))
     description = Column(Text)
+    description_crc32 = Column(BigInteger)
     open_date = Column(Date)
     close_date = Column(Date)
     initial_date = Column(DateTime, nullable=False, server_default=text("now()"))
@@ -155,6 +167,19 @@ class CaseTags(db.Model):
     tag = relationship('Tags')
 
 
+def description_crc32(description):
+    """
+    Checksum of a case description, also computed by the clients to detect local changes
+    """
+    return binascii.crc32((description if isinstance(description, str) else '').encode('utf-8'))
+
+
+@event.listens_for(Cases.description, 'set')
+def _update_description_crc32(target, value, oldvalue, initiator):
+    # Stored so the change checks don't have to load and hash the description
+    target.description_crc32 = description_crc32(value)
+
+
 class CasesEvent(db.Model):
     __tablename__ = "cases_events"
 
@@ -25,8 +25,10 @@ import uuid
 from sqlalchemy import BigInteger, UniqueConstraint
 from sqlalchemy import Boolean
 from sqlalchemy import Column
+from sqlalchemy import Computed
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import LargeBinary
 from sqlalchemy import Sequence
@@ -34,10 +36,13 @@ from sqlalchemy import String
 from sqlalchemy import TIMESTAMP
 from sqlalchemy import Text
 from sqlalchemy import create_engine
+from sqlalchemy import func
 from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import sessionmaker
 
@@ -144,6 +149,9 @@ class AssetsType(db.Model):
 
 class CaseAssets(db.Model):
     __tablename__ = 'case_assets'
+    __table_args__ = (
+        Index('case_assets_name_type_idx', 'asset_name', 'asset_type_id'),
+    )
 
     asset_id = Column(BigInteger, primary_key=True)
     asset_uuid = Column(UUID(as_uuid=True), server_default=text("gen_random_uuid()"), nullable=False)
@@ -161,11 +169,38 @@ class CaseAssets(db.Model):
     user_id = Column(ForeignKey('user.id'))
     analysis_status_id = Column(ForeignKey('analysis_status.id'))
     custom_attributes = Column(JSON)
+    asset_inventory_id = Column(ForeignKey('asset_inventory.inventory_id'), nullable=True, index=True)
 
     case = relationship('Cases')
     user = relationship('User')
     asset_type = relationship('AssetsType')
     analysis_status = relationship('AnalysisStatus')
+    asset_inventory = relationship('AssetInventory')
+
+
+class AssetInventory(db.Model):
+    __tablename__ = 'asset_inventory'
+    __table_args__ = (
+        Index('asset_inventory_client_ip_idx', 'client_id', 'inventory_ip'),
+        Index('asset_inventory_client_domain_idx', 'client_id', 'inventory_domain')
+    )
+
+    inventory_id = Column(BigInteger, primary_key=True)
+    client_id = Column(ForeignKey('client.client_id'), nullable=False)
+    asset_type_id = Column(ForeignKey('assets_type.asset_id'), nullable=False)
+    inventory_name = Column(Text, nullable=False)
+    inventory_ip = Column(Text)
+    inventory_domain = Column(Text)
+    first_seen = Column(DateTime, server_default=text("now()"))
+    last_seen = Column(DateTime, server_default=text("now()"))
+
+    client = relationship('Client')
+    asset_type = relationship('AssetsType')
+
+
+# The names are unbounded, above the size of a btree entry. Their unicity is enforced on their digest.
+Index('asset_inventory_client_type_name_idx', AssetInventory.client_id, AssetInventory.asset_type_id,
+      func.md5(AssetInventory.inventory_name), unique=True)
 
 
 class AnalysisStatus(db.Model):
@@ -233,6 +268,9 @@ class CaseEventsIoc(db.Model):
 
 class ObjectState(db.Model):
     __tablename__ = 'object_state'
+    __table_args__ = (
+        UniqueConstraint('object_case_id', 'object_name', name='object_state_case_name_key'),
+    )
 
     object_id = Column(BigInteger, primary_key=True)
     object_case_id = Column(ForeignKey('cases.case_id'))
@@ -245,6 +283,22 @@ class ObjectState(db.Model):
     updated_by = relationship('User')
 
 
+class ObjectChange(db.Model):
+    __tablename__ = 'object_change'
+    __table_args__ = (
+        Index('object_change_case_name_state_idx', 'object_case_id', 'object_name', 'object_state'),
+    )
+
+    change_id = Column(BigInteger, primary_key=True)
+    object_case_id = Column(ForeignKey('cases.case_id'), nullable=False)
+    object_name = Column(Text, nullable=False)
+    # None when the changed objects are unknown, the clients have to reload the whole list
+    object_id = Column(BigInteger)
+    object_operation = Column(Text, nullable=False)
+    object_state = Column(BigInteger, nullable=False)
+    change_date = Column(TIMESTAMP)
+
+
 class EventCategory(db.Model):
     __tablename__ = 'event_category'
 
@@ -333,6 +387,7 @@ class Ioc(db.Model):
     ioc_id = Column(BigInteger, primary_key=True)
     ioc_uuid = Column(UUID(as_uuid=True), server_default=text("gen_random_uuid()"), nullable=False)
     ioc_value = Column(Text)
+    ioc_value_normalized = Column(Text)
     ioc_type_id = Column(ForeignKey('ioc_type.type_id'))
     ioc_description = Column(Text)
     ioc_tags = Column(String(512))
@@ -346,6 +401,10 @@ class Ioc(db.Model):
     ioc_type = relationship('IocType')
 
 
+# The values are unbounded, above the size of a btree entry. Their unicity is enforced on their digest.
+Index('ioc_value_normalized_type_idx', func.md5(Ioc.ioc_value_normalized), Ioc.ioc_type_id, unique=True)
+
+
 class CustomAttribute(db.Model):
     __tablename__ = 'custom_attribute'
 
@@ -446,8 +505,20 @@ class CasesAssetsExt(db.Model):
     case = relationship('Cases')
 
 
+# Weighted full-text document of a note. The content is capped to stay under the tsvector size limit
+NOTES_SEARCH_VECTOR_EXPRESSION = "setweight(to_tsvector('simple'::regconfig, coalesce(note_title, '')), 'A') || " \
+                                 "setweight(to_tsvector('simple'::regconfig, left(coalesce(note_content, ''), 500000)), 'B')"
+
+
 class Notes(db.Model):
     __tablename__ = 'notes'
+    __table_args__ = (
+        Index('notes_search_vector_idx', 'note_search_vector', postgresql_using='gin'),
+        Index('notes_note_title_trgm_idx', 'note_title', postgresql_using='gin',
+              postgresql_ops={'note_title': 'gin_trgm_ops'}),
+        Index('notes_note_content_trgm_idx', 'note_content', postgresql_using='gin',
+              postgresql_ops={'note_content': 'gin_trgm_ops'})
+    )
 
     note_id = Column(BigInteger, primary_key=True)
     note_uuid = Column(UUID(as_uuid=True), default=uuid.uuid4, server_default=text("gen_random_uuid()"), nullable=False)
@@ -458,11 +529,44 @@ class Notes(db.Model):
     note_lastupdate = Column(DateTime)
     note_case_id = Column(ForeignKey('cases.case_id'))
     custom_attributes = Column(JSON)
+    note_search_vector = deferred(Column(TSVECTOR, Computed(NOTES_SEARCH_VECTOR_EXPRESSION, persisted=True)))
 
     user = relationship('User')
     case = relationship('Cases')
 
 
+# Weighted full-text document of a search document, built like the notes one
+SEARCH_DOCUMENT_VECTOR_EXPRESSION = "setweight(to_tsvector('simple'::regconfig, coalesce(document_title, '')), 'A') || " \
+                                    "setweight(to_tsvector('simple'::regconfig, " \
+                                    "left(coalesce(document_content, ''), 500000)), 'B')"
+
+
+class SearchDocument(db.Model):
+    """
+    Searchable text of an IOC, note, comment, timeline event or asset within a case. Maintained by database
+    triggers on the source tables, see the migration adding the table.
+    """
+    __tablename__ = 'search_document'
+    __table_args__ = (
+        UniqueConstraint('object_type', 'object_id', 'case_id', name='search_document_object_key'),
+        Index('search_document_vector_idx', 'document_vector', postgresql_using='gin'),
+        Index('search_document_title_trgm_idx', 'document_title', postgresql_using='gin',
+              postgresql_ops={'document_title': 'gin_trgm_ops'}),
+        Index('search_document_case_type_idx', 'case_id', 'object_type')
+    )
+
+    document_id = Column(BigInteger, primary_key=True)
+    object_type = Column(Text, nullable=False)
+    object_id = Column(BigInteger, nullable=False)
+    case_id = Column(ForeignKey('cases.case_id', ondelete='CASCADE'), nullable=False)
+    document_title = Column(Text)
+    document_content = Column(Text)
+    document_update = Column(DateTime)
+    document_vector = deferred(Column(TSVECTOR, Computed(SEARCH_DOCUMENT_VECTOR_EXPRESSION, persisted=True)))
+
+    case = relationship('Cases')
+
+
 class NotesGroup(db.Model):
     __tablename__ = 'notes_group'
 
@@ -472,7 +576,7 @@ class NotesGroup(db.Model):
     group_user = Column(ForeignKey('user.id'))
     group_creationdate = Column(DateTime)
     group_lastupdate = Column(DateTime)
-    group_case_id = Column(ForeignKey('cases.case_id'))
+    group_case_id = Column(ForeignKey('cases.case_id'), index=True)
 
     user = relationship('User')
     case = relationship('Cases')
@@ -480,6 +584,9 @@ class NotesGroup(db.Model):
 
 class NotesGroupLink(db.Model):
     __tablename__ = 'notes_group_link'
+    __table_args__ = (
+        Index('notes_group_link_case_group_idx', 'case_id', 'group_id'),
+    )
 
     link_id = Column(BigInteger, primary_key=True)
     group_id = Column(ForeignKey('notes_group.group_id'))
@@ -613,6 +720,28 @@ class UserActivity(db.Model):
     case = relationship('Cases')
 
 
+class UserCaseActivity(db.Model):
+    """
+    Cases a user has activity on. Maintained by a database trigger on user_activity, see the migration
+    adding the table.
+    """
+    __tablename__ = "user_case_activity"
+
+    user_id = Column(ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    case_id = Column(ForeignKey('cases.case_id', ondelete='CASCADE'), primary_key=True, index=True)
+
+
+class DashboardCounter(db.Model):
+    """
+    Global counters displayed on the dashboard. Maintained by database triggers on cases, see the migration
+    adding the table.
+    """
+    __tablename__ = "dashboard_counter"
+
+    counter_name = Column(Text, primary_key=True)
+    counter_value = Column(BigInteger, nullable=False, default=0)
+
+
 class ServerSettings(db.Model):
     __table_name__ = "server_settings"
 
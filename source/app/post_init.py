@@ -84,6 +84,9 @@ def run_post_init(development=False):
         log.info("Adding pgcrypto extension")
         pg_add_pgcrypto_ext()
 
+        log.info("Adding pg_trgm extension")
+        pg_add_pg_trgm_ext()
+
         log.info("Creating all Iris tables")
         db.create_all(bind=None)
         db.session.commit()
@@ -406,6 +409,12 @@ def pg_add_pgcrypto_ext():
         con.execute('CREATE EXTENSION IF NOT EXISTS pgcrypto;')
 
 
+def pg_add_pg_trgm_ext():
+    # Trigram indexes of the search
+    with db.engine.connect() as con:
+        con.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+
+
 def create_safe_languages():
     create_safe(db.session, Languages, name="french", code="FR")
     create_safe(db.session, Languages, name="english", code="EN")
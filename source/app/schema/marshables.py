@@ -43,6 +43,9 @@ from app import db
 from app import ma
 from app.datamgmt.datastore.datastore_db import datastore_get_standard_path
 from app.datamgmt.manage.manage_attribute_db import merge_custom_attributes
+from app.datamgmt.manage.manage_ioc_types_db import check_ioc_value_format
+from app.datamgmt.manage.manage_ioc_types_db import get_registered_ioc_type
+from app.datamgmt.manage.manage_ioc_types_db import is_registered_tlp
 from app.iris_engine.access_control.utils import ac_mask_from_val_list
 from app.models import AnalysisStatus, CaseClassification
 from app.models import AssetsType
@@ -63,7 +66,6 @@ from app.models import Notes
 from app.models import NotesGroup
 from app.models import ServerSettings
 from app.models import TaskStatus
-from app.models import Tlp
 from app.models.authorization import Group
 from app.models.authorization import Organisation
 from app.models.authorization import User
@@ -119,6 +121,7 @@ class CaseNoteSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Notes
         load_instance = True
+        exclude = ['note_search_vector']
 
 
 class CaseAddNoteSchema(ma.Schema):
@@ -198,22 +201,19 @@ class IocSchema(ma.SQLAlchemyAutoSchema):
 
     @pre_load
     def verify_data(self, data, **kwargs):
-        ioc_type = IocType.query.filter(IocType.type_id == data.get('ioc_type_id')).first()
+        ioc_type = get_registered_ioc_type(data.get('ioc_type_id'))
         if not ioc_type:
             raise marshmallow.exceptions.ValidationError("Invalid ioc type ID",
                                                          field_name="ioc_type_id")
 
-        tlp_id = Tlp.query.filter(Tlp.tlp_id == data.get('ioc_tlp_id')).count()
-        if not tlp_id:
+        if not is_registered_tlp(data.get('ioc_tlp_id')):
             raise marshmallow.exceptions.ValidationError("Invalid TLP ID",
                                                          field_name="ioc_tlp_id")
 
-        if ioc_type.type_validation_regex:
-            if not re.fullmatch(ioc_type.type_validation_regex, data.get('ioc_value'), re.IGNORECASE):
-                error = f"The input doesn\'t match the expected format " \
-                        f"(expected: {ioc_type.type_validation_expect or ioc_type.type_validation_regex})"
-                raise marshmallow.exceptions.ValidationError(error,
-                                                             field_name="ioc_ioc_value")
+        error = check_ioc_value_format(data.get('ioc_value'), ioc_type)
+        if error:
+            raise marshmallow.exceptions.ValidationError(error,
+                                                         field_name="ioc_ioc_value")
 
         return data
 
@@ -510,6 +510,15 @@ class IocTypeSchema(ma.SQLAlchemyAutoSchema):
 
     @post_load
     def verify_unique(self, data, **kwargs):
+        if data.type_validation_regex:
+            try:
+                re.compile(data.type_validation_regex)
+            except re.error as e:
+                raise marshmallow.exceptions.ValidationError(
+                    f"Invalid validation regex: {e}",
+                    field_name="type_validation_regex"
+                )
+
         client = IocType.query.filter(
             func.lower(IocType.type_name) == func.lower(data.type_name),
             IocType.type_id != data.type_id
@@ -4,7 +4,15 @@ g_asset_desc_editor = null;
 
 
 function reload_assets() {
-    get_case_assets();
+    apply_table_changes(Table, '/case/assets/changes', 'asset_id', 'assets')
+    .then(function (patched) {
+        if (patched) {
+            load_menu_mod_options('asset', Table, delete_asset);
+            $('[data-toggle="popover"]').popover({html: true, container: 'body'});
+        } else {
+            get_case_assets();
+        }
+    });
 }
 
 function edit_in_asset_desc() {
@@ -514,7 +522,7 @@ $(document).ready(function(){
     }).container().appendTo($('#tables_button'));
 
     get_case_assets();
-    setInterval(function() { check_update('assets/state'); }, 3000);
+    watch_object_state('assets', 'assets/state');
 
     shared_id = getSharedLink();
     if (shared_id) {
@@ -4,7 +4,15 @@ var g_ioc_desc_editor = null;
 
 
 function reload_iocs() {
-    get_case_ioc();
+    apply_table_changes(Table, '/case/ioc/changes', 'ioc_id', 'ioc')
+    .then(function (patched) {
+        if (patched) {
+            $('[data-toggle="popover"]').popover();
+            load_menu_mod_options('ioc', Table, delete_ioc);
+        } else {
+            get_case_ioc();
+        }
+    });
 }
 
 function edit_in_ioc_desc() {
@@ -435,7 +443,7 @@ $(document).ready(function(){
 }).container().appendTo($('#tables_button'));
 
     get_case_ioc();
-    setInterval(function() { check_update('ioc/state'); }, 3000);
+    watch_object_state('ioc', 'ioc/state');
 
     shared_id = getSharedLink();
     if (shared_id) {
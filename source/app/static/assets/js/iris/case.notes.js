@@ -282,12 +282,17 @@ function edit_note(event) {
 
 /* On modal close, refresh */
 $('#modal_note_detail').on('hidden.bs.modal', function (e) {
+    if (note_collaborator !== null) {
+        note_collaborator.close();
+        note_collaborator = null;
+    }
     if (window.location.pathname.includes('/case/notes')) {
         draw_kanban();
     }
   })
 
 var note_editor;
+var note_collaborator = null;
 /* Fetch the edit modal with content from server */
 function note_detail(id, cid) {
     if (cid === undefined ) {
@@ -319,6 +324,14 @@ function note_detail(id, cid) {
             $('#btn_save_note').text("Unsaved").removeClass('btn-success').addClass('btn-warning').removeClass('btn-danger');
         }, save_note);
 
+        if (typeof CollaborativeEditor !== 'undefined' && cid === case_param()) {
+            // Live edition with the other analysts having the note opened
+            if (note_collaborator !== null) {
+                note_collaborator.close();
+            }
+            note_collaborator = new CollaborativeEditor(note_editor, get_caseid(), 'note', id);
+        }
+
         //edit_innote();
         note_editor.focus();
 
@@ -377,12 +390,16 @@ function search_notes() {
     .done((data) => {
         if (data.status == 'success') {
             $('#notes_search_list').empty();
-            for (e in data.data) {
+            for (e in data.data.notes) {
                 li = `<li class="list-group-item list-group-item-action">
-                <span class="name" style="cursor:pointer" title="Click to open note" onclick="note_detail(`+ data.data[e]['note_id'] +`);">`+ data.data[e]['note_title'] +`</span>
+                <span class="name" style="cursor:pointer" title="Click to open note" onclick="note_detail(`+ data.data.notes[e]['note_id'] +`);">`+ sanitizeHTML(data.data.notes[e]['note_title']) +`</span>
+                <br/><small class="text-muted">`+ search_snippet_to_html(data.data.notes[e]['snippet']) +`</small>
                 </li>`
                 $('#notes_search_list').append(li);
             }
+            if (data.data.has_more) {
+                $('#notes_search_list').append(`<li class="list-group-item"><small class="text-muted">More notes match, refine the search to narrow them down</small></li>`);
+            }
             $('#notes_search_list').show();
 
         } else {
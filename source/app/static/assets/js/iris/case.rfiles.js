@@ -351,7 +351,7 @@ $(document).ready(function(){
     });
 
     get_case_rfiles();
-    setInterval(function() { check_update('evidences/state'); }, 3000);
+    watch_object_state('evidences', 'evidences/state');
 
     /* Modal to add rfiles is closed, clear its contents */
     $('.modal').on('hidden.bs.modal', function () {
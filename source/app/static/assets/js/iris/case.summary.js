@@ -13,56 +13,24 @@ var editor = ace.edit("editor_summary",
 
 var textarea = $('#case_summary');
 
-function Collaborator( session_id ) {
-    this.collaboration_socket = io.connect() ;
-
-    this.channel = "case-" + session_id;
-    this.collaboration_socket.emit('join', { 'channel': this.channel });
-
-    this.collaboration_socket.on( "change", function(data) {
-        delta = JSON.parse( data.delta ) ;
-        console.log(delta);
-        last_applied_change = delta ;
-        $("#content_typing").text(data.last_change + " is typing..");
-        editor.getSession().getDocument().applyDeltas( [delta] ) ;
-    }.bind() ) ;
-
-    this.collaboration_socket.on( "clear_buffer", function() {
-        just_cleared_buffer = true ;
-        console.log( "setting editor empty" ) ;
-        editor.setValue( "" ) ;
-    }.bind() ) ;
-
-    this.collaboration_socket.on( "save", function(data) {
-        $("#content_last_saved_by").text("Last saved by " + data.last_saved);
-         sync_editor(true);
-    }.bind() ) ;
-}
-
-Collaborator.prototype.change = function( delta ) {
-    this.collaboration_socket.emit( "change", { 'delta': delta, 'channel': this.channel } ) ;
-}
-
-Collaborator.prototype.clear_buffer = function() {
-    this.collaboration_socket.emit( "clear_buffer", { 'channel': this.channel } ) ;
-}
-
-Collaborator.prototype.save = function() {
-    this.collaboration_socket.emit( "save", { 'channel': this.channel } ) ;
-}
-
 function body_loaded() {
 
-    collaborator = new Collaborator( get_caseid() ) ;
-
-    // registering change callback
-    from_sync = true;
-    editor.on( "change", function( e ) {
-        // TODO, we could make things more efficient and not likely to conflict by keeping track of change IDs
-        if( last_applied_change!=e && editor.curOp && editor.curOp.command.name) {
-            collaborator.change( JSON.stringify(e) ) ;
+    collaborator = new CollaborativeEditor(editor, get_caseid(), 'summary', get_caseid(), {
+        on_remote_change: function(data) {
+            $("#content_typing").text(data.last_change + " is typing..");
+        },
+        on_remote_save: function(data) {
+            $("#content_last_saved_by").text("Last saved by " + data.last_saved);
+        },
+        on_snapshot: function(data) {
+            $('#fetched_crc').val(crc32(data.content).toString());
+            $('#content_last_sync').text("Last synced: " + new Date().toLocaleTimeString());
+        },
+        on_clear_buffer: function() {
+            just_cleared_buffer = true ;
+            editor.setValue( "" ) ;
         }
-    }, false );
+    });
 
     editor.$blockScrolling = Infinity ;
 
@@ -158,6 +126,20 @@ function sync_editor(no_check) {
 
     $('#last_saved').text('Syncing..').addClass('badge-danger').removeClass('badge-success');
 
+    if (collaborator !== null && collaborator.is_synced()) {
+        // The server holds the edited summary, it is either saved or fetched from there
+        if (no_check) {
+            collaborator.resync();
+            $('#last_saved').text('Changes saved').removeClass('badge-danger').addClass('badge-success');
+        } else {
+            collaborator.save(function() {
+                $('#content_last_sync').text("Last synced: " + new Date().toLocaleTimeString());
+                $('#last_saved').text('Changes saved').removeClass('badge-danger').addClass('badge-success');
+            });
+        }
+        return;
+    }
+
     get_request_api('/case/summary/fetch')
     .done((data) => {
         if (data.status == 'success') {
@@ -452,7 +452,7 @@ $(document).ready(function(){
 
     get_tasks();
 
-    setInterval(function() { check_update('tasks/state'); }, 3000);
+    watch_object_state('tasks', 'tasks/state');
 
     shared_id = getSharedLink();
     if (shared_id) {
@@ -1001,7 +1001,7 @@ $(document).ready(function(){
 
     get_or_filter_tm();
 
-    setInterval(function() { check_update('timeline/state'); }, 3000);
+    watch_object_state('timeline', 'timeline/state');
 
 });
 
@@ -0,0 +1,125 @@
+/* Collaborative edition of a document (case summary, note) with an Ace editor.
+*  The local changes are sent as Ace deltas made on top of the last known revision.
+*  The server buffers the document, broadcasts the accepted deltas to the other editors
+*  and sends a snapshot to the clients falling behind.
+*/
+function CollaborativeEditor(editor, case_id, kind, object_id, callbacks) {
+    this.editor = editor;
+    this.channel = "case-" + case_id;
+    this.kind = kind;
+    this.object_id = object_id;
+    this.callbacks = callbacks || {};
+    this.revision = null;
+    this.applying = false;
+    this.socket = get_page_socket();
+    this.handlers = {};
+
+    this._on("connect", function() {
+        // Joining again after a reconnection gets a fresh snapshot
+        this.socket.emit("join", this._payload());
+    });
+
+    this._on("snapshot", function(data) {
+        if (!this._is_mine(data)) { return; }
+        this._apply(function() {
+            this.editor.getSession().getDocument().setValue(data.content);
+        });
+        this.revision = data.revision;
+        this._callback("on_snapshot", data);
+    });
+
+    this._on("change", function(data) {
+        if (!this._is_mine(data)) { return; }
+        if (this.revision === null || data.revision !== this.revision + 1) {
+            // A change was missed, or ours conflicted with it
+            this.resync();
+            return;
+        }
+        this._apply(function() {
+            this.editor.getSession().getDocument().applyDeltas([data.delta]);
+        });
+        this.revision = data.revision;
+        this._callback("on_remote_change", data);
+    });
+
+    this._on("save", function(data) {
+        if (!this._is_mine(data)) { return; }
+        this._callback("on_remote_save", data);
+    });
+
+    this._on("clear_buffer", function() {
+        this._callback("on_clear_buffer");
+    });
+
+    this.on_editor_change = function(delta) {
+        if (this.applying || this.revision === null) { return; }
+        var payload = this._payload();
+        payload['revision'] = this.revision;
+        payload['delta'] = delta;
+        // Optimistically on top of our own change. The server sends a snapshot if it refused it.
+        this.revision += 1;
+        this.socket.emit("change", payload);
+    }.bind(this);
+    this.editor.on("change", this.on_editor_change);
+
+    if (this.socket.connected) {
+        this.socket.emit("join", this._payload());
+    }
+}
+
+CollaborativeEditor.prototype._payload = function() {
+    return { 'channel': this.channel, 'kind': this.kind, 'object_id': this.object_id };
+}
+
+CollaborativeEditor.prototype._is_mine = function(data) {
+    return data !== undefined && data.kind === this.kind && data.object_id == this.object_id;
+}
+
+CollaborativeEditor.prototype._on = function(event, handler) {
+    this.handlers[event] = handler.bind(this);
+    this.socket.on(event, this.handlers[event]);
+}
+
+CollaborativeEditor.prototype._apply = function(apply_fn) {
+    this.applying = true;
+    try {
+        apply_fn.bind(this)();
+    } finally {
+        this.applying = false;
+    }
+}
+
+CollaborativeEditor.prototype._callback = function(name, data) {
+    if (this.callbacks[name] !== undefined) {
+        this.callbacks[name](data);
+    }
+}
+
+CollaborativeEditor.prototype.is_synced = function() {
+    return this.socket.connected && this.revision !== null;
+}
+
+CollaborativeEditor.prototype.resync = function() {
+    this.revision = null;
+    this.socket.emit("resync", this._payload());
+}
+
+CollaborativeEditor.prototype.save = function(on_saved) {
+    this.socket.emit("save", this._payload(), function(data) {
+        if (on_saved !== undefined) {
+            on_saved(data);
+        }
+    });
+}
+
+CollaborativeEditor.prototype.clear_buffer = function() {
+    this.socket.emit("clear_buffer", this._payload());
+}
+
+CollaborativeEditor.prototype.close = function() {
+    this.editor.off("change", this.on_editor_change);
+    for (var event in this.handlers) {
+        this.socket.off(event, this.handlers[event]);
+    }
+    this.socket.emit("leave", this._payload());
+}
@@ -423,10 +423,7 @@ function check_update(url) {
             type: "GET",
             dataType: "json",
             success: function (data) {
-                    if (last_state == null || last_state < data.data.object_state) {
-                        $('#last_resfresh').text("Updates available").addClass("text-warning");
-                        need_check = false;
-                    }
+                    notify_object_state(data.data.object_state);
                 },
             error: function (data) {
                 if (data.status == 404) {
@@ -463,6 +460,98 @@ function check_update(url) {
     }
 }
 
+function notify_object_state(object_state) {
+    if (need_check && (last_state == null || last_state < object_state)) {
+        $('#last_resfresh').text("Updates available").addClass("text-warning");
+        need_check = false;
+    }
+}
+
+/* The server pushes the states changes of the case, polling is only a fallback */
+var STATE_POLLING_INTERVAL = 60000;
+var STATE_POLLING_INTERVAL_DISCONNECTED = 10000;
+var state_socket = null;
+var state_last_poll = 0;
+var page_socket = null;
+
+/* Socket of the default namespace, shared by the states watcher and the collaborative editors of the page */
+function get_page_socket() {
+    if (page_socket === null) {
+        page_socket = io.connect();
+    }
+    return page_socket;
+}
+
+function watch_object_state(object_name, url) {
+    if (typeof io !== 'undefined') {
+        state_socket = get_page_socket();
+        state_socket.on('connect', function() {
+            state_socket.emit('join-states', {'channel': 'case-' + get_caseid()});
+            if (last_state != null) {
+                // Changes may have been missed while disconnected
+                check_update(url);
+            }
+        });
+        if (state_socket.connected) {
+            state_socket.emit('join-states', {'channel': 'case-' + get_caseid()});
+        }
+        state_socket.on('object_state', function(data) {
+            if (data.object_name === object_name && data.case_id == get_caseid()) {
+                notify_object_state(data.object_state);
+            }
+        });
+    }
+
+    state_last_poll = Date.now();
+    setInterval(function() {
+        var interval = (state_socket !== null && state_socket.connected) ?
+            STATE_POLLING_INTERVAL : STATE_POLLING_INTERVAL_DISCONNECTED;
+        if (Date.now() - state_last_poll >= interval) {
+            state_last_poll = Date.now();
+            check_update(url);
+        }
+    }, 5000);
+}
+
+/* Patch the rows of a datatable with the changes since the last state.
+*  Returns false if the changes aren't known and the whole table has to be reloaded.
+*/
+function apply_table_changes(table, url, id_field, rows_field) {
+    if (last_state == null) {
+        return $.Deferred().resolve(false);
+    }
+
+    return get_raw_request_api(url + case_param() + '&since=' + last_state)
+    .then(function (response) {
+        if (response.status != 'success' || response.data.reset) {
+            return false;
+        }
+
+        var changed = {};
+        response.data[rows_field].forEach(function (row) { changed[row[id_field]] = row; });
+        var deleted = new Set(response.data.deleted.map(String));
+
+        var to_remove = [];
+        table.rows().every(function () {
+            var row_id = this.data()[id_field];
+            if (deleted.has(String(row_id))) {
+                to_remove.push(this.index());
+            } else if (changed[row_id] !== undefined) {
+                this.data(changed[row_id]);
+                delete changed[row_id];
+            }
+        });
+        table.rows(to_remove).remove();
+        table.rows.add(Object.values(changed));
+        table.draw(false);
+
+        set_last_state(response.data.state);
+        return true;
+    }, function () {
+        return false;
+    });
+}
+
 function set_last_state(state){
     if (state != null) {
         last_state = state.object_state;
@@ -499,6 +588,14 @@ var sanitizeHTML = function (str, options) {
     return filterXSS(str, options);
 };
 
+function search_snippet_to_html(snippet) {
+    /* Search snippets only keep the <mark> highlights of the matched terms */
+    if (!snippet) {
+        return '';
+    }
+    return sanitizeHTML(snippet, {whiteList: {mark: []}, stripIgnoreTag: true});
+}
+
 function isWhiteSpace(s) {
   return /^\s+$/.test(s);
 }
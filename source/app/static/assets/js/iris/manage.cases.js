@@ -106,17 +106,30 @@ function send_add_case(data_sent) {
  *************************/
 /* case table creation */
 $('#cases_table').dataTable({
-    "ajax": {
-        "url": "cases/list" + case_param(),
-        "contentType": "application/json",
-        "type": "GET",
-        "data": function (d) {
-            if (d.status == 'success') {
-                return JSON.stringify(d.data);
+    "serverSide": true,
+    "processing": true,
+    "searchDelay": 400,
+    "ajax": function (data, callback, settings) {
+        var order = data.order.length > 0 ? data.order[0] : {'column': 3, 'dir': 'desc'};
+        var params = {
+            'draw': data.draw,
+            'start': data.start,
+            'length': data.length,
+            'order_by': data.columns[order.column].data,
+            'order_dir': order.dir,
+            'search': data.search.value
+        };
+        get_raw_request_api('/manage/cases/list' + case_param() + '&' + $.param(params))
+        .done((response) => {
+            if (response.status == 'success') {
+                callback(response.data);
             } else {
-                return [];
+                callback({'draw': data.draw, 'recordsTotal': 0, 'recordsFiltered': 0, 'data': []});
             }
-        }
+        })
+        .fail(() => {
+            callback({'draw': data.draw, 'recordsTotal': 0, 'recordsFiltered': 0, 'data': []});
+        });
     },
     "order": [[3, "desc"]],
     "autoWidth": false,
@@ -129,21 +142,18 @@ $('#cases_table').dataTable({
             "data": "case_name"
         },
         {
-            "data": "case_description",
+            "data": "case_id",
+            "orderable": false,
             "render": function (data, type, row) {
-                if (type === 'display' && data != null) {
-                    if (row["case_description"].length > 50){
-                        return sanitizeHTML(row["case_description"].slice(0,50)) + " ... " ;
-                    }
-                    else {
-                        return sanitizeHTML(row["case_description"]);
-                    }
+                if (type === 'display') {
+                    return '<a href="#" class="case-description" onclick="load_case_description(this, ' + data + ');return false;">Show</a>';
                 }
                 return data;
             },
         },
         {
             "data": "client_name",
+            "orderable": false,
             "render": function (data, type, row, meta) {
             if (type === 'display') { data = sanitizeHTML(data);}
             return data;
@@ -174,6 +184,7 @@ $('#cases_table').dataTable({
         },
         {
             "data": "opened_by",
+            "orderable": false,
             "render": function (data, type, row, meta) {
             if (type === 'display') { data = sanitizeHTML(data);}
             return data;
@@ -182,6 +193,18 @@ $('#cases_table').dataTable({
     ]
 });
 
+/* The descriptions aren't part of the listing, they are loaded when asked */
+function load_case_description(element, case_id) {
+    get_request_api('/manage/cases/' + case_id)
+    .done((data) => {
+        if (notify_auto_api(data, true)) {
+            var description = data.data.case_description || '';
+            var short_description = description.length > 50 ? description.slice(0, 50) + " ... " : description;
+            $(element).replaceWith($('<span>').attr('title', description).text(short_description));
+        }
+    });
+}
+
 
 $(document).ready(function() {
 
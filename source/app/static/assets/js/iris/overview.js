@@ -1,9 +1,40 @@
 $.each($.find("table"), function(index, element){
     addFilterFields($(element).attr("id"));
 });
+// Columns filtered by the server, see OVERVIEW_FILTERABLE_COLUMNS
+var overview_filterable_columns = ['case_title', 'customer_name', 'classification', 'owner'];
+
 var OverviewTable = $("#overview_table").DataTable({
     dom: '<"container-fluid"<"row"<"col"l><"col"f>>>rt<"container-fluid"<"row"<"col"i><"col"p>>>',
-    aaData: [],
+    serverSide: true,
+    searchDelay: 400,
+    ajax: function (data, callback, settings) {
+        var order = data.order.length > 0 ? data.order[0] : {'column': 1, 'dir': 'asc'};
+        var params = {
+            'draw': data.draw,
+            'start': data.start,
+            'length': data.length,
+            'order_by': data.columns[order.column].data,
+            'order_dir': order.dir,
+            'search': data.search.value
+        };
+        data.columns.forEach(function (column) {
+            if (overview_filterable_columns.includes(column.data) && column.search.value) {
+                params['filter_' + column.data] = column.search.value;
+            }
+        });
+        get_raw_request_api('/overview/filter' + case_param() + '&' + $.param(params))
+        .done((response) => {
+            if (response.status == 'success') {
+                callback(response.data);
+            } else {
+                callback({'draw': data.draw, 'recordsTotal': 0, 'recordsFiltered': 0, 'data': []});
+            }
+        })
+        .fail(() => {
+            callback({'draw': data.draw, 'recordsTotal': 0, 'recordsFiltered': 0, 'data': []});
+        });
+    },
     aoColumns: [
       {
         "data": "case_title",
@@ -66,6 +97,7 @@ var OverviewTable = $("#overview_table").DataTable({
       },
       {
         "data": "tasks_status",
+        "orderable": false,
         "render": function (data, type, row, meta) {
           if (type === 'display' && data != null) {
               now = (data.closed_tasks / (data.closed_tasks + data.open_tasks))*100;
@@ -112,26 +144,50 @@ var OverviewTable = $("#overview_table").DataTable({
     },
     select: true,
     initComplete: function () {
-            tableFiltering(this.api(), 'overview_table');
-        }
-    });
-
-function get_cases_overview(silent) {
-    get_request_api('overview/filter')
-    .done((data) => {
-        if(notify_auto_api(data, silent)) {
-            overview_list = data.data;
-            OverviewTable.clear();
-            OverviewTable.rows.add(overview_list);
-            OverviewTable.columns.adjust().draw();
+            overview_filtering(this.api());
+        },
+    drawCallback: function () {
             $(".truncate").on("click", function() {
                 var index = $(this).index() + 1;
                 $('table tr td:nth-child(' + index  + ')').toggleClass("truncate");
             });
         }
     });
+
+/* The columns are filtered by the server on the raw text typed, not on a regex as tableFiltering does */
+function overview_filtering(api) {
+    api.columns().every(function (colIdx) {
+        var column = this;
+        var cell = $('#overview_table .filters th').eq($(column.header()).index());
+        if (!overview_filterable_columns.includes(column.dataSrc())) {
+            cell.html('');
+            return;
+        }
+
+        cell.html('<div class="form-group has-feedback"><input type="text" class="form-control" placeholder="Filter"><i class="fas fa-times-circle form-control-feedback"></i></div>');
+        var filter_timer = null;
+        $('input', cell)
+            .off('keyup change')
+            .on('keyup change', function (e) {
+                e.stopPropagation();
+                $(this).attr('title', $(this).val());
+                var value = this.value;
+                clearTimeout(filter_timer);
+                filter_timer = setTimeout(function () {
+                    if (column.search() !== value) {
+                        column.search(value).draw();
+                    }
+                }, 400);
+            });
+        $('i', cell).on('click', function () {
+            $('input', cell).val('').trigger('change');
+        });
+    });
 }
 
-$(document).ready(function() {
-    get_cases_overview(true);
-});
\ No newline at end of file
+function get_cases_overview(silent) {
+    OverviewTable.ajax.reload(null, false);
+    if (!silent) {
+        notify_success('Overview refreshed');
+    }
+}
@@ -143,27 +143,127 @@ Table_comments = $("#comments_search_table").DataTable({
 $("#comments_search_table").css("font-size", 12);
 
 $('#submit_search').click(function () {
+    search_all_filter = null;
     search();
 });
 
+$('#search_more').click(function () {
+    search(search_page + 1);
+});
+
+var search_page = 1;
+var search_all_filter = null;
+var search_all_types = {
+    'ioc': 'IOC',
+    'note': 'Note',
+    'comment': 'Comment',
+    'event': 'Event',
+    'asset': 'Asset'
+};
+
+function search_all_object_link(result) {
+    var pages = {'ioc': 'case/ioc', 'asset': 'case/assets', 'event': 'case/timeline'};
+    var title = sanitizeHTML(result['title']);
+    if (result['object_type'] == 'note') {
+        return `<span style="cursor:pointer" title="Click to open note" onclick="note_detail(${result['object_id']}, ${result['case_id']});">${title}</span>`;
+    }
+    if (pages[result['object_type']] !== undefined) {
+        return `<a target="_blank" href="${pages[result['object_type']]}?cid=${result['case_id']}&shared=${result['object_id']}">${title}</a>`;
+    }
+    return `<a target="_blank" href="case?cid=${result['case_id']}">${title}</a>`;
+}
+
+function search_all_draw(data, page) {
+    if (page == 1) {
+        $('#search_all_list').empty();
+        $('#search_all_facets').empty();
+        for (var object_type in search_all_types) {
+            var facet = data.facets ? data.facets[object_type] : null;
+            var count = facet ? (facet.estimated ? '~' : '') + facet.count : 0;
+            var active = search_all_filter == object_type ? 'badge-primary' : 'badge-light';
+            $('#search_all_facets').append(
+                `<span class="badge ${active} mr-2" style="cursor:pointer" onclick="search_all_set_filter('${object_type}');">` +
+                `${search_all_types[object_type]} <b>${count}</b></span>`);
+        }
+    }
+
+    for (var e in data.results) {
+        var result = data.results[e];
+        var li = `<li class="list-group-item">
+            <span class="badge badge-light mr-2">${search_all_types[result['object_type']]}</span>` +
+            search_all_object_link(result) + ` - <a target="_blank" href="case?cid=${result['case_id']}">` +
+            sanitizeHTML(result['case_name']) + `</a> - ` + sanitizeHTML(result['customer_name']) +
+            `<br/><small class="text-muted">` + search_snippet_to_html(result['snippet']) + `</small></li>`;
+        $('#search_all_list').append(li);
+    }
+
+    $('#search_table_wrapper_4').show();
+}
+
+function search_all_set_filter(object_type) {
+    search_all_filter = search_all_filter == object_type ? null : object_type;
+    search();
+}
 
-function search() {
+function search_notes_draw(data) {
+    for (var e in data.notes) {
+        var note = data.notes[e];
+        var li = `<li class="list-group-item">
+        <span class="name" style="cursor:pointer" title="Click to open note" onclick="note_detail(${note['note_id']}, ${note['case_id']});">`+ sanitizeHTML(note['note_title']) + ` - ` + sanitizeHTML(note['case_name']) + ` - ` + sanitizeHTML(note['client_name']) +`</span>
+        <br/><small class="text-muted">`+ search_snippet_to_html(note['snippet']) +`</small>
+        </li>`
+        $('#notes_msearch_list').append(li);
+    }
+}
+
+function search(page) {
+    if (page === undefined) {
+        page = 1;
+    }
     var data_sent = $('form#form_search').serializeObject();
     data_sent['csrf_token'] = $('#csrf_token').val();
+    data_sent['page'] = page;
+    if (data_sent['search_type'] == 'all') {
+        if (search_all_filter !== null) {
+            data_sent['object_types'] = [search_all_filter];
+        }
+    }
     post_request_api('/search', JSON.stringify(data_sent), true, function (data) {
             $('#submit_search').text("Searching...");
     })
     .done((data) => {
         if(notify_auto_api(data, true)) {
+            val = $("input[type='radio']:checked").val();
+            search_page = page;
+            $('#search_more').toggle(data.data.has_more === true);
+            if (page > 1) {
+                if (val == "all") {
+                    search_all_draw(data.data, page);
+                } else if (val == "ioc") {
+                    Table_1.rows.add(data.data.rows).draw(false);
+                } else if (val == "comments") {
+                    Table_comments.rows.add(data.data.rows).draw(false);
+                } else if (val == "notes") {
+                    search_notes_draw(data.data);
+                }
+                return;
+            }
+              $('#search_total').text("");
+              if (data.data.total !== undefined) {
+                  $('#search_total').text((data.data.total_estimated ? "About " : "") + data.data.total + " matches");
+              }
               $('#notes_msearch_list').empty();
               Table_1.clear();
               Table_comments.clear();
               $('#search_table_wrapper_1').hide();
               $('#search_table_wrapper_2').hide();
               $('#search_table_wrapper_3').hide();
-            val = $("input[type='radio']:checked").val();
-            if (val == "ioc") {
-                Table_1.rows.add(data.data);
+              $('#search_table_wrapper_4').hide();
+            if (val == "all") {
+                search_all_draw(data.data, page);
+            }
+            else if (val == "ioc") {
+                Table_1.rows.add(data.data.rows);
                 Table_1.columns.adjust().draw();
                 $('#search_table_wrapper_1').show();
 
@@ -174,15 +274,10 @@ function search() {
                 });
             }
             else if (val == "notes") {
-                for (e in data.data) {
-                    li = `<li class="list-group-item">
-                    <span class="name" style="cursor:pointer" title="Click to open note" onclick="note_detail(${data.data[e]['note_id']}, ${data.data[e]['case_id']});">`+ sanitizeHTML(data.data[e]['note_title']) + ` - ` + sanitizeHTML(data.data[e]['case_name']) + ` - ` + sanitizeHTML(data.data[e]['client_name']) +`</span>
-                    </li>`
-                    $('#notes_msearch_list').append(li);
-                }
+                search_notes_draw(data.data);
                 $('#search_table_wrapper_2').show();
             } else if (val == "comments") {
-                Table_comments.rows.add(data.data);
+                Table_comments.rows.add(data.data.rows);
                 Table_comments.columns.adjust().draw();
                 $('#search_table_wrapper_3').show();
 
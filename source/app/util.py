@@ -28,6 +28,7 @@ import pickle
 import random
 import shutil
 import string
+import time
 import traceback
 import uuid
 import weakref
@@ -40,6 +41,7 @@ from cryptography.exceptions import InvalidSignature
 import jwt
 import requests
 from flask import Request
+from flask import g
 from flask import json
 from flask import render_template
 from flask import request
@@ -57,17 +59,29 @@ from werkzeug.utils import redirect
 
 from app import TEMPLATE_PATH
 from app import app
+from app import cache
 from app import db
 from app.datamgmt.case.case_db import case_exists
 from app.datamgmt.case.case_db import get_case
 from app.datamgmt.manage.manage_users_db import get_user
+from app.datamgmt.states import get_object_state
+from app.iris_engine.access_control.socket_access import ac_socket_get_case_access
+from app.iris_engine.access_control.socket_access import ac_socket_set_case_access
 from app.iris_engine.access_control.utils import ac_fast_check_user_has_case_access
+from app.iris_engine.access_control.utils import ac_flag_match_mask
 from app.iris_engine.access_control.utils import ac_get_effective_permissions_of_user
 from app.iris_engine.utils.tracker import track_activity
 from app.models import Cases
 from app.models.authorization import CaseAccessLevel
 
 
+# Seconds a state cached response is kept. It is not served anymore as soon as a state moves, and bounds
+# the staleness of the data not covered by the states.
+STATE_CACHED_RESPONSE_TIMEOUT = 300
+# Seconds a request waits for the same response being computed by another one
+STATE_CACHED_RESPONSE_WAIT = 5
+
+
 def response(msg, data):
     rsp = {
         "status": "success",
@@ -244,6 +258,7 @@ def get_case_access(request_data, access_level, from_api=False):
         access_level = [CaseAccessLevel.read_only, CaseAccessLevel.full_access]
 
     eaccess_level = ac_fast_check_user_has_case_access(current_user.id, caseid, access_level)
+    g.case_access_level = eaccess_level
     if eaccess_level is None:
         if not from_api:
             session['current_case'] = {
@@ -497,21 +512,26 @@ def ac_socket_requires(*access_level):
     def inner_wrap(f):
         @wraps(f)
         def wrap(*args, **kwargs):
-            if not is_user_authenticated(request):
-                return redirect(not_authenticated_redirection_url())
+            chan_id = args[0].get('channel') if isinstance(args[0], dict) else None
+            try:
+                case_id = int(chan_id.replace('case-', ''))
+            except (AttributeError, ValueError):
+                return ac_return_access_denied(caseid=0)
 
-            else:
-                chan_id = args[0].get('channel')
-                if chan_id:
-                    case_id = int(chan_id.replace('case-', ''))
-                else:
-                    return ac_return_access_denied(caseid=0)
+            # The decision is computed once per connection and case, so the frequent events
+            # of a client don't hit the database
+            case_access = ac_socket_get_case_access(request.sid, case_id)
+            if case_access is None:
+                if not is_user_authenticated(request):
+                    return redirect(not_authenticated_redirection_url())
 
-                access = ac_fast_check_user_has_case_access(current_user.id, case_id, access_level)
-                if not access:
-                    return ac_return_access_denied(caseid=case_id)
+                case_access = ac_fast_check_user_has_case_access(current_user.id, case_id, CaseAccessLevel)
+                ac_socket_set_case_access(request.sid, current_user.id, current_user.user, case_id, case_access)
 
-                return f(*args, **kwargs)
+            if not case_access or not any(ac_flag_match_mask(case_access, acl.value) for acl in access_level):
+                return ac_return_access_denied(caseid=case_id)
+
+            return f(*args, **kwargs)
 
         return wrap
     return inner_wrap
@@ -575,6 +595,79 @@ def ac_api_case_requires(*access_level):
     return inner_wrap
 
 
+def _state_cached_response(payload, etag):
+    if request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+    else:
+        resp = app.response_class(response=payload, status=200, mimetype='application/json')
+
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+
+def state_cached_response(*object_names):
+    """
+    Cache the successful responses of a case endpoint until the state of one of the objects it returns moves.
+    The requests of all the users with the same access are served from one computation. The ETag is a digest
+    of the payload, so the clients revalidating get a 304 only as long as it is unchanged. Must be placed
+    after ac_api_case_requires. Not suited to the responses holding data of other cases, as their changes
+    don't move the states of the case.
+
+    :param object_names: Names of the objects states the response depends on
+    """
+    def inner_wrap(f):
+        @wraps(f)
+        def wrap(*args, **kwargs):
+            caseid = kwargs.get('caseid')
+            states = [get_object_state(object_name, caseid) for object_name in object_names]
+            if any(state is None for state in states):
+                return f(*args, **kwargs)
+
+            key_parts = [
+                request.endpoint,
+                caseid,
+                sorted((request.view_args or {}).items()),
+                sorted((k, v) for k, v in request.args.items(multi=True) if k != 'cid'),
+                [state['object_state'] for state in states],
+                g.get('case_access_level'),
+                # Some endpoints return a different shape to the web UI than to the API
+                bool(request.cookies.get('session'))
+            ]
+
+            key_digest = hashlib.sha256(json.dumps(key_parts).encode('utf-8')).hexdigest()
+            cache_key = f'iris_state_response_{key_digest}'
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return _state_cached_response(*cached)
+
+            lock_key = f'{cache_key}_lock'
+            if not cache.add(lock_key, 1, timeout=STATE_CACHED_RESPONSE_WAIT):
+                # The same response is being computed by another request
+                deadline = time.monotonic() + STATE_CACHED_RESPONSE_WAIT
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    cached = cache.get(cache_key)
+                    if cached is not None:
+                        return _state_cached_response(*cached)
+
+            try:
+                resp = f(*args, **kwargs)
+                if resp.status_code == 200 and resp.mimetype == 'application/json':
+                    payload = resp.get_data()
+                    etag = hashlib.sha256(payload).hexdigest()
+                    cache.set(cache_key, (payload, etag), timeout=STATE_CACHED_RESPONSE_TIMEOUT)
+                    resp = _state_cached_response(payload, etag)
+
+            finally:
+                cache.delete(lock_key)
+
+            return resp
+
+        return wrap
+    return inner_wrap
+
+
 def endpoint_deprecated(message, version):
     def inner_wrap(f):
         @wraps(f)
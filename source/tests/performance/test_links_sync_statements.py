@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from unittest import TestCase
+
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import db
+from app.datamgmt.case.case_assets_db import set_ioc_links
+from app.datamgmt.case.case_events_db import update_event_assets
+from app.datamgmt.case.case_events_db import update_event_iocs
+from app.models.authorization import User
+from app.models.cases import Cases
+from app.models.cases import CasesEvent
+from app.models.models import CaseAssets
+from app.models.models import Ioc
+from app.models.models import IocLink
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _before_cursor_execute)
+
+
+class TestLinksSyncStatements(TestCase):
+    ASSETS_NB = 50
+    IOCS_NB = 20
+
+    def setUp(self) -> None:
+        logging.info('SetUp called')
+        clean_db()
+        run_post_init()
+
+        self.case = Cases.query.first()
+        user = User.query.first()
+
+        self.assets = []
+        for i in range(self.ASSETS_NB):
+            asset = CaseAssets()
+            asset.asset_name = f"asset_{i}"
+            asset.asset_type_id = 1
+            asset.case_id = self.case.case_id
+            asset.user_id = user.id
+            db.session.add(asset)
+            self.assets.append(asset)
+
+        self.iocs = []
+        for i in range(self.IOCS_NB):
+            ioc = Ioc()
+            ioc.ioc_value = f"ioc_{i}"
+            ioc.ioc_value_normalized = f"ioc_{i}"
+            ioc.ioc_type_id = 1
+            ioc.user_id = user.id
+            db.session.add(ioc)
+            self.iocs.append(ioc)
+
+        self.event = CasesEvent()
+        self.event.case_id = self.case.case_id
+        self.event.user_id = user.id
+        self.event.event_title = "Links sync"
+        self.event.event_date = datetime.utcnow()
+        self.event.event_added = datetime.utcnow()
+        db.session.add(self.event)
+        db.session.commit()
+
+        for ioc in self.iocs:
+            db.session.add(IocLink(ioc_id=ioc.ioc_id, case_id=self.case.case_id))
+        db.session.commit()
+
+    def tearDown(self) -> None:
+        logging.info('Teardown called')
+        clean_db()
+
+    def _save_event(self, assets_ids, iocs_ids):
+        with count_statements() as statements:
+            update_event_assets(event_id=self.event.event_id,
+                                caseid=self.case.case_id,
+                                assets_list=assets_ids,
+                                iocs_list=iocs_ids,
+                                sync_iocs_assets=True)
+
+            update_event_iocs(event_id=self.event.event_id,
+                              caseid=self.case.case_id,
+                              iocs_list=iocs_ids)
+
+        return len(statements)
+
+    def test_event_save_statements(self):
+        assets_ids = [asset.asset_id for asset in self.assets]
+        iocs_ids = [ioc.ioc_id for ioc in self.iocs]
+
+        statements_nb = self._save_event(assets_ids, iocs_ids)
+        logging.info(f"First save of {len(assets_ids)} assets and {len(iocs_ids)} IOCs: {statements_nb} statements")
+        self.assertLessEqual(statements_nb, 10)
+
+        statements_nb = self._save_event(assets_ids, iocs_ids)
+        logging.info(f"Unchanged save: {statements_nb} statements")
+        self.assertLessEqual(statements_nb, 6)
+
+        statements_nb = self._save_event(assets_ids[:10] + assets_ids[-5:], iocs_ids[5:])
+        logging.info(f"Partial save: {statements_nb} statements")
+        self.assertLessEqual(statements_nb, 10)
+
+    def test_asset_save_statements(self):
+        asset_id = self.assets[0].asset_id
+        iocs_ids = [ioc.ioc_id for ioc in self.iocs]
+
+        with count_statements() as statements:
+            set_ioc_links(iocs_ids, asset_id)
+        logging.info(f"First save of {len(iocs_ids)} IOCs links: {len(statements)} statements")
+        self.assertLessEqual(len(statements), 4)
+
+        with count_statements() as statements:
+            set_ioc_links(iocs_ids[:10], asset_id)
+        logging.info(f"Partial save: {len(statements)} statements")
+        self.assertLessEqual(len(statements), 4)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  Copyright (C) 2021 - Airbus CyberSecurity (SAS)
+#  ir@cyberactionlab.net
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+from app.blueprints.case.case_assets_routes import ASSETS_CSV_HEADERS
+from app.blueprints.case.case_assets_routes import _check_assets_rows
+from app.blueprints.case.case_assets_routes import _format_assets_import_errors
+from app.blueprints.case.case_assets_routes import _parse_assets_csv
+
+ASSETS_TYPES = {'windows - computer': 1, 'linux - server': 2}
+CASE_IOCS = {'evil.com': 10, '1.2.3.4': 11}
+
+
+class TestCaseAssetsRoutes(TestCase):
+    # CSV PARSING
+    def test_parse_assets_csv_should_return_the_valid_rows(self):
+        rows, errors = _parse_assets_csv([
+            ASSETS_CSV_HEADERS + ',asset_iocs',
+            'DC01,Windows - Computer,Domain controller,10.0.0.1,corp.local,dc|critical,evil.com|1.2.3.4'
+        ], ASSETS_TYPES, CASE_IOCS, 3)
+
+        self.assertEqual([], errors)
+        self.assertEqual([{
+            'row': 0,
+            'asset_name': 'DC01',
+            'asset_type_id': 1,
+            'asset_description': 'Domain controller',
+            'asset_ip': '10.0.0.1',
+            'asset_domain': 'corp.local',
+            'asset_tags': 'dc,critical',
+            'analysis_status_id': 3,
+            'ioc_links': [10, 11]
+        }], rows)
+
+    def test_parse_assets_csv_should_accept_a_file_without_header(self):
+        rows, errors = _parse_assets_csv(['SRV01,linux - server,,,,'], ASSETS_TYPES, CASE_IOCS, 3)
+
+        self.assertEqual([], errors)
+        self.assertEqual(1, len(rows))
+        self.assertEqual(2, rows[0]['asset_type_id'])
+        self.assertIsNone(rows[0]['asset_tags'])
+        self.assertEqual([], rows[0]['ioc_links'])
+
+    def test_parse_assets_csv_should_report_the_invalid_rows(self):
+        rows, errors = _parse_assets_csv([
+            ASSETS_CSV_HEADERS,
+            'DC01,Windows - Computer,,,,',
+            'A,Windows - Computer,,,,',
+            'DC02,,,,,',
+            'DC03,Mainframe,,,,',
+            'DC04,Windows - Computer'
+        ], ASSETS_TYPES, CASE_IOCS, 3)
+
+        self.assertEqual(['DC01'], [row['asset_name'] for row in rows])
+        self.assertEqual([
+            {'row': 1, 'error': "Empty or too short asset name"},
+            {'row': 2, 'error': "Empty asset type for DC02"},
+            {'row': 3, 'error': "Invalid asset type Mainframe for DC03"},
+            {'row': 4, 'error': "asset_description, asset_ip, asset_domain, asset_tags missing"}
+        ], errors)
+
+    def test_parse_assets_csv_should_import_the_asset_without_the_unknown_iocs(self):
+        rows, errors = _parse_assets_csv([
+            ASSETS_CSV_HEADERS + ',asset_iocs',
+            'DC01,Windows - Computer,,,,,Evil.com|unknown.com'
+        ], ASSETS_TYPES, CASE_IOCS, 3)
+
+        self.assertEqual(1, len(rows))
+        self.assertEqual([10], rows[0]['ioc_links'])
+        self.assertEqual([{
+            'row': 0,
+            'error': "IOCs not found in the case for DC01: unknown.com. The asset is imported without them"
+        }], errors)
+
+    # HOOK ROWS CHECK
+    def test_check_assets_rows_should_keep_the_valid_rows(self):
+        rows = [{'row': 0, 'asset_name': 'DC01', 'asset_type_id': 1, 'analysis_status_id': 3}]
+
+        valid_rows, errors = _check_assets_rows(rows, {1, 2}, {3})
+
+        self.assertEqual(rows, valid_rows)
+        self.assertEqual([], errors)
+
+    def test_check_assets_rows_should_report_the_rows_modified_into_invalid_ones(self):
+        valid_rows, errors = _check_assets_rows([
+            {'row': 0, 'asset_name': None, 'asset_type_id': 1, 'analysis_status_id': 3},
+            {'row': 1, 'asset_name': ' A ', 'asset_type_id': 1, 'analysis_status_id': 3},
+            {'row': 2, 'asset_name': 'DC02', 'asset_type_id': 9, 'analysis_status_id': 3},
+            {'row': 3, 'asset_name': 'DC03', 'asset_type_id': 1, 'analysis_status_id': 9},
+            {'row': 4, 'asset_name': 'DC04', 'asset_type_id': 2, 'analysis_status_id': 3}
+        ], {1, 2}, {3})
+
+        self.assertEqual([4], [row['row'] for row in valid_rows])
+        self.assertEqual([
+            {'row': 0, 'error': "Empty or too short asset name"},
+            {'row': 1, 'error': "Empty or too short asset name"},
+            {'row': 2, 'error': "Invalid asset type 9 for DC02"},
+            {'row': 3, 'error': "Invalid analysis status 9 for DC03"}
+        ], errors)
+
+    # ERRORS REPORT
+    def test_format_assets_import_errors_should_list_the_errors_by_row(self):
+        report = _format_assets_import_errors([
+            {'row': 1, 'error': "Empty or too short asset name"},
+            {'row': 3, 'error': "Invalid asset type Mainframe for DC03"}
+        ])
+
+        self.assertEqual("row 1: Empty or too short asset name\n- row 3: Invalid asset type Mainframe for DC03", report)
+
+    def test_format_assets_import_errors_should_return_an_empty_report_without_error(self):
+        self.assertEqual("", _format_assets_import_errors([]))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  Copyright (C) 2021 - Airbus CyberSecurity (SAS)
+#  ir@cyberactionlab.net
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+from app.blueprints.case.case_ioc_routes import _get_bulk_iocs_ids_from_request
+
+
+class TestCaseIocRoutes(TestCase):
+    # BULK IOCS SELECTION
+    def test_get_bulk_iocs_ids_should_require_iocs_or_filters(self):
+        self.assertEqual((None, "Either a list of IOCs or filters is required"),
+                         _get_bulk_iocs_ids_from_request({}, 1))
+        self.assertEqual((None, "Either a list of IOCs or filters is required"),
+                         _get_bulk_iocs_ids_from_request({'filters': {}}, 1))
+
+    def test_get_bulk_iocs_ids_should_reject_iocs_which_are_not_a_list(self):
+        self.assertEqual((None, "IOCs must be a list of IDs"),
+                         _get_bulk_iocs_ids_from_request({'iocs': 1}, 1))
+
+    def test_get_bulk_iocs_ids_should_reject_iocs_which_are_not_ids(self):
+        self.assertEqual((None, "IOCs must be a list of IDs"),
+                         _get_bulk_iocs_ids_from_request({'iocs': [1, 'a']}, 1))
+        self.assertEqual((None, "IOCs must be a list of IDs"),
+                         _get_bulk_iocs_ids_from_request({'iocs': [None]}, 1))
+
+    def test_get_bulk_iocs_ids_should_reject_filters_which_are_not_an_object(self):
+        self.assertEqual((None, "Filters must be an object"),
+                         _get_bulk_iocs_ids_from_request({'filters': ['ioc_type_id']}, 1))
+
+    def test_get_bulk_iocs_ids_should_reject_an_unknown_ioc_type(self):
+        self.assertEqual((None, "Not a valid IOC type in filters"),
+                         _get_bulk_iocs_ids_from_request({'filters': {'ioc_type_id': 999999}}, 1))
+        self.assertEqual((None, "Not a valid IOC type in filters"),
+                         _get_bulk_iocs_ids_from_request({'filters': {'ioc_type_id': 'md5'}}, 1))
+
+    def test_get_bulk_iocs_ids_should_reject_an_unknown_tlp(self):
+        self.assertEqual((None, "Invalid TLP ID in filters"),
+                         _get_bulk_iocs_ids_from_request({'filters': {'ioc_tlp_id': 999999}}, 1))
+        self.assertEqual((None, "Invalid TLP ID in filters"),
+                         _get_bulk_iocs_ids_from_request({'filters': {'ioc_tlp_id': 'red'}}, 1))
+
+    def test_get_bulk_iocs_ids_should_reject_tags_which_are_not_a_string(self):
+        self.assertEqual((None, "Tags filter must be a string"),
+                         _get_bulk_iocs_ids_from_request({'filters': {'ioc_tags': ['malware']}}, 1))
+
+    def test_get_bulk_iocs_ids_should_accept_valid_filters(self):
+        jsdata = {'filters': {'ioc_type_id': '1', 'ioc_tlp_id': '1', 'ioc_tags': 'not_a_tag%'}}
+
+        ioc_ids, error = _get_bulk_iocs_ids_from_request(jsdata, 1)
+
+        self.assertIsNone(error)
+        self.assertEqual([], ioc_ids)
+        # The request filters are left untouched
+        self.assertEqual('1', jsdata['filters']['ioc_type_id'])
+
+    def test_get_bulk_iocs_ids_should_accept_a_list_of_ids(self):
+        ioc_ids, error = _get_bulk_iocs_ids_from_request({'iocs': ['999999']}, 1)
+
+        self.assertIsNone(error)
+        self.assertEqual([], ioc_ids)
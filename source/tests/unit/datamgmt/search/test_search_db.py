@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  Copyright (C) 2021 - Airbus CyberSecurity (SAS)
+#  ir@cyberactionlab.net
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from app.datamgmt.search import search_db
+from app.datamgmt.search.search_db import count_search_query
+from app.datamgmt.search.search_db import escape_like
+from app.models import Client
+from tests.clean_database import clean_db
+from tests.test_helper import TestHelper
+
+
+class TestSearchDB(TestCase):
+    def setUp(self) -> None:
+        self._test_helper = TestHelper()
+        clean_db()
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    # ESCAPE LIKE
+    def test_escape_like_should_escape_the_wildcards(self):
+        self.assertEqual('100\\% \\_done\\_', escape_like('100% _done_'))
+
+    def test_escape_like_should_escape_the_escape_character_first(self):
+        self.assertEqual('C:\\\\temp\\\\\\%', escape_like('C:\\temp\\%'))
+
+    def test_escape_like_should_keep_other_values(self):
+        self.assertEqual('evil.example.com', escape_like('evil.example.com'))
+
+    def test_escape_like_should_match_the_value_literally(self):
+        self._test_helper.create_client('client_50%')
+        self._test_helper.create_client('client_500')
+
+        clients = Client.query.filter(
+            Client.name.like(f"%{escape_like('_50%')}%", escape='\\')
+        ).all()
+
+        self.assertEqual(['client_50%'], [client.name for client in clients])
+
+    # COUNT SEARCH QUERY
+    def test_count_search_query_should_return_the_exact_count(self):
+        for _ in range(3):
+            self._test_helper.create_client()
+
+        count, estimated = count_search_query(Client.query)
+
+        self.assertEqual(3, count)
+        self.assertFalse(estimated)
+
+    def test_count_search_query_should_return_zero_without_match(self):
+        count, estimated = count_search_query(Client.query.filter(Client.name == 'no_such_client'))
+
+        self.assertEqual(0, count)
+        self.assertFalse(estimated)
+
+    def test_count_search_query_should_estimate_above_the_limit(self):
+        for _ in range(3):
+            self._test_helper.create_client()
+
+        with patch.object(search_db, 'SEARCH_EXACT_COUNT_LIMIT', 1):
+            count, estimated = count_search_query(Client.query)
+
+        self.assertTrue(estimated)
+        self.assertGreaterEqual(count, 2)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+#
+#  IRIS Source Code
+#  Copyright (C) 2021 - Airbus CyberSecurity (SAS)
+#  ir@cyberactionlab.net
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+from app.iris_engine.utils.common import normalize_ioc_value
+
+
+class TestNormalizeIocValue(TestCase):
+    def test_normalize_ioc_value_should_return_none_for_none(self):
+        self.assertIsNone(normalize_ioc_value(None, 'domain'))
+
+    def test_normalize_ioc_value_should_strip_the_value(self):
+        self.assertEqual('Some Value', normalize_ioc_value('  Some Value\n', 'other'))
+
+    def test_normalize_ioc_value_should_lower_case_insensitive_types(self):
+        self.assertEqual('d41d8cd98f00b204e9800998ecf8427e',
+                         normalize_ioc_value('D41D8CD98F00B204E9800998ECF8427E', 'md5'))
+
+    def test_normalize_ioc_value_should_keep_the_case_of_other_types(self):
+        self.assertEqual('C:\\Windows\\Evil.exe', normalize_ioc_value('C:\\Windows\\Evil.exe', 'filename'))
+
+    def test_normalize_ioc_value_should_keep_the_case_without_type(self):
+        self.assertEqual('Evil.COM', normalize_ioc_value('Evil.COM'))
+
+    def test_normalize_ioc_value_should_refang_the_dots(self):
+        self.assertEqual('evil.example.com', normalize_ioc_value('evil[.]example(.)com', 'domain'))
+        self.assertEqual('evil.example.com', normalize_ioc_value('evil[dot]example(DOT)com', 'domain'))
+
+    def test_normalize_ioc_value_should_refang_the_at_signs(self):
+        self.assertEqual('john@example.com', normalize_ioc_value('john[@]example[.]com', 'email'))
+        self.assertEqual('john@example.com', normalize_ioc_value('john(at)example[.]com', 'email'))
+
+    def test_normalize_ioc_value_should_refang_the_schemes(self):
+        self.assertEqual('http://evil.com/payload', normalize_ioc_value('hxxp://evil[.]com/payload', 'url'))
+        self.assertEqual('https://evil.com', normalize_ioc_value('hxxps[:]//evil[.]com', 'url'))
+        self.assertEqual('http://evil.com', normalize_ioc_value('HXXP://evil[.]com', 'url'))
+        self.assertEqual('ftp://evil.com', normalize_ioc_value('fxp://evil[.]com', 'url'))
+
+    def test_normalize_ioc_value_should_refang_the_slashes(self):
+        self.assertEqual('http://evil.com/a', normalize_ioc_value('hxxp:[/][/]evil[.]com[/]a', 'url'))
+
+    def test_normalize_ioc_value_should_only_refang_network_types(self):
+        self.assertEqual('evil[.]exe', normalize_ioc_value('evil[.]exe', 'filename'))
+
+    def test_normalize_ioc_value_should_keep_the_case_of_refanged_urls(self):
+        self.assertEqual('http://evil.com/Payload', normalize_ioc_value('hxxp://evil[.]com/Payload', 'url'))